@@ -50,6 +50,9 @@ from .label import Label
 
 from .graphics_context import GraphicsContextEnable, ImageGraphicsContextEnable
 
+# Rendering many components to image files in worker processes
+from .batch import render_components_to_files  # noqa: F401
+
 # Old Enable classes and widgets
 from .abstract_window import AbstractWindow
 
@@ -0,0 +1,50 @@
+""" Render Enable components to image files in worker processes.
+"""
+
+from kiva.batch import RenderJob, render_many
+from kiva.recording import RecordingGraphicsContext
+
+from .graphics_context import EnableGCMixin
+
+
+class RecordingGraphicsContextEnable(EnableGCMixin, RecordingGraphicsContext):
+    """ A recording graphics context which components can be drawn on.
+    """
+    pass
+
+
+def record_component(component, mode="normal"):
+    """ Record the drawing of a component into a kiva DisplayList.
+
+    The component is drawn with its outer position at the origin, the same
+    as when it is drawn into an image of its outer bounds.
+    """
+    width, height = component.outer_bounds
+    gc = RecordingGraphicsContextEnable((int(width), int(height)))
+    with gc:
+        gc.translate_ctm(-component.outer_x, -component.outer_y)
+        component.draw(gc, mode=mode)
+    return gc.display_list
+
+
+def render_components_to_files(components, filenames, backend="image",
+                               processes=None, mode="normal", warm_fonts=(),
+                               progress=None):
+    """ Save images of many components, rendered in a pool of processes.
+
+    Each component is drawn in this process onto a recording graphics
+    context, so that only its drawing has to be pickled, and not the
+    component and the objects it refers to.  The recordings are then
+    rasterized and saved by the workers.  See `kiva.batch.render_many` for
+    the other arguments.
+
+    Returns the `kiva.batch.RenderResult` of each component, which holds the
+    time taken to rasterize it.
+    """
+    jobs = [
+        RenderJob(record_component(component, mode), component.outer_bounds,
+                  filename)
+        for component, filename in zip(components, filenames)
+    ]
+    return render_many(jobs, backend=backend, processes=processes,
+                       warm_fonts=warm_fonts, progress=progress)
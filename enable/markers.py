@@ -3,10 +3,12 @@ Defines markers classes, used by a variety of renderers.
 """
 
 # Major library imports
+import inspect
+
 from numpy import array, pi
 
 # Enthought library imports
-from traits.api import HasTraits, Bool, Instance, Trait
+from traits.api import HasTraits, Bool, Float, Instance, Trait
 from traitsui.api import EnumEditor
 from kiva.constants import STROKE, FILL_STROKE, \
             SQUARE_MARKER, DIAMOND_MARKER, CIRCLE_MARKER, \
@@ -18,6 +20,41 @@ from kiva.constants import STROKE, FILL_STROKE, \
 from .compiled_path import CompiledPath
 
 
+# Whether the draw_path_at_points() of each graphics context class takes a
+# stamp_tolerance.
+_stamp_support = {}
+
+
+def _can_stamp(gc):
+    """ Whether the draw_path_at_points() method of gc can stamp markers.
+    """
+    klass = type(gc)
+    can_stamp = _stamp_support.get(klass)
+    if can_stamp is None:
+        can_stamp = _takes_keyword(gc.draw_path_at_points, "stamp_tolerance")
+        _stamp_support[klass] = can_stamp
+    return can_stamp
+
+
+def _takes_keyword(function, name):
+    """ Whether function can be called with the keyword argument name.
+    """
+    try:
+        if hasattr(inspect, "signature"):
+            for parameter in inspect.signature(function).parameters.values():
+                if parameter.kind == parameter.VAR_KEYWORD:
+                    return True
+                if parameter.name == name:
+                    return parameter.kind != parameter.POSITIONAL_ONLY
+            return False
+        else:
+            spec = inspect.getargspec(function)
+            return name in spec.args or spec.keywords is not None
+    except (TypeError, ValueError):
+        # Extension functions may not have a signature.
+        return False
+
+
 class AbstractMarker(HasTraits):
     """ Abstract class for markers.
     """
@@ -36,6 +73,11 @@ class AbstractMarker(HasTraits):
     # markers render faster and look better if they are not anti-aliased..
     antialias = Bool(True)
 
+    # How far, in pixels, draw_at_points() may move each marker.  When this
+    # is more than 0, backends which support it render the marker once and
+    # stamp it at every point, which is much faster for many points.
+    stamp_tolerance = Float(0.0)
+
     def add_to_path(self, path, size):
         """ Adds this marker's representation to *path*, scaled appropriately
         for *size*.
@@ -59,6 +101,41 @@ class AbstractMarker(HasTraits):
         """
         raise NotImplementedError
 
+    def draw_at_points(self, gc, points, size):
+        """ Draws this marker at each of *points* with the current colors and
+        line width of *gc*.
+
+        Parameters
+        ----------
+        gc : GraphicsContext
+            The target for drawing the markers.
+        points : array of shape (N, 2)
+            The positions of the markers.
+        size : number
+            Size of the marker, in pixels
+        """
+        with gc:
+            if not self.antialias:
+                gc.set_antialias(False)
+            path = self._get_path(gc, size)
+            if not hasattr(gc, "draw_path_at_points"):
+                for x, y in points:
+                    with gc:
+                        gc.translate_ctm(x, y)
+                        gc.begin_path()
+                        gc.add_path(path)
+                        gc.draw_path(self.draw_mode)
+            elif self.stamp_tolerance > 0 and _can_stamp(gc):
+                gc.draw_path_at_points(points, path, self.draw_mode,
+                                       stamp_tolerance=self.stamp_tolerance)
+            else:
+                gc.draw_path_at_points(points, path, self.draw_mode)
+
+    def _get_path(self, gc, size):
+        path = gc.get_empty_path()
+        self.add_to_path(path, size)
+        return path
+
     def _add_to_path(self, path, size):
         # subclasses must implement this method
         raise NotImplementedError
@@ -397,6 +474,9 @@ class CustomMarker(AbstractMarker):
         else:
             return self.path
 
+    def _get_path(self, gc, size):
+        return self.get_compiled_path(size)
+
 # String names for marker types.
 marker_names = ("square", "circle", "triangle", "inverted_triangle",
                 "left_triangle", "right_triangle", "pentagon", "hexagon",
@@ -0,0 +1,37 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+from PIL import Image
+
+from enable.api import Box
+from enable.batch import record_component, render_components_to_files
+
+
+class BatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_record_component(self):
+        box = Box(bounds=[40, 30], position=[15, 25], color="red",
+                  border_size=0)
+        display_list = record_component(box)
+        self.assertGreater(len(display_list), 0)
+
+    def test_render_components_to_files(self):
+        boxes = [Box(bounds=[40 + i, 30], position=[15, 25], color="red",
+                     border_size=0) for i in range(2)]
+        filenames = [os.path.join(self.directory, "box{}.png".format(i))
+                     for i in range(2)]
+        results = render_components_to_files(boxes, filenames, processes=0)
+
+        for i, result in enumerate(results):
+            image = numpy.array(Image.open(result.filename))
+            self.assertEqual(image.shape[:2], (30, 40 + i))
+            self.assertTrue((image[..., :3] == [255, 0, 0]).all())
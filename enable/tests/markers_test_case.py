@@ -0,0 +1,70 @@
+import numpy as np
+import unittest
+
+from kiva.image import GraphicsContext
+
+from enable.markers import CircleMarker, DotMarker, SquareMarker
+
+
+class TestDrawAtPoints(unittest.TestCase):
+
+    def setUp(self):
+        state = np.random.RandomState(0)
+        self.points = np.column_stack([state.randint(10, 90, 50),
+                                       state.randint(10, 90, 50)]) * 1.0
+
+    def draw(self, marker, points):
+        gc = GraphicsContext((100, 100))
+        gc.set_fill_color((0.2, 0.5, 0.8, 0.7))
+        marker.draw_at_points(gc, points, 4)
+        return gc.bmp_array.copy()
+
+    def test_stamped_markers_are_snapped(self):
+        # With half a pixel of tolerance the markers are drawn at the
+        # nearest whole pixels.
+        for marker_class in (CircleMarker, DotMarker, SquareMarker):
+            expected = self.draw(marker_class(), self.points)
+            marker = marker_class(stamp_tolerance=0.5)
+            actual = self.draw(marker, self.points + 0.3)
+            self.assertTrue(np.array_equal(actual, expected))
+
+    def test_draw_without_draw_path_at_points(self):
+        class PathOnlyGC(GraphicsContext):
+            # Hide draw_path_at_points(), like backends which lack it.
+            draw_path_at_points = property()
+
+        expected = self.draw(SquareMarker(), self.points)
+        gc = PathOnlyGC((100, 100))
+        gc.set_fill_color((0.2, 0.5, 0.8, 0.7))
+        SquareMarker().draw_at_points(gc, self.points, 4)
+        self.assertTrue(np.array_equal(gc.bmp_array, expected))
+
+    def test_stamp_support_is_checked_once(self):
+        from enable.markers import _can_stamp
+
+        calls = []
+
+        class NoStampGC(GraphicsContext):
+            def draw_path_at_points(self, points, path, mode):
+                calls.append(len(points))
+                GraphicsContext.draw_path_at_points(self, points, path, mode)
+
+        self.assertTrue(_can_stamp(GraphicsContext((1, 1))))
+        gc = NoStampGC((100, 100))
+        self.assertFalse(_can_stamp(gc))
+        SquareMarker(stamp_tolerance=0.5).draw_at_points(gc, self.points, 4)
+        self.assertEqual(calls, [len(self.points)])
+
+    def test_drawing_errors_are_raised(self):
+        class BrokenGC(GraphicsContext):
+            def draw_path_at_points(self, points, path, mode,
+                                    stamp_tolerance=0.0):
+                raise TypeError("broken")
+
+        marker = SquareMarker(stamp_tolerance=0.5)
+        with self.assertRaises(TypeError):
+            marker.draw_at_points(BrokenGC((10, 10)), self.points, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,6 +7,9 @@ from bisect import insort_left
 
 import six.moves as sm
 
+# Major library imports
+from numpy import cumsum, searchsorted
+
 # Enthought library imports
 from traits.api import (Bool, Int, Event, Instance, Any, Property,
                                   List, DelegatesTo)
@@ -417,15 +420,9 @@ class TextField(Component):
             ending at 'index' if 'start' is False.
         """
         box_width = self.width - 2*self._style.text_offset
-        total_width = 0.
-        end_index = 1
-        for t in text:
-            w, h = self.metrics.get_text_extent(t)[2:4]
-            total_width = total_width + w
-            if total_width <= box_width:
-                end_index = end_index + 1
-            else:
-                break
+        widths = self.metrics.get_text_extents(list(text))[:, 2]
+        # One more than the number of characters which fit in the box
+        end_index = searchsorted(cumsum(widths), box_width, side='right') + 1
 
         if start:
             return text[index:min(index+end_index-1, len(text))]
@@ -0,0 +1,95 @@
+"""
+Benchmarks rendering Agg graphics contexts from several threads at once.
+
+The GIL is released while Agg rasterizes, so rendering one context on each
+of several threads should take little more time than rendering one of them,
+given as many cores.
+
+A single context can also split each stroke and fill into bands of rows,
+which are rendered by a pool of worker threads.  benchmark_bands() shows
+what that costs for a small path and saves for a large one.
+"""
+from __future__ import print_function
+
+from multiprocessing import cpu_count
+import threading
+import time
+import timeit
+
+from numpy import cos, linspace, pi, sin, zeros
+
+from kiva import agg
+from kiva.constants import CIRCLE_MARKER, SQUARE_MARKER
+
+
+def render(size=(800, 800), n_lines=40, n_pts=2000):
+    gc = agg.GraphicsContextArray(size)
+    width, height = size
+    pts = zeros((n_pts, 2))
+    pts[:, 0] = linspace(0, width, n_pts)
+    for i in range(n_lines):
+        pts[:, 1] = height / 2. + height / 2. * sin(pts[:, 0] / 10. + i)
+        gc.lines(pts)
+        gc.set_line_width(1 + i % 3)
+        gc.stroke_path()
+
+    gc.arc(width / 2., height / 2., width / 3., 0, 2 * pi)
+    gc.set_fill_color((0.2, 0.4, 0.6, 0.5))
+    gc.fill_path()
+
+    markers = zeros((500, 2))
+    markers[:, 0] = width / 2. + width / 3. * cos(linspace(0, 2 * pi, 500))
+    markers[:, 1] = height / 2. + height / 3. * sin(linspace(0, 2 * pi, 500))
+    gc.draw_marker_at_points(markers, 4, SQUARE_MARKER)
+    gc.draw_marker_at_points(markers, 6, CIRCLE_MARKER)
+    return gc.bmp_array
+
+
+def benchmark_threads(count=None):
+    """ Renders count contexts one after another, and then on count threads.
+    """
+    if count is None:
+        count = min(cpu_count(), 4)
+
+    t1 = time.time()
+    for i in range(count):
+        render()
+    serial = time.time() - t1
+
+    threads = [threading.Thread(target=render) for i in range(count)]
+    t1 = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    threaded = time.time() - t1
+
+    print('%d contexts: serial %.3f s, threaded %.3f s, speedup %.1fx'
+          % (count, serial, threaded, serial / threaded))
+
+
+def benchmark_bands(thread_counts=(1, 2, 4)):
+    """ Times a thin stroke and a full fill of an 800x800 context, split
+    into bands for each thread count.
+    """
+    for threads in thread_counts:
+        gc = agg.GraphicsContextArray((800, 800), threads=threads)
+
+        def thin():
+            gc.move_to(100, 100)
+            gc.line_to(110, 700)
+            gc.stroke_path()
+
+        def full():
+            gc.rect(0, 0, 800, 800)
+            gc.fill_path()
+
+        thin_time = min(timeit.repeat(thin, number=2000, repeat=3)) / 2000
+        full_time = min(timeit.repeat(full, number=200, repeat=3)) / 200
+        print('%d threads: thin stroke %.1f us, full fill %.1f us'
+              % (threads, thin_time * 1e6, full_time * 1e6))
+
+
+if __name__ == '__main__':
+    benchmark_bands()
+    benchmark_threads()
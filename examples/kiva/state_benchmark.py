@@ -0,0 +1,72 @@
+"""
+Benchmarks saving and restoring the graphics state of the Python backends.
+
+Enable wraps the drawing of nearly every component and layer in a
+``with gc:`` block, so the cost of save_state() and restore_state() is paid
+many times per frame by the backends which track their state in Python,
+such as SVG and PS.
+"""
+from __future__ import print_function
+
+import time
+
+from kiva.basecore2d import GraphicsContextBase
+from kiva.graphics_state import GraphicsState
+
+
+def benchmark_copy(cycles=100000):
+    """ Copies a graphics state without changing it.
+    """
+    state = GraphicsState()
+    t1 = time.time()
+    for i in range(cycles):
+        state.copy()
+    t2 = time.time()
+    tot_time = t2 - t1
+    print('copy: tot,per copy:', tot_time, tot_time / cycles)
+
+
+def benchmark_nested(cycles=10000, depth=5):
+    """ Saves and restores nested states, changing the ctm and a color at
+    each level, like nested Enable components do.
+    """
+    gc = GraphicsContextBase()
+    t1 = time.time()
+    for i in range(cycles):
+        for level in range(depth):
+            gc.save_state()
+            gc.translate_ctm(1.0, 1.0)
+            gc.set_fill_color((1.0, 0.0, 0.0, 0.5))
+        for level in range(depth):
+            gc.restore_state()
+    t2 = time.time()
+    tot_time = t2 - t1
+    count = cycles * depth
+    print('nested save/restore: tot,per save:', tot_time, tot_time / count)
+
+
+def benchmark_untouched(cycles=10000, depth=5):
+    """ Saves and restores nested states without changing them.
+    """
+    gc = GraphicsContextBase()
+    t1 = time.time()
+    for i in range(cycles):
+        for level in range(depth):
+            gc.save_state()
+        for level in range(depth):
+            gc.restore_state()
+    t2 = time.time()
+    tot_time = t2 - t1
+    count = cycles * depth
+    print('untouched save/restore: tot,per save:', tot_time,
+          tot_time / count)
+
+
+def run_all_benchmarks():
+    benchmark_copy()
+    benchmark_nested()
+    benchmark_untouched()
+
+
+if __name__ == '__main__':
+    run_all_benchmarks()
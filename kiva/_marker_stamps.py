@@ -0,0 +1,255 @@
+""" The shapes of kiva's markers, and the drawing of markers as stamps, which
+are shared by the backends.
+
+A marker is rasterized once to get the coverage of each of its pixels, and
+the coverage is then added into an image at every point.
+"""
+from __future__ import absolute_import
+
+import numpy as np
+
+from .constants import (
+    CIRCLE_MARKER, CROSS_MARKER, CROSSED_CIRCLE_MARKER, DIAMOND_MARKER,
+    DOT_MARKER, FILL, FILL_STROKE, INVERTED_TRIANGLE_MARKER, PIXEL_MARKER,
+    PLUS_MARKER, SQUARE_MARKER, STROKE, TRIANGLE_MARKER
+)
+
+
+# Markers are stamped at no more than this many subpixel offsets along each
+# axis.
+max_stamp_phases = 8
+
+
+def stamp_path_at_points(gc, points, path, mode, tolerance):
+    """ Draw a path at many points by blending stamps of its coverage.
+
+    Blending a solid color is the same in any order, so each layer of the
+    markers is blended as one product of the transparency of all of the
+    stamps covering a pixel, and then drawn at once.  Returns False if the
+    path can't be stamped with the current state of gc.
+
+    gc is a backend's graphics context, which provides:
+
+    _marker_layers(mode)
+        The layers of the markers, with the fill before the stroke.
+    _can_stamp_layers(layers)
+        Whether the layers are solid and may be blended in any order.
+    _marker_box(path, layers)
+        The offset from a marker's pixel to the corner of the box it
+        covers, and the width and height of the box, or None.
+    _device_points(points)
+        The x and y device coordinates of the points.
+    _stamp_clip()
+        The x and y ranges of the device pixels which may be drawn.
+    _layer_alpha(layer)
+        The opacity of a layer.
+    _render_stamp(path, mode, layer, offset, shape)
+        The coverage of a layer of the path moved by offset, as a uint8
+        array of the given shape indexed by device [y, x].
+    _draw_layer(log_t, layer)
+        Blend a layer over the pixels, with the log of the transparency it
+        leaves at each pixel, indexed by device [y, x].
+    """
+    if tolerance >= 0.5:
+        phases = 1
+    else:
+        phases = int(np.ceil(0.5 / tolerance - 1e-9))
+
+    layers = gc._marker_layers(mode)
+    if (phases > max_stamp_phases or path.is_empty() or
+            not gc._can_stamp_layers(layers)):
+        return False
+
+    box = gc._marker_box(path, layers)
+    if box is None:
+        return False
+    x0, y0, w, h = box
+    if w == 0:
+        return True
+
+    x, y = gc._device_points(points)
+    visible = ((x + x0 + w > -1) & (x + x0 < gc._width + 1) &
+               (y + y0 + h > -1) & (y + y0 < gc._height + 1))
+    kx = np.rint(x[visible] * phases).astype(int)
+    ky = np.rint(y[visible] * phases).astype(int)
+    ix, px = np.divmod(kx, phases)
+    iy, py = np.divmod(ky, phases)
+    phase_ids = py * phases + px
+
+    clip_x, clip_y = gc._stamp_clip()
+    for layer in layers:
+        alpha = gc._layer_alpha(layer)
+        if alpha <= 0.0 or len(phase_ids) == 0:
+            continue
+
+        # The log of the transparency left at each pixel
+        log_t = np.zeros((gc._height, gc._width))
+        for phase_id in np.unique(phase_ids):
+            offset = (float(phase_id % phases) / phases - x0,
+                      float(phase_id // phases) / phases - y0)
+            coverage = gc._render_stamp(path, mode, layer, offset, (h, w))
+            rows, cols = np.nonzero(coverage)
+            with np.errstate(divide='ignore'):
+                weights = np.log1p(coverage[rows, cols] * (-alpha / 255.0))
+
+            selected = phase_ids == phase_id
+            add_stamps(log_t, ix[selected], iy[selected], cols + x0,
+                       rows + y0, weights, clip_x, clip_y)
+
+        gc._draw_layer(log_t, layer)
+
+    return True
+
+
+def overlap_free_batches(points, x, y, w, h, chunk):
+    """ Split markers into batches in which no two of them overlap.
+
+    x and y are the positions of the markers on the canvas, and w and h are
+    the size of the box which each covers.  The canvas is divided into cells
+    of that size, and a batch takes at most one marker from each cell, from
+    cells which are not next to each other.  The markers of each batch stay
+    in order, and there are no more than chunk in a batch.
+    """
+    cx = (np.floor(x) // w).astype(np.int64)
+    cy = (np.floor(y) // h).astype(np.int64)
+    cx -= cx.min()
+    cy -= cy.min()
+    cells = cx * (cy.max() + 1) + cy
+
+    # Number the markers in each cell in order.
+    order = np.argsort(cells, kind='mergesort')
+    starts = np.r_[0, np.nonzero(np.diff(cells[order]))[0] + 1]
+    counts = np.diff(np.r_[starts, len(order)])
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order)) - np.repeat(starts, counts)
+
+    batch = rank * 4 + (cx & 1) * 2 + (cy & 1)
+    order = np.argsort(batch, kind='mergesort')
+    batches = np.split(order, np.cumsum(np.bincount(batch))[:-1])
+    return [points[batch[i:i+chunk]]
+            for batch in batches for i in range(0, len(batch), chunk)]
+
+
+def add_stamps(log_t, sx, sy, dx, dy, weights, clip_x, clip_y):
+    """ Add the weight of each pixel of the stamps at (sx, sy) to an image,
+    within the clip box.
+
+    log_t is indexed by [y, x], and the pixel at (dx, dy) of the stamp at
+    (sx, sy) adds its weight to the pixel at (sx + dx, sy + dy).
+    """
+    if len(sx) == 0 or len(weights) == 0:
+        return
+    region = log_t[clip_y[0]:clip_y[1], clip_x[0]:clip_x[1]]
+    if len(sx) * 4 >= region.size:
+        # Cheaper to shift whole images than to scatter every pixel of every
+        # stamp.
+        add_stamp_images(log_t, sx, sy, dx, dy, weights, clip_x, clip_y)
+        return
+
+    height, width = region.shape
+    chunk = max(1, 2 ** 20 // max(len(weights), 1))
+    for i in range(0, len(sx), chunk):
+        xs = sx[i:i+chunk, np.newaxis] + dx - clip_x[0]
+        ys = sy[i:i+chunk, np.newaxis] + dy - clip_y[0]
+        inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        flat = ys[inside] * width + xs[inside]
+        layer = np.broadcast_to(weights, xs.shape)[inside]
+        region += np.bincount(flat, weights=layer,
+                              minlength=region.size).reshape(region.shape)
+
+
+def add_stamp_images(log_t, sx, sy, dx, dy, weights, clip_x, clip_y):
+    """ Add the weight of each pixel of the stamps at (sx, sy) to an image,
+    within the clip box.
+
+    A count of the stamps at each position is shifted by the offset of each
+    pixel of the stamp, so the work depends on the size of the image rather
+    than on the number of stamps.
+    """
+    lo_x, hi_x = clip_x[0] - dx.max(), clip_x[1] - dx.min()
+    lo_y, hi_y = clip_y[0] - dy.max(), clip_y[1] - dy.min()
+    inside = (sx >= lo_x) & (sx < hi_x) & (sy >= lo_y) & (sy < hi_y)
+    width, height = hi_x - lo_x, hi_y - lo_y
+    counts = np.bincount((sy[inside] - lo_y) * width + (sx[inside] - lo_x),
+                         minlength=width * height).reshape(height, width)
+
+    region = log_t[clip_y[0]:clip_y[1], clip_x[0]:clip_x[1]]
+    for x, y, weight in zip(dx, dy, weights):
+        # The stamps which cover a pixel with this pixel of the stamp
+        shifted = counts[clip_y[0] - y - lo_y:clip_y[1] - y - lo_y,
+                         clip_x[0] - x - lo_x:clip_x[1] - x - lo_x]
+        if np.isfinite(weight):
+            region += shifted * weight
+        else:
+            region[shifted > 0] = -np.inf
+
+
+def square_marker(path, size):
+    path.rect(-size, -size, size * 2, size * 2)
+
+
+def diamond_marker(path, size):
+    path.lines(np.array([(0, -size), (-size, 0), (0, size), (size, 0)]))
+    path.close_path()
+
+
+def circle_marker(path, size):
+    path.arc(0, 0, size, 0, 2 * np.pi)
+    path.close_path()
+
+
+def crossed_circle_marker(path, size):
+    circle_marker(path, size)
+    circle_ticks(path, size)
+
+
+def circle_ticks(path, size):
+    # Ticks outside of the circle, like Agg's crossed circle
+    for dx, dy in ((1, 0), (0, 1), (-1, 0), (0, -1)):
+        path.move_to(dx * size, dy * size)
+        path.line_to(dx * size * 1.5, dy * size * 1.5)
+
+
+def cross_marker(path, size):
+    path.move_to(-size, -size)
+    path.line_to(size, size)
+    path.move_to(size, -size)
+    path.line_to(-size, size)
+
+
+def triangle_marker(path, size):
+    path.lines(np.array([(-size, -size), (size, -size), (0, 0.732 * size)]))
+    path.close_path()
+
+
+def inverted_triangle_marker(path, size):
+    path.lines(np.array([(-size, size), (size, size), (0, -0.732 * size)]))
+    path.close_path()
+
+
+def plus_marker(path, size):
+    path.move_to(0, -size)
+    path.line_to(0, size)
+    path.move_to(-size, 0)
+    path.line_to(size, 0)
+
+
+def pixel_marker(path, size):
+    path.rect(-0.5, -0.5, 1.0, 1.0)
+
+
+# The function which adds each kiva marker to a path, and the mode to draw it
+# with.  Dots and pixels are filled with the fill color, and the markers
+# made of lines are stroked with the stroke color, as in Agg.
+marker_shapes = {
+    SQUARE_MARKER: (square_marker, FILL_STROKE),
+    DIAMOND_MARKER: (diamond_marker, FILL_STROKE),
+    CIRCLE_MARKER: (circle_marker, FILL_STROKE),
+    CROSSED_CIRCLE_MARKER: (crossed_circle_marker, FILL_STROKE),
+    CROSS_MARKER: (cross_marker, STROKE),
+    TRIANGLE_MARKER: (triangle_marker, FILL_STROKE),
+    INVERTED_TRIANGLE_MARKER: (inverted_triangle_marker, FILL_STROKE),
+    PLUS_MARKER: (plus_marker, STROKE),
+    DOT_MARKER: (circle_marker, FILL),
+    PIXEL_MARKER: (pixel_marker, FILL),
+}
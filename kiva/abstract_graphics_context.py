@@ -2,9 +2,88 @@ from __future__ import absolute_import
 
 from abc import ABCMeta, abstractmethod
 
+import numpy as np
 import six
 
-from .constants import FILL_STROKE, SQUARE_MARKER
+from ._marker_stamps import marker_shapes
+from .constants import FILL_STROKE, SQUARE_MARKER, STROKE
+
+
+def _text_points_and_anchors(texts, points, anchors):
+    """ Validate the arguments of show_texts()
+
+    Returns the points and anchors as float arrays of shape (N, 2).
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(texts) != len(points):
+        raise ValueError("show_texts needs one point per string")
+    if anchors is None:
+        anchors = np.zeros((1, 2))
+    else:
+        anchors = np.asarray(anchors, dtype=float).reshape(-1, 2)
+    if len(anchors) == 1:
+        anchors = np.repeat(anchors, len(points), axis=0)
+    elif len(anchors) != len(points):
+        raise ValueError("show_texts needs a single anchor or one anchor "
+                         "per string")
+    return points, anchors
+
+
+def _finite_runs(points):
+    """ Split a line at its points which aren't finite
+
+    Returns the runs of consecutive finite points as float arrays of shape
+    (M, 2).
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    finite = np.concatenate(([False], np.isfinite(points).all(axis=1),
+                             [False]))
+    bounds = np.flatnonzero(finite[1:] != finite[:-1]).reshape(-1, 2)
+    return [points[start:end] for start, end in bounds]
+
+
+def _point_colors_and_sizes(points, colors=None, sizes=None):
+    """ Validate the arguments of draw_marker_at_points() and
+    draw_path_at_points()
+
+    Returns the points as a float array of shape (N, 2), and the colors and
+    sizes as float arrays of shape (N, 4) and (N,), or None if they weren't
+    given.  RGB colors are made opaque.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if colors is not None:
+        colors = np.asarray(colors, dtype=float)
+        if colors.ndim != 2 or colors.shape[1] not in (3, 4):
+            raise ValueError("colors must be an array of shape (N, 4)")
+        if len(colors) != len(points):
+            raise ValueError("colors needs one color per point")
+        if colors.shape[1] == 3:
+            colors = np.column_stack([colors, np.ones(len(colors))])
+    if sizes is not None:
+        sizes = np.asarray(sizes, dtype=float).reshape(-1)
+        if len(sizes) != len(points):
+            raise ValueError("sizes needs one size per point")
+    return points, colors, sizes
+
+
+def _point_groups(values):
+    """ Group the points which share the same values
+
+    values has a row, or a single value, for each point.  Yields the indices
+    of the points in each group together with the group's row, in the order
+    of each group's first point.
+    """
+    values = np.asarray(values, dtype=float).reshape(len(values), -1)
+    if len(values) == 0:
+        return
+    rows, first, inverse = np.unique(values, axis=0, return_index=True,
+                                     return_inverse=True)
+    inverse = inverse.reshape(-1)
+    order = np.argsort(inverse, kind="mergesort")
+    groups = np.split(order, np.cumsum(np.bincount(inverse))[:-1])
+    for group in np.argsort(first):
+        yield groups[group], rows[group]
+
 
 @six.add_metaclass(ABCMeta)
 class AbstractGraphicsContext(object):
@@ -194,13 +273,17 @@ class AbstractGraphicsContext(object):
         """ Add a line from the current point to (x, y) to the path """
 
     @abstractmethod
-    def lines(self, points):
+    def lines(self, points, break_on_nan=False):
         """ Adds a series of lines as a new subpath.
 
         Parameters
         ----------
         points
             an Nx2 sequence of (x, y) pairs
+        break_on_nan
+            If True, points which aren't finite are left out and the line
+            starts again from the next finite point, so that gaps in the
+            data are gaps in the line.
 
         The current_point is moved to the last point in `point_array`.
 
@@ -384,6 +467,17 @@ class AbstractGraphicsContext(object):
 
         """
 
+    def get_text_extents(self, texts):
+        """ Return the extents of a sequence of strings
+
+        Returns an array of shape (N, 4) where each row is the rectangle
+        get_text_extent() returns for the matching string.  Backends may
+        measure all of the strings in a single call.
+
+        """
+        extents = [self.get_text_extent(text) for text in texts]
+        return np.array(extents, dtype=float).reshape(-1, 4)
+
     @abstractmethod
     def get_full_text_extent(self, string):
         """ Get the text extent as a tuple (w, h, x, y)
@@ -456,6 +550,39 @@ class AbstractGraphicsContext(object):
     def show_text_at_point(self, x, y):
         """ Draw text at the absolute position specified by the point """
 
+    def show_texts(self, texts, points, anchors=None):
+        """ Draw each string at the matching point
+
+        This is equivalent to setting the text position to each point and
+        calling show_text(), but backends may draw all of the strings in a
+        single call.  The text position is not changed.
+
+        Parameters
+        ----------
+
+        texts
+            A sequence of N strings.
+        points
+            An array of shape (N, 2) with the point to draw each string at.
+        anchors
+            Either None, a single (ax, ay) pair, or an array of shape (N, 2).
+            Each string is moved left by ax times its width and down by ay
+            times its height, so (0, 0) puts the start of the baseline on
+            the point and (0.5, 0.5) centers the string on it.
+
+        """
+        points, anchors = _text_points_and_anchors(texts, points, anchors)
+        x0, y0 = self.get_text_position()
+        try:
+            for text, (x, y), (ax, ay) in zip(texts, points, anchors):
+                if ax or ay:
+                    w, h = self.get_full_text_extent(text)[:2]
+                    x, y = x - ax * w, y - ay * h
+                self.set_text_position(x, y)
+                self.show_text(text)
+        finally:
+            self.set_text_position(x0, y0)
+
     # -------------------------------------------
     # Misc functions
     # -------------------------------------------
@@ -513,23 +640,84 @@ class AbstractGraphicsContext(object):
 class EnhancedAbstractGraphicsContext(AbstractGraphicsContext):
     """ ABC for graphics contexts which provide additional methods """
 
-    @abstractmethod
-    def draw_marker_at_points(self, point_array, size, marker=SQUARE_MARKER):
+    def draw_marker_at_points(self, point_array, size, marker=SQUARE_MARKER,
+                              colors=None, sizes=None):
         """ Draw a marker at a collection of points
 
         The shape and size of the marker are specified by the size and marker
         arguments.
 
-        """
+        colors and sizes may give an RGBA color and a size for each point, as
+        arrays of shape (N, 4) and (N,).  A point's color replaces the fill
+        color, or the stroke color of markers which are only stroked.
 
-    @abstractmethod
-    def draw_path_at_points(self, point_array, compiled_path, draw_mode):
+        By default the points are grouped by color and size, and each marker
+        is drawn in turn with the state of its group.  Returns False if the
+        marker is not known, in which case nothing is drawn.
+
+        """
+        if marker not in marker_shapes:
+            return False
+        shape, mode = marker_shapes[marker]
+        points, colors, sizes = _point_colors_and_sizes(point_array, colors,
+                                                        sizes)
+        if sizes is None:
+            sizes = np.full(len(points), size, dtype=float)
+        if colors is None:
+            values = sizes
+        else:
+            values = np.column_stack([sizes, colors])
+        for index, row in _point_groups(values):
+            with self:
+                if colors is not None:
+                    self._set_point_color(row[1:], mode)
+                for x, y in points[index]:
+                    with self:
+                        self.translate_ctm(x, y)
+                        self.begin_path()
+                        shape(self, row[0])
+                        self.draw_path(mode)
+        return True
+
+    def draw_path_at_points(self, point_array, compiled_path, draw_mode,
+                            colors=None):
         """ Draw a compiled path at a collection of points
 
         The starting point of the paths are specified by the points,
         and the drawing mode is specified by the third argument.
 
+        colors may give an RGBA color for each point, as an array of shape
+        (N, 4).  A point's color replaces the fill color, or the stroke
+        color when the drawing mode doesn't fill.
+
+        By default the points are grouped by color, and the path is added
+        and drawn at each point in turn with the color of its group.
+
+        """
+        points, colors, _ = _point_colors_and_sizes(point_array, colors)
+        if colors is None:
+            groups = [(slice(None), None)]
+        else:
+            groups = _point_groups(colors)
+        for index, color in groups:
+            with self:
+                if color is not None:
+                    self._set_point_color(color, draw_mode)
+                for x, y in points[index]:
+                    with self:
+                        self.translate_ctm(x, y)
+                        self.begin_path()
+                        self.add_path(compiled_path)
+                        self.draw_path(draw_mode)
+
+    def _set_point_color(self, color, draw_mode):
+        """ Set the color of points drawn with draw_mode, which is the stroke
+        color if the mode doesn't fill, and otherwise the fill color.
         """
+        if draw_mode == STROKE:
+            self.set_stroke_color(tuple(color))
+        else:
+            self.set_fill_color(tuple(color))
 
     @abstractmethod
     def show_text_translate(self, text, dx, dy):
@@ -9,6 +9,7 @@
 %include "constants.i"
 %include "rgba.i"
 %include "font_type.i"
+%include "font_cache.i"
 %include "affine_matrix.i"
 %include "compiled_path.i"
 //%include "image.i"
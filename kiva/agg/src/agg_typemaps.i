@@ -337,3 +337,54 @@
     
     $1 = stops;
 }
+
+// --------------------------------------------------------------------------
+// Typemap for std::vector<std::string>& string_list
+//
+//    For: show_texts
+//
+//    This typemap takes any python sequence of byte strings.  On python 3,
+//    str items are also accepted and encoded as utf8.
+//
+// --------------------------------------------------------------------------
+
+%typemap(in) std::vector<std::string>& string_list (std::vector<std::string> temp)
+{
+    PyObject* seq = PySequence_Fast($input, "expected a sequence of strings");
+    if (seq == NULL)
+    {
+        goto fail;
+    }
+    Py_ssize_t count = PySequence_Fast_GET_SIZE(seq);
+    temp.reserve(count);
+    for (Py_ssize_t i = 0; i < count; i++)
+    {
+        PyObject* item = PySequence_Fast_GET_ITEM(seq, i);
+        if (PyBytes_Check(item))
+        {
+            temp.push_back(std::string(PyBytes_AsString(item),
+                                       PyBytes_Size(item)));
+        }
+%#if PY_VERSION_HEX >= 0x03030000
+        else if (PyUnicode_Check(item))
+        {
+            const char* text = PyUnicode_AsUTF8(item);
+            if (text == NULL)
+            {
+                Py_DECREF(seq);
+                goto fail;
+            }
+            temp.push_back(std::string(text));
+        }
+%#endif
+        else
+        {
+            Py_DECREF(seq);
+            PyErr_SetString(PyExc_TypeError,
+                            "expected a sequence of strings");
+            goto fail;
+        }
+    }
+    Py_DECREF(seq);
+    $1 = &temp;
+}
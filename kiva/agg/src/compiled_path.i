@@ -43,7 +43,18 @@ namespace kiva
 
 
             void add_path(compiled_path& vs);
-            void lines(double* pts, int Npts);
+            %feature("shadow") lines(double* pts, int Npts, bool break_on_nan)
+            %{
+            def lines(self, points, break_on_nan=False):
+                """ Adds a series of lines as a new subpath.
+
+                When break_on_nan is true, points which aren't finite are
+                left out and the line starts again from the next finite
+                point.
+                """
+                _agg.CompiledPath_lines(self, points, break_on_nan)
+            %}
+            void lines(double* pts, int Npts, bool break_on_nan);
             void line_set(double* start, int Nstart, double* end, int Nend);
             void rect(kiva::rect_type &rect);
             void rect(double x, double y, double sx, double sy);
@@ -0,0 +1,52 @@
+/////////////////////////////////////////////////////////////////////////////
+//
+// Wraps the functions used to inspect and tune the calling thread's cache of
+// loaded FreeType font engines and its atlas of rendered glyphs, which are
+// shared by all GraphicsContextArrays drawn from that thread.
+//
+/////////////////////////////////////////////////////////////////////////////
+
+%{
+#include "kiva_font_cache.h"
+%}
+
+namespace kiva
+{
+    unsigned long font_cache_hits();
+    unsigned long font_cache_misses();
+    unsigned font_cache_size();
+    unsigned font_cache_capacity();
+    void set_font_cache_capacity(unsigned capacity);
+    void reset_font_cache_stats();
+    void clear_font_cache();
+
+    unsigned long glyph_atlas_hits();
+    unsigned long glyph_atlas_misses();
+    unsigned glyph_atlas_size();
+    unsigned long glyph_atlas_bytes();
+    unsigned long glyph_atlas_budget();
+    void set_glyph_atlas_budget(unsigned long byte_budget);
+    void reset_glyph_atlas_stats();
+    void clear_glyph_atlas();
+}
+
+%pythoncode
+%{
+def font_cache_info():
+    """ Returns a dictionary describing the state of the font cache.
+
+    The keys are 'hits', 'misses', 'size' and 'capacity'.
+    """
+    return dict(hits=font_cache_hits(), misses=font_cache_misses(),
+                size=font_cache_size(), capacity=font_cache_capacity())
+
+def glyph_atlas_info():
+    """ Returns a dictionary describing the state of the glyph atlas.
+
+    The keys are 'hits', 'misses', 'size' (the number of glyphs), 'bytes'
+    and 'budget'.
+    """
+    return dict(hits=glyph_atlas_hits(), misses=glyph_atlas_misses(),
+                size=glyph_atlas_size(), bytes=glyph_atlas_bytes(),
+                budget=glyph_atlas_budget())
+%}
@@ -26,12 +26,24 @@
 %apply (double* point_array, int point_count) {(double* pts, int Npts)};
 %apply (double* point_array, int point_count) {(double* start, int Nstart)};
 %apply (double* point_array, int point_count) {(double* end, int Nend)};
+%apply (double* point_array, int point_count) {(double* anchors, int Nanchors)};
+%apply (std::vector<std::string>& string_list) {(std::vector<std::string>& texts)};
 %apply (double* rect_array, int rect_count) {(double* rects, int Nrects)};
+// get_text_extents() fills in an Nx4 array allocated by its python shadow.
+%apply (double* rect_array, int rect_count) {(double* extents, int Nextents)};
 %apply (double* pt_x, double* pt_y) {(double* tx, double* ty)};
 %apply (double* array6) {(double* out)};
 %apply (double* dash_pattern, int n) { (double* pattern, int n)};
+%apply (double* rect_array, int rect_count) {(double* colors, int Ncolors)};
+%apply (double* dash_pattern, int n) {(double* sizes, int Nsizes)};
 %apply (unsigned char *image_data, int width, int height, int stride) {
             (unsigned char *data, int width, int height, int stride) };
+%apply (unsigned char *image_data, int width, int height, int stride) {
+            (unsigned char *src_data, int src_width, int src_height,
+             int src_stride) };
+%apply (unsigned char *image_data, int width, int height, int stride) {
+            (unsigned char *dst_data, int dst_width, int dst_height,
+             int dst_stride) };
 %apply (owned_pointer) { kiva::graphics_context* };
 
 // map string input into standard string and back
@@ -56,6 +68,7 @@
 %{
 #include "kiva_graphics_context.h"
 #include "kiva_gradient.h"
+#include "kiva_pixel_convert.h"
 
 
 #ifdef ALWAYS_32BIT_WORKAROUND
@@ -188,6 +201,21 @@ void graphics_context_multiply_alpha(double alpha,
     }
 }
 
+bool convert_pixel_array(
+       unsigned char *src_data, int src_width, int src_height, int src_stride,
+       kiva::pix_format_e src_format,
+       unsigned char *dst_data, int dst_width, int dst_height, int dst_stride,
+       kiva::pix_format_e dst_format)
+{
+    if (src_width != dst_width || src_height != dst_height)
+    {
+        return false;
+    }
+    return kiva::convert_pixels(src_data, src_stride, src_format,
+                                dst_data, dst_stride, dst_format,
+                                src_width, src_height);
+}
+
 %}
 
 bool ALWAYS_32BIT_WORKAROUND_FLAG;
@@ -203,6 +231,12 @@ int destroy_graphics_context(kiva::graphics_context_base* gc);
 void graphics_context_multiply_alpha(double alpha,
        unsigned char *data, int width, int height, int stride);
 
+bool convert_pixel_array(
+       unsigned char *src_data, int src_width, int src_height, int src_stride,
+       kiva::pix_format_e src_format,
+       unsigned char *dst_data, int dst_width, int dst_height, int dst_stride,
+       kiva::pix_format_e dst_format);
+
 namespace kiva {
 
     %pythoncode
@@ -214,6 +248,9 @@ namespace kiva {
 
         # Define paths for the two markers that Agg renders incorrectly
         from kiva.constants import DIAMOND_MARKER, CIRCLE_MARKER, FILL_STROKE
+        from kiva.abstract_graphics_context import (
+            _point_colors_and_sizes, _point_groups
+        )
 
         def circle_marker_path(path, size):
             circle_points = array([[ 1.   ,  0.   ],
@@ -276,8 +313,8 @@ namespace kiva {
 
     %pythoncode
     %{
-        # Register module function to clean up mutexes and criticalsection
-        # objects when the process quits.
+        # Register module function to release the main thread's font engines
+        # when the process quits.  Other threads release theirs on exit.
 
         import atexit
         atexit.register(cleanup_font_threading_primitives)
@@ -292,15 +329,26 @@ namespace kiva {
         public:
             %pythoncode
             %{
+            # lines() reduces solid lines with more points than this for
+            # each device pixel column that they span.
+            lines_decimation_density = 16.0
+
             # We define our own constructor AND destructor.
             def __init__(self, ary_or_size, pix_format="bgra32",
-                         interpolation="nearest", bottom_up=1):
+                         interpolation="nearest", bottom_up=1, threads=1):
                 """ When specifying size, it must be a two element tuple.
                     Array input is always treated as an image.
 
                     This class handles the polymorphism of the underlying
                     template classes for individual pixel formats.
+
+                    When threads is more than 1, paths and images are
+                    rasterized by that many threads, each rendering a band
+                    of rows.  The output is identical to that of a single
+                    thread.
                 """
+                if threads < 1:
+                    raise ValueError("threads must be at least 1")
 
                 pix_format_id = pix_format_string_map[pix_format]
                 img_depth = pix_format_bytes[pix_format]
@@ -355,6 +403,8 @@ namespace kiva {
                 _swig_setattr(self, GraphicsContextArray, 'thisown2', 1)
 
                 self.bmp_array = ary
+                if threads != 1:
+                    self.set_threads(threads)
 
             def __del__(self, destroy=_agg.destroy_graphics_context):
                 try:
@@ -394,6 +444,9 @@ namespace kiva {
             void set_image_interpolation(
                     kiva::interpolation_e interpolation);
 
+            int get_threads();
+            void set_threads(int threads);
+
             %feature("shadow") set_stroke_color(agg24::rgba& rgba_in)
             %{
             def set_stroke_color(self,color):
@@ -455,6 +508,69 @@ namespace kiva {
             %}
             bool show_text_at_point(char *text, double dx, double dy);
 
+            %feature("shadow") show_texts(std::vector<std::string>& texts,
+                                          double* pts, int Npts,
+                                          double* anchors, int Nanchors)
+            %{
+            def show_texts(self, texts, points, anchors=None):
+                """ Draws each string in texts at the matching point.
+
+                    anchors is None, a single (ax, ay) pair or one pair per
+                    string.  Each string is moved left by ax times its width
+                    and down by ay times its height, so (0.5, 0.5) centers
+                    it on its point.  The text position is not changed.
+                """
+                if '' == b'':
+                    texts = [handle_unicode(text) for text in texts]
+                points = numpy.asarray(points, dtype=float).reshape(-1, 2)
+                if anchors is None:
+                    anchors = zeros((0, 2))
+                else:
+                    anchors = numpy.asarray(anchors, dtype=float).reshape(-1, 2)
+                if len(texts) != len(points):
+                    raise ValueError("show_texts needs one point per string")
+                if len(anchors) not in (0, 1, len(points)):
+                    raise ValueError("show_texts needs a single anchor or "
+                                     "one anchor per string")
+
+                # The native batch draws each string on a single line, so
+                # strings with several lines are drawn in turn by
+                # show_text(), which puts each line below the last.
+                texts = list(texts)
+                breaks = [i for i, text in enumerate(texts) if '\n' in text]
+                start = 0
+                for stop in breaks + [len(texts)]:
+                    if stop > start:
+                        batch = anchors[start:stop] if len(anchors) > 1 \
+                            else anchors
+                        if not _agg.GraphicsContextArray_show_texts(
+                                self, texts[start:stop], points[start:stop],
+                                batch):
+                            raise RuntimeError("Font not loaded/initialized.")
+                    if stop < len(texts):
+                        x, y = points[stop]
+                        if len(anchors) > 0:
+                            ax, ay = anchors[stop if len(anchors) > 1 else 0]
+                            extent = self.get_text_extent(texts[stop])
+                            x, y = x - ax * extent[2], y - ay * extent[3]
+                        self.show_text(texts[stop], (x, y))
+                    start = stop + 1
+            %}
+
+            // Drawing a batch of strings only touches C++ state, so the GIL
+            // is released as for the rasterizing methods below.
+            %exception {
+                Py_BEGIN_ALLOW_THREADS
+                $action
+                Py_END_ALLOW_THREADS
+            }
+
+            bool show_texts(std::vector<std::string>& texts,
+                            double* pts, int Npts,
+                            double* anchors, int Nanchors);
+
+            %exception;  // clear exception handlers
+
             %pythoncode
             %{
             def show_text(self, text, point = None):
@@ -499,6 +615,24 @@ namespace kiva {
             %}
             kiva::rect_type get_text_extent(char *text);
 
+            %feature("shadow") get_text_extents(std::vector<std::string>& texts,
+                                                double* extents, int Nextents)
+            %{
+            def get_text_extents(self, texts):
+                """ Returns an Nx4 array with the (x, y, w, h) extent of
+                    each string, as returned by get_text_extent().
+                """
+                if not self.is_font_initialized():
+                    raise RuntimeError("Font not loaded/initialized.")
+                if '' == b'':
+                    texts = [handle_unicode(text) for text in texts]
+                extents = zeros((len(texts), 4))
+                _agg.GraphicsContextArray_get_text_extents(self, texts, extents)
+                return extents
+            %}
+            void get_text_extents(std::vector<std::string>& texts,
+                                  double* extents, int Nextents);
+
             bool is_font_initialized();
 
             %feature("shadow") set_text_matrix(agg24::trans_affine& value)
@@ -627,7 +761,44 @@ namespace kiva {
 
             void close_path();
             void add_path(kiva::compiled_path& other_path);
-            void lines(double* pts, int Npts);
+
+            %feature("shadow") lines(double* pts, int Npts, bool break_on_nan)
+            %{
+            def lines(self, points, decimate=None, break_on_nan=False):
+                """ Adds a series of lines as a new subpath.
+
+                Each run of points which lie in the same device pixel column
+                may be reduced to the first, lowest, highest and last of
+                them.  This makes stroking a line with millions of points
+                take time in proportion to its width in pixels rather than
+                its number of points.  Without antialiasing the stroke is
+                nearly always the same.  Antialiased strokes of smooth data
+                look the same, while those of noisy data, whose zigzags
+                overlap to fill each column, can be lighter.
+
+                By default, only solid lines with more than
+                lines_decimation_density points for each pixel column they
+                span are reduced.  When decimate is true, the points are
+                always reduced, even for dashed lines, whose dashes then
+                move.  When decimate is false, every point is drawn.
+
+                When break_on_nan is true, points which aren't finite are
+                left out and the line starts again from the next finite
+                point, so that gaps in the data are gaps in the line.
+                """
+                if decimate is None:
+                    _agg.GraphicsContextArray_decimated_lines(self, points,
+                        self.lines_decimation_density, break_on_nan)
+                elif decimate:
+                    _agg.GraphicsContextArray_decimated_lines(self, points,
+                                                              0.0, break_on_nan)
+                else:
+                    _agg.GraphicsContextArray_lines(self, points,
+                                                    break_on_nan)
+            %}
+            void lines(double* pts, int Npts, bool break_on_nan);
+            void decimated_lines(double* pts, int Npts, double min_density,
+                                 bool break_on_nan);
             void line_set(double* start, int Nstart, double* end, int Nend);
             void rect(kiva::rect_type &rect);
             void rect(double x, double y, double sx, double sy);
@@ -705,6 +876,17 @@ namespace kiva {
 
             void clear_clip_path();
             void clear(agg24::rgba& value=_clear_color);
+
+            // The rasterizing methods below only touch C++ state and buffers
+            // which are kept alive by their python wrappers, so the GIL is
+            // released while Agg does the work.  This lets several threads
+            // draw into separate GraphicsContextArrays at the same time.
+            %exception {
+                Py_BEGIN_ALLOW_THREADS
+                $action
+                Py_END_ALLOW_THREADS
+            }
+
             void stroke_path();
             void fill_path();
             void eof_fill_path();
@@ -738,31 +920,112 @@ namespace kiva {
             //int copy_image(kiva::graphics_context_base* img, int tx, int ty);
 
             %feature("shadow") draw_marker_at_points(double* pts,int Npts, int size,
-                                       agg24::marker_e type = agg24::marker_square)
+                                       agg24::marker_e type,
+                                       double* colors, int Ncolors,
+                                       double* sizes, int Nsizes)
             %{
-            def draw_marker_at_points(self, pts, size, kiva_marker_type):
+            def draw_marker_at_points(self, pts, size, kiva_marker_type,
+                                      colors=None, sizes=None,
+                                      stamp_tolerance=0.0):
+                """ Draw a marker at each of the points.
+
+                colors and sizes may give an RGBA color and a size for each
+                point, as arrays of shape (N, 4) and (N,).  A point's color
+                replaces the fill color, or the stroke color of markers
+                which are only stroked.  Circles are drawn for one size at a
+                time, so overlapping circles of different sizes may not be
+                drawn in the order of their points.
+
+                Returns 0 if the marker can't be drawn with the current
+                state, in which case nothing is drawn.
+                """
                 marker = kiva_marker_to_agg.get(kiva_marker_type, None)
                 if marker is None:
-                    success = 0
-                elif kiva_marker_type in (CIRCLE_MARKER,):
+                    return 0
+                pts, colors, sizes = _point_colors_and_sizes(pts, colors,
+                                                             sizes)
+                if kiva_marker_type in (CIRCLE_MARKER,):
                     # The kiva circle marker is rather jagged so lets
                     # use our own
                     path_func, mode = substitute_markers[kiva_marker_type]
-                    path = self.get_empty_path()
-                    path_func(path, size)
-                    success = _agg.GraphicsContextArray_draw_path_at_points(self, pts, path, mode)
+                    if sizes is None:
+                        groups = [(slice(None), (size,))]
+                    else:
+                        groups = _point_groups(sizes)
+                    for index, (size,) in groups:
+                        path = self.get_empty_path()
+                        path_func(path, size)
+                        success = self.draw_path_at_points(
+                            pts[index], path, mode,
+                            colors=None if colors is None else colors[index],
+                            stamp_tolerance=stamp_tolerance)
                 else:
-                    args = (self,pts,int(size),marker)
-                    success = _agg.GraphicsContextArray_draw_marker_at_points(self, pts,
-                                    int(size), marker)
+                    if colors is None:
+                        colors = zeros((0, 4))
+                    if sizes is None:
+                        sizes = zeros(0)
+                    success = _agg.GraphicsContextArray_draw_marker_at_points(
+                        self, pts, int(size), marker, colors, sizes)
                 return success
             %}
             int draw_marker_at_points(double* pts,int Npts, int size,
-                                       agg24::marker_e type = agg24::marker_square);
+                                       agg24::marker_e type,
+                                       double* colors, int Ncolors,
+                                       double* sizes, int Nsizes);
 
+            %feature("shadow") draw_path_at_points(double* pts,int Npts,
+                                  kiva::compiled_path& marker,
+                                  kiva::draw_mode_e mode,
+                                  double* colors, int Ncolors)
+            %{
+            def draw_path_at_points(self, pts, path, mode, colors=None,
+                                    stamp_tolerance=0.0):
+                """ Draw a path at each of the points.
+
+                colors may give an RGBA color for each point, as an array of
+                shape (N, 4).  A point's color replaces the fill color, or
+                the stroke color when the mode doesn't fill.
+
+                With a stamp_tolerance greater than 0, each marker may be
+                moved by up to that many pixels, so that the path only has
+                to be rasterized once for a few subpixel offsets.  Smaller
+                tolerances need more offsets, and below 1/16 of a pixel the
+                path is drawn exactly.
+                """
+                pts, colors, _ = _point_colors_and_sizes(pts, colors)
+                if stamp_tolerance > 0:
+                    self.stamp_path_at_points(pts, path, mode,
+                                              stamp_tolerance, colors)
+                else:
+                    if colors is None:
+                        colors = zeros((0, 4))
+                    _agg.GraphicsContextArray_draw_path_at_points(self, pts,
+                        path, mode, colors)
+            %}
             void draw_path_at_points(double* pts,int Npts,
                                   kiva::compiled_path& marker,
-                                  kiva::draw_mode_e mode);
+                                  kiva::draw_mode_e mode,
+                                  double* colors, int Ncolors);
+
+            %feature("shadow") stamp_path_at_points(double* pts, int Npts,
+                                     kiva::compiled_path& marker,
+                                     kiva::draw_mode_e mode, double tolerance,
+                                     double* colors, int Ncolors)
+            %{
+            def stamp_path_at_points(self, pts, path, mode, tolerance,
+                                     colors=None):
+                pts, colors, _ = _point_colors_and_sizes(pts, colors)
+                if colors is None:
+                    colors = zeros((0, 4))
+                return _agg.GraphicsContextArray_stamp_path_at_points(self,
+                    pts, path, mode, tolerance, colors)
+            %}
+            int stamp_path_at_points(double* pts, int Npts,
+                                     kiva::compiled_path& marker,
+                                     kiva::draw_mode_e mode, double tolerance,
+                                     double* colors, int Ncolors);
+
+            %exception;  // clear exception handlers
 
             // additional methods added as pure python
             %pythoncode
@@ -770,41 +1033,24 @@ namespace kiva {
             def convert_pixel_format(self,pix_format,inplace=0):
                 """ Convert gc from one pixel format to another.
 
-                    !! This used to be done in C++ code, but difficult-to-find
-                    !! memory bugs pushed toward a simpler solution.
-                    !! HACK
-                    !! Now we just draw into a new gc and assume its underlying C++
-                    !! object. We must be careful not to add any attributes in the
-                    !! Python GraphicsContextArray constructor other than the bmp_array.
-                    !! if we do, we need to copy them here also.
+                    The pixels are converted by `convert_pixels`, so the
+                    colors and alpha are copied exactly rather than drawn
+                    into the new format.  With inplace, the gc takes on the
+                    new format itself, reusing its array when both formats
+                    have the same number of bytes per pixel.
                 """
                 # make sure it uses sub-class if needed
-                new_img = self.__class__((self.width(),self.height()),
-                                          pix_format=pix_format,
-                                          interpolation=self.get_image_interpolation(),
-                                          bottom_up = self.bottom_up())
-                new_img.draw_image(self)
-
-                if inplace:
-                    """
-                    # swap internals with new_self -- it will dealloc our (now unused) C++
-                    # object and we'll acquire its new one.  We also get a ref to his bmp_array
-                    """
-                    old_this = self.this
-                    self.this = new_img.this
-                    new_img.this = old_this
-                    self.bmp_array = new_img.bmp_array
-                    return self
-                else:
-                    return new_img
+                return _convert_graphics_context(self, pix_format, inplace,
+                                                 self.__class__)
 
             def get_empty_path(self):
                 return CompiledPath()
 
             def save(self, filename, file_format=None, pil_options=None):
                 """ Save the GraphicsContext to a file.  Output files are always
-                    saved in RGB or RGBA format; if this GC is not in one of
-                    these formats, it is automatically converted.
+                    saved in RGB or RGBA format, or in grayscale for gray8; if
+                    this GC is not in one of these formats, it is
+                    automatically converted.
 
                     If filename includes an extension, the image format is
                     inferred from it.  file_format is only required if the
@@ -819,37 +1065,18 @@ namespace kiva {
                     doesn't recognize an option, it is silently ignored.
 
                     If the image has an alpha channel and the specified output
-                    file format does not support alpha, the image is saved in
-                    rgb24 format.
+                    file format does not support alpha, the image is
+                    composited onto white and saved in rgb24 format.  Formats
+                    which support alpha, such as PNG, keep the transparency
+                    of the image.
+
+                    The pixels are passed to PIL without copying them where
+                    the output keeps the alpha channel, and PIL writes to
+                    file-like objects as it encodes.
                 """
-                FmtsWithoutAlpha = ('jpg', 'bmp', 'eps', "jpeg")
-                size = (self.width(), self.height())
-                fmt = self.format()
-
-                # determine the output pixel format and PIL format
-                if fmt.endswith("32"):
-                    pilformat = "RGBA"
-                    pixelformat = "rgba32"
-                    if (isinstance(filename, six.string_types) and filename[-3:].lower() in FmtsWithoutAlpha) or \
-                       (file_format is not None and file_format.lower() in FmtsWithoutAlpha):
-                        pilformat = "RGB"
-                        pixelformat = "rgb24"
-                elif fmt.endswith("24"):
-                    pilformat = "RGB"
-                    pixelformat = "rgb24"
-
-                # perform a conversion if necessary
-                if fmt != pixelformat:
-                    newimg = GraphicsContextArray(size, fmt)
-                    newimg.draw_image(self)
-                    newimg.convert_pixel_format(pixelformat, 1)
-                    bmp = newimg.bmp_array
-                else:
-                    bmp = self.bmp_array
-
                 from kiva import compat
-                img = compat.pilfromstring(pilformat, size, bmp.tostring())
-                img.save(filename, format=file_format, options=pil_options)
+                compat.save_pixels(self.bmp_array, self.format(), filename,
+                                   file_format, pil_options)
 
 
             #----------------------------------------------------------------
@@ -929,22 +1156,107 @@ class Image(GraphicsContextArray):
         #
         # This problem can be avoided altogether down the road when the
         # Image subclass is turned into a factory function.
-        new_img = GraphicsContextArray((self.width(),self.height()),
-                                  pix_format=pix_format,
-                                  interpolation=self.get_image_interpolation(),
-                                  bottom_up = self.bottom_up())
-        new_img.draw_image(self)
-
-        if inplace:
-            old_this = self.this
-            self.this = new_img.this
-            new_img.this = old_this
-            self.bmp_array = new_img.bmp_array
-            return self
-        else:
-            return new_img
+        return _convert_graphics_context(self, pix_format, inplace,
+                                         GraphicsContextArray)
 
 
+def _check_pixels(ary, pix_format, name):
+    """ Raise a ValueError unless ary can hold an image in pix_format.
+    """
+    depth = pix_format_bytes[pix_format]
+    if ary.dtype != dtype('uint8'):
+        raise ValueError("%s must be a uint8 array" % name)
+    if depth == 1:
+        if ary.ndim != 2:
+            raise ValueError("%s must be 2D for the %s format"
+                             % (name, pix_format))
+    elif ary.ndim != 3 or ary.shape[2] != depth:
+        raise ValueError("%s must have shape (height, width, %d) for the %s "
+                         "format" % (name, depth, pix_format))
+    if ary.strides[1] != depth or (ary.ndim == 3 and ary.strides[2] != 1):
+        raise ValueError("The pixels in each row of %s must be contiguous"
+                         % name)
+
+
+def convert_pixels(src, src_format, dst_format, out=None):
+    """ Convert an image array from one pixel format to another.
+
+    The channels of each pixel are copied to their places in the new format
+    without any blending, so conversions between the 32 bit formats keep the
+    alpha exactly.  Formats without alpha are read as opaque, gray8 is the
+    luminance of the colors, and rgb555 and rgb565 keep the high bits of
+    each channel, all as Agg's own pixel formats do.
+
+    Arrays in the gray8 format are 2D and the others have shape
+    (height, width, bytes per pixel).  The result is written to out when it
+    is given, which may be src itself if both formats have the same number
+    of bytes per pixel.  Returns the converted array.
+    """
+    src = numpy.asarray(src)
+    _check_pixels(src, src_format, "src")
+    height, width = src.shape[:2]
+    depth = pix_format_bytes[dst_format]
+    if out is None:
+        if depth == 1:
+            out = zeros((height, width), uint8)
+        else:
+            out = zeros((height, width, depth), uint8)
+    else:
+        _check_pixels(out, dst_format, "out")
+        if out.shape[:2] != src.shape[:2]:
+            raise ValueError("out must have the same width and height as src")
+        if numpy.may_share_memory(src, out) and not (
+                out.ctypes.data == src.ctypes.data and
+                out.strides[0] == src.strides[0] and
+                depth == pix_format_bytes[src_format]):
+            raise ValueError("out overlaps src, but is not the same pixels")
+
+    if not convert_pixel_array(src, pix_format_string_map[src_format],
+                               out, pix_format_string_map[dst_format]):
+        raise ValueError("Cannot convert from %s to %s"
+                         % (src_format, dst_format))
+    return out
+
+
+# The formats which a GraphicsContextArray can draw in.
+_gc_pix_formats = ("rgb24", "bgr24", "rgba32", "argb32", "abgr32", "bgra32")
+
+def _convert_graphics_context(gc, pix_format, inplace, klass):
+    """ Convert the pixels of gc to pix_format, in a new gc made by klass or
+    in gc itself with inplace.
+    """
+    if pix_format not in _gc_pix_formats:
+        raise ValueError("Graphics contexts cannot use the %s format"
+                         % pix_format)
+
+    interpolation = gc.get_image_interpolation()
+    bottom_up = gc.bottom_up()
+    old_format = gc.format()
+    if inplace and pix_format_bytes[pix_format] == pix_format_bytes[old_format]:
+        # Reorder the channels of our own array and wrap it in a gc of the
+        # new format.
+        convert_pixels(gc.bmp_array, old_format, pix_format, out=gc.bmp_array)
+        new_img = GraphicsContextArray(gc.bmp_array, pix_format=pix_format,
+                                       interpolation=interpolation,
+                                       bottom_up=bottom_up)
+    else:
+        new_img = klass((gc.width(), gc.height()), pix_format=pix_format,
+                        interpolation=interpolation, bottom_up=bottom_up)
+        convert_pixels(gc.bmp_array, old_format, pix_format,
+                       out=new_img.bmp_array)
+
+    if inplace:
+        # swap internals with new_img -- it will dealloc our (now unused)
+        # C++ object and we'll acquire its new one.  We also get a ref to
+        # its bmp_array.
+        old_this = gc.this
+        gc.this = new_img.this
+        new_img.this = old_this
+        gc.bmp_array = new_img.bmp_array
+        return gc
+    else:
+        return new_img
+
 %}
 
 
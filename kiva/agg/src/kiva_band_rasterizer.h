@@ -0,0 +1,225 @@
+#ifndef KIVA_BAND_RASTERIZER_H
+#define KIVA_BAND_RASTERIZER_H
+
+#include <vector>
+
+#include "agg_basics.h"
+#include "agg_rasterizer_scanline_aa.h"
+#include "agg_renderer_scanline.h"
+#include "agg_span_allocator.h"
+
+namespace kiva
+{
+    // Bands are never made shorter than this many rows, so that the work
+    // of each band outweighs the cost of handing it to a worker thread.
+    const int min_band_rows = 64;
+
+    // Returns the number of bands that the given number of rows should be
+    // split into when rendering with up to max_bands threads.
+    inline int band_count(int rows, int max_bands)
+    {
+        int bands = rows / min_band_rows;
+        if (bands > max_bands)
+            bands = max_bands;
+        return bands < 1 ? 1 : bands;
+    }
+
+    //---------------------------------------------------------------------
+    // The edges of a path, in the subpixel coordinates of Agg's scanline
+    // rasterizer.
+    //
+    // add_path() closes polygons and rounds vertices exactly the way
+    // rasterizer_scanline_aa::add_path() does, so adding all of the edges
+    // to a rasterizer gives the same cells as adding the path.  A cell only
+    // depends on the edges which cross its row, so a rasterizer which is
+    // only given the edges crossing a band of rows produces the same
+    // scanlines within that band.  This is what lets several threads render
+    // horizontal bands of the same path.
+    //---------------------------------------------------------------------
+    class edge_list
+    {
+        public:
+            struct edge
+            {
+                int x1;
+                int y1;
+                int x2;
+                int y2;
+            };
+
+            edge_list():
+                _start_x(0), _start_y(0), _x(0), _y(0), _has_line(false),
+                _min_row(0), _max_row(-1)
+            {
+            }
+
+            template<class VertexSource>
+            void add_path(VertexSource& vs, unsigned path_id=0)
+            {
+                double x;
+                double y;
+                unsigned cmd;
+
+                vs.rewind(path_id);
+                while(!agg24::is_stop(cmd = vs.vertex(&x, &y)))
+                {
+                    if (agg24::is_move_to(cmd))
+                    {
+                        this->_close();
+                        this->_start_x = this->_x = _upscale(x);
+                        this->_start_y = this->_y = _upscale(y);
+                    }
+                    else if (agg24::is_vertex(cmd))
+                    {
+                        this->_line_to(_upscale(x), _upscale(y));
+                    }
+                    else if (agg24::is_close(cmd))
+                    {
+                        this->_close();
+                    }
+                }
+                this->_close();
+            }
+
+            bool empty() const { return this->_edges.empty(); }
+
+            // The first and last rows of pixels touched by the edges.
+            int min_row() const { return this->_min_row; }
+            int max_row() const { return this->_max_row; }
+
+            // Adds the edges which touch rows row1 to row2 to a rasterizer.
+            template<class Rasterizer>
+            void add_band(Rasterizer& ras, int row1, int row2) const
+            {
+                std::vector<edge>::const_iterator it;
+                for (it = this->_edges.begin(); it != this->_edges.end(); ++it)
+                {
+                    int top = (it->y1 < it->y2 ? it->y1 : it->y2) >> agg24::poly_subpixel_shift;
+                    int bottom = (it->y1 < it->y2 ? it->y2 : it->y1) >> agg24::poly_subpixel_shift;
+                    if (bottom >= row1 && top <= row2)
+                    {
+                        ras.edge(it->x1, it->y1, it->x2, it->y2);
+                    }
+                }
+            }
+
+        private:
+            static int _upscale(double v)
+            {
+                return agg24::iround(v * agg24::poly_subpixel_scale);
+            }
+
+            void _line_to(int x, int y)
+            {
+                edge e = {this->_x, this->_y, x, y};
+                this->_edges.push_back(e);
+                this->_has_line = true;
+                this->_x = x;
+                this->_y = y;
+
+                int top = (e.y1 < e.y2 ? e.y1 : e.y2) >> agg24::poly_subpixel_shift;
+                int bottom = (e.y1 < e.y2 ? e.y2 : e.y1) >> agg24::poly_subpixel_shift;
+                if (this->_min_row > this->_max_row)
+                {
+                    this->_min_row = top;
+                    this->_max_row = bottom;
+                }
+                else
+                {
+                    if (top < this->_min_row) this->_min_row = top;
+                    if (bottom > this->_max_row) this->_max_row = bottom;
+                }
+            }
+
+            // Like the rasterizer, closes the current polygon if a line has
+            // been drawn since the last move_to or close.
+            void _close()
+            {
+                if (this->_has_line)
+                {
+                    this->_line_to(this->_start_x, this->_start_y);
+                    this->_has_line = false;
+                }
+            }
+
+            std::vector<edge> _edges;
+            int _start_x;
+            int _start_y;
+            int _x;
+            int _y;
+            bool _has_line;
+            int _min_row;
+            int _max_row;
+    };
+
+    //---------------------------------------------------------------------
+    // A scanline renderer for image spans which owns its span allocator and
+    // copies of the image source and interpolator, since those keep the
+    // state of the span being generated.  Copies are independent after
+    // being attached to a renderer, so each band's thread can have one.
+    //---------------------------------------------------------------------
+    template<class base_renderer_type, class span_gen_type>
+    class span_band_renderer
+    {
+        typedef typename span_gen_type::source_type source_type;
+        typedef typename span_gen_type::interpolator_type interpolator_type;
+        typedef agg24::span_allocator<typename span_gen_type::color_type> allocator_type;
+
+        public:
+            typedef base_renderer_type base_ren_type;
+
+            span_band_renderer(span_gen_type& span_generator):
+                _span_generator(span_generator),
+                _source(span_generator.source()),
+                _interpolator(span_generator.interpolator())
+            {
+            }
+
+            void attach(base_renderer_type& ren)
+            {
+                this->_span_generator.attach(this->_source);
+                this->_span_generator.interpolator(this->_interpolator);
+                this->_renderer.attach(ren, this->_allocator,
+                                       this->_span_generator);
+            }
+
+            void prepare() { this->_renderer.prepare(); }
+
+            template<class Scanline> void render(const Scanline& sl)
+            {
+                this->_renderer.render(sl);
+            }
+
+        private:
+            span_gen_type _span_generator;
+            source_type _source;
+            interpolator_type _interpolator;
+            allocator_type _allocator;
+            agg24::renderer_scanline_aa<base_renderer_type, allocator_type,
+                                        span_gen_type> _renderer;
+    };
+
+    // Renders the scanlines of rows row1 to row2 from a rasterizer.  This is
+    // agg24::render_scanlines() limited to a band of rows.
+    template<class Rasterizer, class Scanline, class Renderer>
+    void render_scanline_band(Rasterizer& ras, Scanline& sl, Renderer& ren,
+                              int row1, int row2)
+    {
+        ras.sort();
+        if (ras.max_y() < row1 || ras.min_y() > row2)
+        {
+            return;
+        }
+        if (ras.navigate_scanline(row1 > ras.min_y() ? row1 : ras.min_y()))
+        {
+            sl.reset(ras.min_x(), ras.max_x());
+            ren.prepare();
+            while (ras.sweep_scanline(sl) && sl.y() <= row2)
+            {
+                ren.render(sl);
+            }
+        }
+    }
+}
+
+#endif /* KIVA_BAND_RASTERIZER_H */
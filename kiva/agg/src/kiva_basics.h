@@ -39,6 +39,12 @@ namespace kiva
         else return b;
     }
 
+    // False for NaN and infinite values.
+    inline bool is_finite(double v)
+    {
+        return v - v == 0.0;
+    }
+
     inline unsigned int quadrant(double x, double y)
     {
         if (x>=0)
@@ -3,6 +3,7 @@
 #include "kiva_basics.h"
 #include <math.h>
 #include <assert.h>
+#include <algorithm>
 
 using namespace kiva;
 
@@ -210,6 +211,153 @@ void compiled_path::lines(double* pts, int Npts)
         this->line_to(pts[i],pts[i+1]);
 }
 
+void compiled_path::lines(double* pts, int Npts, bool break_on_nan)
+{
+    if (!break_on_nan)
+    {
+        this->lines(pts, Npts);
+        return;
+    }
+
+    bool pen_down = false;
+    for (int i = 0; i < Npts*2; i+=2)
+    {
+        if (!is_finite(pts[i]) || !is_finite(pts[i+1]))
+        {
+            pen_down = false;
+        }
+        else if (pen_down)
+        {
+            this->line_to(pts[i], pts[i+1]);
+        }
+        else
+        {
+            this->move_to(pts[i], pts[i+1]);
+            pen_down = true;
+        }
+    }
+}
+
+void compiled_path::decimated_lines(double* pts, int Npts,
+                                    double min_density, bool break_on_nan)
+{
+    if (Npts <= 0)
+        return;
+
+    // Find the device columns which the points span.
+    double min_x = 0.0, max_x = -1.0;
+    for (int i = 0; i < Npts*2; i+=2)
+    {
+        double x = pts[i], y = pts[i+1];
+        this->ptm.transform(&x, &y);
+        if (!is_finite(x) || !is_finite(y))
+            continue;
+        if (min_x > max_x)
+        {
+            min_x = max_x = x;
+        }
+        else
+        {
+            min_x = std::min(min_x, x);
+            max_x = std::max(max_x, x);
+        }
+    }
+    double columns = floor(max_x) - floor(min_x) + 1.0;
+    if (min_x > max_x || Npts <= min_density * columns)
+    {
+        this->lines(pts, Npts, break_on_nan);
+        return;
+    }
+
+    // The points of the current run, which all lie in one column.  Its
+    // first point has already been added.
+    double run_column = 0.0;
+    int run_length = 0;
+    int low = 0, high = 0, last = 0;
+    double low_x = 0.0, low_y = 0.0, high_x = 0.0, high_y = 0.0;
+    double last_x = 0.0, last_y = 0.0;
+    bool pen_down = false;
+
+    for (int i = 0; i <= Npts; i++)
+    {
+        double x = 0.0, y = 0.0, column = 0.0;
+        bool finite = false;
+        if (i < Npts)
+        {
+            x = pts[2*i];
+            y = pts[2*i+1];
+            this->ptm.transform(&x, &y);
+            finite = is_finite(x) && is_finite(y);
+            column = floor(x);
+        }
+
+        if (run_length > 0 && finite && column == run_column)
+        {
+            if (y < low_y)
+            {
+                low = i;
+                low_x = x;
+                low_y = y;
+            }
+            if (y > high_y)
+            {
+                high = i;
+                high_x = x;
+                high_y = y;
+            }
+            last = i;
+            last_x = x;
+            last_y = y;
+            run_length++;
+            continue;
+        }
+
+        // Finish the current run with its extremes, in the order of the
+        // points, and then its last point.
+        if (run_length > 1)
+        {
+            int first = last - run_length + 1;
+            bool low_first = low < high;
+            for (int k = 0; k < 2; k++)
+            {
+                bool is_low = (k == 0) == low_first;
+                int index = is_low ? low : high;
+                if (index != first && index != last)
+                {
+                    this->base::line_to(is_low ? low_x : high_x,
+                                        is_low ? low_y : high_y);
+                }
+            }
+            this->base::line_to(last_x, last_y);
+        }
+        run_length = 0;
+        if (i == Npts)
+            break;
+
+        // Points which aren't finite are added as they are, unless they
+        // break the line.
+        if (!finite && break_on_nan)
+        {
+            pen_down = false;
+            continue;
+        }
+        if (pen_down)
+            this->base::line_to(x, y);
+        else
+            this->base::move_to(x, y);
+        pen_down = true;
+
+        if (finite)
+        {
+            run_column = column;
+            run_length = 1;
+            low = high = last = i;
+            low_x = high_x = last_x = x;
+            low_y = high_y = last_y = y;
+        }
+    }
+}
+
 void compiled_path::line_set(double* start, int Nstart, double* end, int Nend)
 {
     int num_pts = (Nstart > Nend) ? Nend : Nstart;
@@ -98,6 +98,17 @@ namespace kiva
 
             void add_path(compiled_path& other_path);
             void lines(double* pts, int Npts);
+            // With break_on_nan, points which aren't finite are left out and
+            // the line starts again from the next finite point.
+            void lines(double* pts, int Npts, bool break_on_nan);
+            // Adds a polyline through the points like lines(), but reduces
+            // each run of points in the same device pixel column to the
+            // first, lowest, highest and last of them, which outline nearly
+            // everything that stroking the run draws.  The points are only
+            // reduced if there are more than min_density of them for each
+            // pixel column that they span.
+            void decimated_lines(double* pts, int Npts, double min_density,
+                                 bool break_on_nan=false);
             void line_set(double* start, int Nstart, double* end, int Nend);
             void rect(double x, double y, double sx, double sy);
             void rect(kiva::rect_type &rect);
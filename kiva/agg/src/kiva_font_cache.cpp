@@ -0,0 +1,355 @@
+#ifdef _WIN32 // Win32 threads
+    #include <windows.h>
+#else        // POSIX threads
+    #include <pthread.h>
+#endif
+
+#include "kiva_font_cache.h"
+
+using namespace kiva;
+
+// The number of memoized text extents kept for each font.  The memo is
+// simply dropped when it fills up.
+static const unsigned max_text_extents = 262144;
+
+//---------------------------------------------------------------------
+// font_cache_key
+//---------------------------------------------------------------------
+
+font_cache_key::font_cache_key(const std::string& _filename,
+                               unsigned _face_index, int _size,
+                               bool _hinting):
+                               filename(_filename), face_index(_face_index),
+                               size(_size), hinting(_hinting)
+{
+}
+
+bool font_cache_key::operator<(const font_cache_key& other) const
+{
+    if (this->size != other.size)
+        return this->size < other.size;
+    if (this->face_index != other.face_index)
+        return this->face_index < other.face_index;
+    if (this->hinting != other.hinting)
+        return this->hinting < other.hinting;
+    return this->filename < other.filename;
+}
+
+
+//---------------------------------------------------------------------
+// font_cache_entry
+//---------------------------------------------------------------------
+
+// Each entry only ever holds a single face.
+font_cache_entry::font_cache_entry(const font_cache_key& _key):
+                                   key(_key),
+#ifdef KIVA_USE_FREETYPE
+                                   engine(1),
+#endif
+                                   manager(engine),
+                                   _is_loaded(false),
+                                   _transform()
+{
+#ifdef KIVA_USE_FREETYPE
+    this->_is_loaded = this->engine.load_font(key.filename.c_str(),
+                                              key.face_index,
+                                              agg24::glyph_ren_agg_gray8);
+#endif
+
+#ifdef KIVA_USE_WIN32
+    this->_is_loaded = this->engine.create_font(key.filename.c_str(),
+                                                agg24::glyph_ren_native_gray8,
+                                                key.size);
+#endif
+
+    this->engine.hinting(key.hinting);
+    this->engine.resolution(72);
+    this->engine.height(key.size);
+    this->engine.width(key.size);
+}
+
+void font_cache_entry::transform(const agg24::trans_affine& mtx)
+{
+    if (!this->_transform.is_equal(mtx, 0.0))
+    {
+        this->_transform = mtx;
+        this->engine.transform(mtx);
+    }
+}
+
+const kiva::rect_type* font_cache_entry::find_text_extent(const std::string& text) const
+{
+    text_extent_map::const_iterator found = this->_text_extents.find(text);
+    if (found == this->_text_extents.end())
+    {
+        return NULL;
+    }
+    return &found->second;
+}
+
+void font_cache_entry::store_text_extent(const std::string& text,
+                                         const kiva::rect_type& extent)
+{
+    if (this->_text_extents.size() >= max_text_extents)
+    {
+        this->_text_extents.clear();
+    }
+    this->_text_extents[text] = extent;
+}
+
+
+glyph_mask* font_cache_entry::make_glyph_mask(const agg24::glyph_cache* glyph)
+{
+    typedef font_manager_type::gray8_adaptor_type adaptor_type;
+    typedef font_manager_type::gray8_scanline_type scanline_type;
+
+    glyph_mask* mask = new glyph_mask(glyph->glyph_index, glyph->advance_x,
+                                      glyph->advance_y);
+
+    this->manager.init_embedded_adaptors(glyph, 0.0, 0.0);
+    adaptor_type& adaptor = this->manager.gray8_adaptor();
+    scanline_type& scanline = this->manager.gray8_scanline();
+    if (glyph->data_type != agg24::glyph_data_gray8 ||
+        !adaptor.rewind_scanlines())
+    {
+        return mask;
+    }
+
+    scanline.reset(adaptor.min_x(), adaptor.max_x());
+    while (adaptor.sweep_scanline(scanline))
+    {
+        unsigned num_spans = scanline.num_spans();
+        scanline_type::const_iterator span = scanline.begin();
+        for (;;)
+        {
+            glyph_mask::span mask_span;
+            mask_span.x = span->x;
+            mask_span.y = scanline.y();
+            mask_span.len = span->len;
+            mask_span.start = (unsigned)mask->covers.size();
+            int cover_count = (span->len < 0) ? 1 : span->len;
+            mask->covers.insert(mask->covers.end(), span->covers,
+                                span->covers + cover_count);
+            mask->spans.push_back(mask_span);
+
+            // Stepping past the last span would read beyond the glyph data.
+            if (--num_spans == 0)
+            {
+                break;
+            }
+            ++span;
+        }
+    }
+    return mask;
+}
+
+
+//---------------------------------------------------------------------
+// font_cache
+//---------------------------------------------------------------------
+
+font_cache::font_cache(unsigned capacity):
+                       _capacity(capacity > 0 ? capacity : 1),
+                       _hits(0), _misses(0)
+{
+}
+
+font_cache::~font_cache()
+{
+    this->clear();
+}
+
+font_cache_entry* font_cache::get(const font_type& font)
+{
+    // The font's filename is only set when it was resolved by the python
+    // font manager; otherwise, the name is treated as a path.
+    const std::string& filename = (font.filename != "") ? font.filename
+                                                        : font.name;
+    font_cache_key key(filename, 0, font.size, true);
+
+    index_type::iterator found = this->_index.find(key);
+    if (found != this->_index.end())
+    {
+        ++this->_hits;
+        lru_list_type::iterator item = found->second;
+        if (item != this->_entries.begin())
+        {
+            this->_entries.splice(this->_entries.begin(), this->_entries,
+                                  item);
+        }
+        return item->second;
+    }
+
+    ++this->_misses;
+    if (this->_entries.size() >= this->_capacity)
+    {
+        this->_evict(this->_entries.size() - this->_capacity + 1);
+    }
+
+    font_cache_entry* entry = new font_cache_entry(key);
+    this->_entries.push_front(item_type(key, entry));
+    this->_index[key] = this->_entries.begin();
+    return entry;
+}
+
+void font_cache::set_capacity(unsigned capacity)
+{
+    this->_capacity = (capacity > 0 ? capacity : 1);
+    if (this->_entries.size() > this->_capacity)
+    {
+        this->_evict(this->_entries.size() - this->_capacity);
+    }
+}
+
+void font_cache::reset_stats()
+{
+    this->_hits = 0;
+    this->_misses = 0;
+}
+
+void font_cache::clear()
+{
+    this->_evict(this->_entries.size());
+}
+
+void font_cache::_evict(unsigned count)
+{
+    for (unsigned i = 0; i < count && !this->_entries.empty(); ++i)
+    {
+        item_type& oldest = this->_entries.back();
+        this->_index.erase(oldest.first);
+        delete oldest.second;
+        this->_entries.pop_back();
+    }
+}
+
+
+//---------------------------------------------------------------------
+// Per-thread caches
+//
+// FreeType faces and the Agg font engines built on them must not be used
+// from more than one thread at a time, so rather than sharing a single
+// cache behind a lock, each thread lazily creates its own.  The cache is
+// deleted when the thread exits.
+//---------------------------------------------------------------------
+
+static void _delete_font_cache(void* cache)
+{
+    delete static_cast<font_cache*>(cache);
+}
+
+// Win32 threads
+#ifdef _WIN32
+
+static DWORD gFontCacheIndex = FLS_OUT_OF_INDEXES;
+static INIT_ONCE gFontCacheIndexOnce = INIT_ONCE_STATIC_INIT;
+
+static VOID WINAPI _delete_font_cache_callback(PVOID cache)
+{
+    _delete_font_cache(cache);
+}
+
+static BOOL CALLBACK _create_font_cache_index(PINIT_ONCE, PVOID, PVOID*)
+{
+    gFontCacheIndex = FlsAlloc(_delete_font_cache_callback);
+    return TRUE;
+}
+
+static font_cache* _get_thread_font_cache()
+{
+    InitOnceExecuteOnce(&gFontCacheIndexOnce, _create_font_cache_index,
+                        NULL, NULL);
+    return static_cast<font_cache*>(FlsGetValue(gFontCacheIndex));
+}
+
+static void _set_thread_font_cache(font_cache* cache)
+{
+    FlsSetValue(gFontCacheIndex, cache);
+}
+
+// POSIX threads
+#else
+
+static pthread_key_t gFontCacheKey;
+static pthread_once_t gFontCacheKeyOnce = PTHREAD_ONCE_INIT;
+
+static void _create_font_cache_key()
+{
+    pthread_key_create(&gFontCacheKey, _delete_font_cache);
+}
+
+static font_cache* _get_thread_font_cache()
+{
+    pthread_once(&gFontCacheKeyOnce, _create_font_cache_key);
+    return static_cast<font_cache*>(pthread_getspecific(gFontCacheKey));
+}
+
+static void _set_thread_font_cache(font_cache* cache)
+{
+    pthread_setspecific(gFontCacheKey, cache);
+}
+
+#endif  // _WIN32
+
+font_cache* kiva::ThreadFontCache()
+{
+    font_cache* cache = _get_thread_font_cache();
+    if (cache == NULL)
+    {
+        cache = new font_cache();
+        _set_thread_font_cache(cache);
+    }
+    return cache;
+}
+
+glyph_atlas* kiva::ThreadGlyphAtlas()
+{
+    return ThreadFontCache()->atlas();
+}
+
+void kiva::cleanup_font_threading_primitives()
+{
+    // Release the calling thread's cache now rather than relying on the
+    // thread exit hook, which does not run for the main thread.
+    font_cache* cache = _get_thread_font_cache();
+    if (cache != NULL)
+    {
+        _set_thread_font_cache(NULL);
+        _delete_font_cache(cache);
+    }
+}
+
+unsigned long kiva::font_cache_hits()
+{
+    return ThreadFontCache()->hits();
+}
+
+unsigned long kiva::font_cache_misses()
+{
+    return ThreadFontCache()->misses();
+}
+
+unsigned kiva::font_cache_size()
+{
+    return ThreadFontCache()->size();
+}
+
+unsigned kiva::font_cache_capacity()
+{
+    return ThreadFontCache()->capacity();
+}
+
+void kiva::set_font_cache_capacity(unsigned capacity)
+{
+    ThreadFontCache()->set_capacity(capacity);
+}
+
+void kiva::reset_font_cache_stats()
+{
+    ThreadFontCache()->reset_stats();
+}
+
+void kiva::clear_font_cache()
+{
+    ThreadFontCache()->clear();
+}
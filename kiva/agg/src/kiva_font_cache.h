@@ -0,0 +1,180 @@
+#ifndef KIVA_FONT_CACHE_H
+#define KIVA_FONT_CACHE_H
+
+#define KIVA_USE_FREETYPE
+#ifdef KIVA_USE_FREETYPE
+#include "agg_font_freetype.h"
+#endif
+#ifdef KIVA_USE_WIN32
+#include "agg_font_win32_tt.h"
+#endif
+
+#include <list>
+#include <map>
+#include <string>
+#include <unordered_map>
+
+#include "agg_font_cache_manager.h"
+#include "agg_trans_affine.h"
+
+#include "kiva_font_type.h"
+#include "kiva_glyph_atlas.h"
+#include "kiva_rect.h"
+
+namespace kiva
+{
+
+// Visual Studio 2008 (used for python 2.7) only ships the TR1 hash map.
+#if defined(_MSC_VER) && _MSC_VER < 1600
+    using std::tr1::unordered_map;
+#else
+    using std::unordered_map;
+#endif
+
+#ifdef KIVA_USE_FREETYPE
+    typedef agg24::font_engine_freetype_int32 font_engine_type;
+#endif
+#ifdef KIVA_USE_WIN32
+    typedef agg24::font_engine_win32_tt_int32 font_engine_type;
+#endif
+    typedef agg24::font_cache_manager<font_engine_type> font_manager_type;
+
+    //---------------------------------------------------------------------
+    // Identifies a fully configured font engine.  Two fonts which map to
+    // the same key can share an engine and its glyph cache.
+    //---------------------------------------------------------------------
+    class font_cache_key
+    {
+        public:
+            std::string filename;
+            unsigned face_index;
+            int size;
+            bool hinting;
+
+            font_cache_key(const std::string& _filename,
+                           unsigned _face_index,
+                           int _size,
+                           bool _hinting);
+
+            bool operator<(const font_cache_key& other) const;
+    };
+
+    //---------------------------------------------------------------------
+    // A font engine which has been loaded and sized once, along with the
+    // glyph cache manager that sits on top of it.
+    //---------------------------------------------------------------------
+    class font_cache_entry
+    {
+        public:
+            font_cache_key key;
+            font_engine_type engine;
+            font_manager_type manager;
+
+            font_cache_entry(const font_cache_key& _key);
+
+            // Returns false if FreeType was unable to load the face.
+            bool is_loaded() const { return _is_loaded; }
+
+            // Set the per-glyph transform of the engine.  This is a no-op
+            // when the transform has not changed since the last call, which
+            // keeps the glyph cache manager from resynchronizing.
+            void transform(const agg24::trans_affine& mtx);
+
+            // The extents of strings measured with this font are memoized,
+            // since the same labels tend to be measured over and over.
+            // find_text_extent() returns NULL for strings which haven't
+            // been measured yet.
+            const kiva::rect_type* find_text_extent(const std::string& text) const;
+            void store_text_extent(const std::string& text,
+                                   const kiva::rect_type& extent);
+
+            // Copies the coverage of a glyph returned by the manager into
+            // a new mask for the glyph atlas.
+            glyph_mask* make_glyph_mask(const agg24::glyph_cache* glyph);
+
+        private:
+            typedef unordered_map<std::string, kiva::rect_type> text_extent_map;
+
+            bool _is_loaded;
+            agg24::trans_affine _transform;
+            text_extent_map _text_extents;
+
+            // entries own FreeType resources and can't be copied.
+            font_cache_entry(const font_cache_entry&);
+            const font_cache_entry& operator=(const font_cache_entry&);
+    };
+
+    //---------------------------------------------------------------------
+    // A least-recently-used cache of font_cache_entry objects.
+    //
+    // Looking up a font which is already in the cache returns the engine
+    // as it was left, so faces are only reloaded (and resized) when the
+    // requested font actually changes.
+    //---------------------------------------------------------------------
+    class font_cache
+    {
+        public:
+            font_cache(unsigned capacity=32);
+            ~font_cache();
+
+            // Returns the entry for the given font, loading it if needed.
+            // The entry remains valid until the next call to get() or
+            // clear() on this cache.
+            font_cache_entry* get(const font_type& font);
+
+            unsigned capacity() const { return _capacity; }
+            void set_capacity(unsigned capacity);
+            unsigned size() const { return (unsigned)_entries.size(); }
+
+            unsigned long hits() const { return _hits; }
+            unsigned long misses() const { return _misses; }
+            void reset_stats();
+
+            // Drop every cached entry.
+            void clear();
+
+            // The glyph masks rendered from this thread's fonts.
+            glyph_atlas* atlas() { return &this->_atlas; }
+
+        private:
+            typedef std::pair<font_cache_key, font_cache_entry*> item_type;
+            typedef std::list<item_type> lru_list_type;
+            typedef std::map<font_cache_key, lru_list_type::iterator> index_type;
+
+            // Most recently used entries are at the front of the list.
+            lru_list_type _entries;
+            index_type _index;
+            unsigned _capacity;
+            unsigned long _hits;
+            unsigned long _misses;
+            glyph_atlas _atlas;
+
+            void _evict(unsigned count);
+
+            font_cache(const font_cache&);
+            const font_cache& operator=(const font_cache&);
+    };
+
+    // Returns the font cache belonging to the calling thread.  Font engines
+    // are never shared between threads, so graphics contexts which are
+    // drawn from different threads don't contend for them.
+    font_cache* ThreadFontCache();
+
+    // Releases the calling thread's font cache.  Registered with atexit
+    // from python.
+    void cleanup_font_threading_primitives();
+
+    //---------------------------------------------------------------------
+    // Functions exposed to python for inspecting the calling thread's font
+    // cache.
+    //---------------------------------------------------------------------
+    unsigned long font_cache_hits();
+    unsigned long font_cache_misses();
+    unsigned font_cache_size();
+    unsigned font_cache_capacity();
+    void set_font_cache_capacity(unsigned capacity);
+    void reset_font_cache_stats();
+    void clear_font_cache();
+}
+
+#endif /* KIVA_FONT_CACHE_H */
@@ -0,0 +1,221 @@
+#include "kiva_glyph_atlas.h"
+
+using namespace kiva;
+
+// The linear part of glyph transforms is rounded to multiples of
+// 1/matrix_buckets.  Rounding changes the size of a 12 point glyph by less
+// than a hundredth of a pixel.
+static const double matrix_buckets = 256.0;
+
+
+//---------------------------------------------------------------------
+// glyph_mask
+//---------------------------------------------------------------------
+
+glyph_mask::glyph_mask(unsigned _glyph_index, double _advance_x,
+                       double _advance_y):
+                       glyph_index(_glyph_index),
+                       advance_x(_advance_x), advance_y(_advance_y)
+{
+}
+
+unsigned long glyph_mask::byte_size() const
+{
+    return (unsigned long)(sizeof(glyph_mask) +
+                           this->spans.capacity() * sizeof(span) +
+                           this->covers.capacity());
+}
+
+
+//---------------------------------------------------------------------
+// glyph_atlas_key
+//---------------------------------------------------------------------
+
+glyph_atlas_key::glyph_atlas_key(const std::string& _filename, int _size,
+                                 const agg24::trans_affine& mtx):
+                                 filename(_filename), size(_size)
+{
+    this->matrix[0] = agg24::iround(mtx.sx * matrix_buckets);
+    this->matrix[1] = agg24::iround(mtx.shy * matrix_buckets);
+    this->matrix[2] = agg24::iround(mtx.shx * matrix_buckets);
+    this->matrix[3] = agg24::iround(mtx.sy * matrix_buckets);
+}
+
+agg24::trans_affine glyph_atlas_key::transform() const
+{
+    return agg24::trans_affine(this->matrix[0] / matrix_buckets,
+                               this->matrix[1] / matrix_buckets,
+                               this->matrix[2] / matrix_buckets,
+                               this->matrix[3] / matrix_buckets,
+                               0.0, 0.0);
+}
+
+bool glyph_atlas_key::operator<(const glyph_atlas_key& other) const
+{
+    if (this->size != other.size)
+        return this->size < other.size;
+    for (int i = 0; i < 4; i++)
+    {
+        if (this->matrix[i] != other.matrix[i])
+            return this->matrix[i] < other.matrix[i];
+    }
+    return this->filename < other.filename;
+}
+
+
+//---------------------------------------------------------------------
+// glyph_atlas
+//---------------------------------------------------------------------
+
+glyph_atlas::glyph_atlas(unsigned long byte_budget):
+                         _has_face(false), _byte_budget(byte_budget),
+                         _byte_size(0), _hits(0), _misses(0)
+{
+}
+
+glyph_atlas::~glyph_atlas()
+{
+    this->clear();
+}
+
+void glyph_atlas::select(const glyph_atlas_key& key)
+{
+    if (this->_has_face && !(this->_face->first < key) &&
+        !(key < this->_face->first))
+    {
+        return;
+    }
+
+    this->_face = this->_faces.find(key);
+    if (this->_face == this->_faces.end())
+    {
+        this->_face = this->_faces.insert(
+            face_index_type::value_type(key, glyph_index_type())).first;
+    }
+    this->_has_face = true;
+}
+
+const glyph_mask* glyph_atlas::find(unsigned glyph_code)
+{
+    glyph_index_type& glyphs = this->_face->second;
+    glyph_index_type::iterator found = glyphs.find(glyph_code);
+    if (found == glyphs.end())
+    {
+        ++this->_misses;
+        return NULL;
+    }
+
+    ++this->_hits;
+    lru_list_type::iterator item = found->second;
+    if (item != this->_glyphs.begin())
+    {
+        this->_glyphs.splice(this->_glyphs.begin(), this->_glyphs, item);
+    }
+    return item->mask;
+}
+
+const glyph_mask* glyph_atlas::insert(unsigned glyph_code, glyph_mask* mask)
+{
+    item_type item;
+    item.face = &this->_face->first;
+    item.glyph_code = glyph_code;
+    item.mask = mask;
+    this->_glyphs.push_front(item);
+    this->_face->second[glyph_code] = this->_glyphs.begin();
+    this->_byte_size += mask->byte_size();
+
+    this->_evict(this->_byte_budget);
+    return mask;
+}
+
+void glyph_atlas::set_byte_budget(unsigned long byte_budget)
+{
+    this->_byte_budget = byte_budget;
+    this->_evict(byte_budget);
+}
+
+void glyph_atlas::reset_stats()
+{
+    this->_hits = 0;
+    this->_misses = 0;
+}
+
+void glyph_atlas::clear()
+{
+    for (lru_list_type::iterator item = this->_glyphs.begin();
+         item != this->_glyphs.end(); ++item)
+    {
+        delete item->mask;
+    }
+    this->_glyphs.clear();
+    this->_faces.clear();
+    this->_has_face = false;
+    this->_byte_size = 0;
+}
+
+void glyph_atlas::_evict(unsigned long byte_budget)
+{
+    while (this->_byte_size > byte_budget && this->_glyphs.size() > 1)
+    {
+        item_type& oldest = this->_glyphs.back();
+        face_index_type::iterator face = this->_faces.find(*oldest.face);
+        face->second.erase(oldest.glyph_code);
+        if (face->second.empty())
+        {
+            if (this->_has_face && face == this->_face)
+            {
+                this->_has_face = false;
+            }
+            this->_faces.erase(face);
+        }
+
+        this->_byte_size -= oldest.mask->byte_size();
+        delete oldest.mask;
+        this->_glyphs.pop_back();
+    }
+}
+
+
+//---------------------------------------------------------------------
+// Functions exposed to python
+//---------------------------------------------------------------------
+
+unsigned long kiva::glyph_atlas_hits()
+{
+    return ThreadGlyphAtlas()->hits();
+}
+
+unsigned long kiva::glyph_atlas_misses()
+{
+    return ThreadGlyphAtlas()->misses();
+}
+
+unsigned kiva::glyph_atlas_size()
+{
+    return ThreadGlyphAtlas()->size();
+}
+
+unsigned long kiva::glyph_atlas_bytes()
+{
+    return ThreadGlyphAtlas()->byte_size();
+}
+
+unsigned long kiva::glyph_atlas_budget()
+{
+    return ThreadGlyphAtlas()->byte_budget();
+}
+
+void kiva::set_glyph_atlas_budget(unsigned long byte_budget)
+{
+    ThreadGlyphAtlas()->set_byte_budget(byte_budget);
+}
+
+void kiva::reset_glyph_atlas_stats()
+{
+    ThreadGlyphAtlas()->reset_stats();
+}
+
+void kiva::clear_glyph_atlas()
+{
+    ThreadGlyphAtlas()->clear();
+}
@@ -0,0 +1,156 @@
+#ifndef KIVA_GLYPH_ATLAS_H
+#define KIVA_GLYPH_ATLAS_H
+
+#include <list>
+#include <map>
+#include <string>
+#include <vector>
+
+#include "agg_basics.h"
+#include "agg_trans_affine.h"
+
+namespace kiva
+{
+    //---------------------------------------------------------------------
+    // The coverage mask of a rendered glyph.  The mask is stored as the
+    // horizontal spans of the glyph in device pixels, relative to the pixel
+    // the glyph's origin falls on.
+    //---------------------------------------------------------------------
+    class glyph_mask
+    {
+        public:
+            struct span
+            {
+                int x;
+                int y;
+                // As in Agg's scanlines, a negative length marks a solid
+                // span which only has a single cover value.
+                int len;
+                // Index of the span's first cover value in covers.
+                unsigned start;
+            };
+
+            // The font engine's index of the glyph, used for kerning.
+            unsigned glyph_index;
+            double advance_x;
+            double advance_y;
+            std::vector<span> spans;
+            std::vector<agg24::int8u> covers;
+
+            glyph_mask(unsigned _glyph_index, double _advance_x,
+                       double _advance_y);
+
+            // The memory used by the mask, counted against the atlas budget.
+            unsigned long byte_size() const;
+    };
+
+    //---------------------------------------------------------------------
+    // Identifies a set of glyphs which were rendered from the same font
+    // file with the same glyph transform.
+    //
+    // The linear part of the transform is rounded to a grid, so text which
+    // is drawn with nearly the same transform (while zooming, for example)
+    // shares its glyphs instead of rasterizing them all again.
+    //---------------------------------------------------------------------
+    class glyph_atlas_key
+    {
+        public:
+            std::string filename;
+            int size;
+            int matrix[4];
+
+            glyph_atlas_key(const std::string& _filename, int _size,
+                            const agg24::trans_affine& mtx);
+
+            // The bucketed transform that the glyphs are rendered with.
+            agg24::trans_affine transform() const;
+
+            bool operator<(const glyph_atlas_key& other) const;
+    };
+
+    //---------------------------------------------------------------------
+    // A least-recently-used cache of glyph coverage masks which is limited
+    // by the number of bytes it holds rather than the number of glyphs.
+    //
+    // Glyphs are looked up in two steps: select() picks the font and
+    // transform, and find() and insert() then work on glyph codes of that
+    // font.
+    //---------------------------------------------------------------------
+    class glyph_atlas
+    {
+        public:
+            glyph_atlas(unsigned long byte_budget=8*1024*1024);
+            ~glyph_atlas();
+
+            void select(const glyph_atlas_key& key);
+
+            // Returns NULL if the glyph isn't in the atlas.
+            const glyph_mask* find(unsigned glyph_code);
+
+            // Adds a glyph to the selected font.  The atlas takes ownership
+            // of the mask.  Masks returned by find() or insert() remain
+            // valid until the next call to insert().
+            const glyph_mask* insert(unsigned glyph_code, glyph_mask* mask);
+
+            unsigned long byte_budget() const { return _byte_budget; }
+            void set_byte_budget(unsigned long byte_budget);
+            unsigned long byte_size() const { return _byte_size; }
+            unsigned size() const { return (unsigned)_glyphs.size(); }
+
+            unsigned long hits() const { return _hits; }
+            unsigned long misses() const { return _misses; }
+            void reset_stats();
+
+            // Drop every glyph.
+            void clear();
+
+        private:
+            struct item_type
+            {
+                // The key of the font the glyph belongs to in _faces.
+                const glyph_atlas_key* face;
+                unsigned glyph_code;
+                glyph_mask* mask;
+            };
+
+            typedef std::list<item_type> lru_list_type;
+            typedef std::map<unsigned, lru_list_type::iterator> glyph_index_type;
+            typedef std::map<glyph_atlas_key, glyph_index_type> face_index_type;
+
+            // Most recently used glyphs are at the front of the list.
+            lru_list_type _glyphs;
+            face_index_type _faces;
+            face_index_type::iterator _face;
+            bool _has_face;
+            unsigned long _byte_budget;
+            unsigned long _byte_size;
+            unsigned long _hits;
+            unsigned long _misses;
+
+            // Evict glyphs until the atlas fits in its budget, always keeping
+            // the most recently used one.
+            void _evict(unsigned long byte_budget);
+
+            glyph_atlas(const glyph_atlas&);
+            const glyph_atlas& operator=(const glyph_atlas&);
+    };
+
+    // Returns the glyph atlas belonging to the calling thread.  It is shared
+    // by every graphics context drawn from that thread.
+    glyph_atlas* ThreadGlyphAtlas();
+
+    //---------------------------------------------------------------------
+    // Functions exposed to python for inspecting the calling thread's glyph
+    // atlas.
+    //---------------------------------------------------------------------
+    unsigned long glyph_atlas_hits();
+    unsigned long glyph_atlas_misses();
+    unsigned glyph_atlas_size();
+    unsigned long glyph_atlas_bytes();
+    unsigned long glyph_atlas_budget();
+    void set_glyph_atlas_budget(unsigned long byte_budget);
+    void reset_glyph_atlas_stats();
+    void clear_glyph_atlas();
+}
+
+#endif /* KIVA_GLYPH_ATLAS_H */
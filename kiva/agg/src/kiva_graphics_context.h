@@ -8,7 +8,9 @@
 
 #include <assert.h>
 #include <string.h>
+#include <algorithm>
 #include <stack>
+#include <vector>
 
 #include <iostream>
 #include <memory>
@@ -53,6 +55,9 @@
 #include "kiva_graphics_context_base.h"
 #include "kiva_alpha_gamma.h"
 #include "kiva_gradient.h"
+#include "kiva_band_rasterizer.h"
+#include "kiva_marker_stamp.h"
+#include "kiva_parallel.h"
 
 
 namespace kiva
@@ -75,6 +80,8 @@ namespace kiva
         // so there is no need to define both and do our own switching.
         //typedef agg24::renderer_base<agg_pixfmt> renderer_base_type;
         typedef agg24::renderer_mclip<agg_pixfmt> renderer_base_type;
+        typedef agg24::renderer_scanline_aa_solid<renderer_base_type> text_renderer_type;
+        typedef typename agg_pixfmt::color_type color_type;
 
         renderer_base_type renderer;
 
@@ -134,17 +141,49 @@ namespace kiva
 
         int draw_marker_at_points(double* pts,int Npts,int size,
                                    agg24::marker_e type=agg24::marker_square);
+        int draw_marker_at_points(double* pts,int Npts,int size,
+                                   agg24::marker_e type,
+                                   double* colors, int Ncolors,
+                                   double* sizes, int Nsizes);
 
         void draw_path_at_points(double* pts,int Npts,
                                   kiva::compiled_path& marker,
                                   draw_mode_e mode);
+        void draw_path_at_points(double* pts,int Npts,
+                                  kiva::compiled_path& marker,
+                                  draw_mode_e mode,
+                                  double* colors, int Ncolors);
+
+        int stamp_path_at_points(double* pts, int Npts,
+                                 kiva::compiled_path& marker,
+                                 draw_mode_e mode, double tolerance,
+                                 double* colors=NULL, int Ncolors=0);
 
         //---------------------------------------------------------------
         // Text handling
         //---------------------------------------------------------------
 
         bool show_text(char *text);
+        bool show_texts(std::vector<std::string>& texts,
+                        double* pts, int Npts,
+                        double* anchors, int Nanchors);
 
+        private:
+        // Sets the glyph transform and color for drawing text with the
+        // current font manager, and returns the device position of the
+        // text origin along with the glyph atlas to draw from.
+        glyph_atlas* _prepare_text(text_renderer_type& text_renderer,
+                                   double* start_x, double* start_y);
+        // Renders a UTF8 string with its origin at a device position.
+        bool _render_text(char* text, double start_x, double start_y,
+                          glyph_atlas* atlas,
+                          text_renderer_type& text_renderer,
+                          double* advance_x, double* advance_y);
+        // Blends a glyph from the atlas with its origin at pixel (x, y).
+        void _blend_glyph_mask(const glyph_mask* mask, int x, int y,
+                               const color_type& color);
+
+        public:
 
         //---------------------------------------------------------------
         // Image handling
@@ -181,6 +220,14 @@ namespace kiva
 
         private:
         void _stroke_path()
+        {
+            this->_stroke_path(this->path, this->renderer);
+        }
+
+        // Strokes a path into any renderer with the renderer_base interface.
+        template <class base_renderer_type>
+        void _stroke_path(kiva::compiled_path& input_path,
+                          base_renderer_type& input_renderer)
         {
             // 1. Choose whether to do a curve conversion or not.
             // 2. Pick whether the line is dashed.
@@ -189,24 +236,26 @@ namespace kiva
             if (this->state.line_color.a == 0 || this->state.line_width == 0.0)
         		return;
 
-            if (!this->path.has_curves())
+            if (!input_path.has_curves())
             {
-                this->stroke_path_dash_conversion(this->path);
+                this->stroke_path_dash_conversion(input_path, input_renderer);
             }
             else
             {
-                agg24::conv_curve<kiva::compiled_path> curved_path(this->path);
-                this->stroke_path_dash_conversion(curved_path);
+                agg24::conv_curve<kiva::compiled_path> curved_path(input_path);
+                this->stroke_path_dash_conversion(curved_path, input_renderer);
             }
         }
 
         private:
-        template <class path_type>
-        void stroke_path_dash_conversion(path_type& input_path)
+        template <class path_type, class base_renderer_type>
+        void stroke_path_dash_conversion(path_type& input_path,
+                                         base_renderer_type& input_renderer)
         {
             if (this->state.line_dash.is_solid())
             {
-                this->stroke_path_choose_clipping_renderer(input_path);
+                this->stroke_path_choose_clipping_renderer(input_path,
+                                                           input_renderer);
             }
             else
             {
@@ -219,13 +268,15 @@ namespace kiva
                 }
                 dashed_path.dash_start(this->state.line_dash.phase);
 
-                this->stroke_path_choose_clipping_renderer(dashed_path);
+                this->stroke_path_choose_clipping_renderer(dashed_path,
+                                                           input_renderer);
             }
         }
 
        	private:
-       	template<class path_type>
-    	void stroke_path_choose_clipping_renderer(path_type& input_path)
+       	template<class path_type, class base_renderer_type>
+    	void stroke_path_choose_clipping_renderer(path_type& input_path,
+    	                                          base_renderer_type& input_renderer)
     	{
             agg24::conv_clip_polyline<path_type> clipped(input_path);
 
@@ -240,7 +291,7 @@ namespace kiva
     	    // fix me: pick the renderer type (clipping, etc.)
     	    if(1)
     	    {
-    	        this->stroke_path_choose_rasterizer(clipped, this->renderer);
+    	        this->stroke_path_choose_rasterizer(clipped, input_renderer);
     	    }
     	    else
     	    {
@@ -365,8 +416,6 @@ namespace kiva
     	void stroke_path_scanline_aa(path_type& input_path, renderer_type& renderer,
     								 scanline_type& scanline)
     	{
-    		agg24::rasterizer_scanline_aa<> rasterizer;
-
     		agg24::conv_stroke<path_type> stroked_path(input_path);
 
     		// fix me: scale width by ctm
@@ -411,8 +460,8 @@ namespace kiva
     		renderer.color(color);
 
     		// render
-    		rasterizer.add_path(stroked_path);
-    		agg24::render_scanlines(rasterizer, scanline, renderer);
+    		this->_render_scanlines(stroked_path, agg24::fill_non_zero, 1.0,
+    		                        scanline, renderer);
     	}
 
         //--------------------------------------------------------------------
@@ -437,6 +486,16 @@ namespace kiva
 
         private:
         void _fill_path(agg24::filling_rule_e rule)
+        {
+            this->_fill_path(this->path, rule, this->renderer);
+        }
+
+        // Fills a path into any renderer with the renderer_base interface.
+        // Gradients are always drawn into the context's own renderer.
+        template <class base_renderer_type>
+        void _fill_path(kiva::compiled_path& input_path,
+                        agg24::filling_rule_e rule,
+                        base_renderer_type& input_renderer)
         {
             // 1. Choose whether to do a curve conversion or not.
             // 2. Pick whether the line is dashed.
@@ -445,14 +504,16 @@ namespace kiva
             if (this->state.fill_color.a == 0)
         		return;
 
-            if (!this->path.has_curves())
+            if (!input_path.has_curves())
             {
-                this->fill_path_clip_conversion(this->path, rule);
+                this->fill_path_clip_conversion(input_path, rule,
+                                                input_renderer);
             }
             else
             {
-                agg24::conv_curve<kiva::compiled_path> curved_path(this->path);
-                this->fill_path_clip_conversion(curved_path, rule);
+                agg24::conv_curve<kiva::compiled_path> curved_path(input_path);
+                this->fill_path_clip_conversion(curved_path, rule,
+                                                input_renderer);
             }
         }
 
@@ -519,9 +580,10 @@ namespace kiva
 
         private:
 
-        template <class path_type>
+        template <class path_type, class base_renderer_type>
         void fill_path_clip_conversion(path_type& input_path,
-                                       agg24::filling_rule_e rule)
+                                       agg24::filling_rule_e rule,
+                                       base_renderer_type& input_renderer)
         {
             // !! non-clipped version is about 8% faster or so for lion if it
             // !! is entirely on the screen.  It is slower, however, when
@@ -536,18 +598,13 @@ namespace kiva
             // fix me: What coordinates should this be in?  I think in user space instead
             //         of device space.  This looks wrong...
 
-            agg24::rasterizer_scanline_aa<> rasterizer;
-
-            rasterizer.filling_rule(rule);
-            rasterizer.add_path(clipped);
-
             if (this->state.gradient_fill.gradient_type == kiva::grad_none)
             {
                 agg24::scanline_u8 scanline;
 
                 // fix me: we need to select the renderer in another method.
-                agg24::renderer_scanline_aa_solid< renderer_base_type >
-                            aa_renderer(this->renderer);
+                agg24::renderer_scanline_aa_solid< base_renderer_type >
+                            aa_renderer(input_renderer);
 
                 // set fill color -- multiply by alpha if it is set.
                 agg24::rgba color;
@@ -556,10 +613,16 @@ namespace kiva
 
                 aa_renderer.color(color);
                 // draw the filled path to the buffer
-                agg24::render_scanlines(rasterizer, scanline, aa_renderer);
+                this->_render_scanlines(clipped, rule, 1.0, scanline,
+                                        aa_renderer);
             }
             else
             {
+                agg24::rasterizer_scanline_aa<> rasterizer;
+
+                rasterizer.filling_rule(rule);
+                rasterizer.add_path(clipped);
+
                 this->state.gradient_fill.apply(this->renderer_pixfmt,
                                                 &rasterizer, &this->renderer);
             }
@@ -685,22 +748,190 @@ namespace kiva
                                    span_gen_type span_generator)
         {
 
-            typedef agg24::span_allocator<agg24::rgba8> span_alloc_type;
-            span_alloc_type span_allocator;
+            typedef kiva::span_band_renderer<renderer_base_type,
+                                             span_gen_type> span_renderer_type;
+            span_renderer_type span_renderer(span_generator);
+            span_renderer.attach(this->renderer);
             agg24::scanline_u8 scanline;
-   			agg24::rasterizer_scanline_aa<> rasterizer;
 
-            if (this->state.alpha != 1.0)
+ 			// fix me: This isn't handling clipping. [ Test. I think it should now]
+            this->_render_scanlines(img_outline, agg24::fill_non_zero,
+                                    this->state.alpha, scanline,
+                                    span_renderer);
+
+       }
+
+        //---------------------------------------------------------------------
+        // Banded rendering
+        //
+        // With more than one thread, paths are turned into a list of edges
+        // once, and each thread rasterizes and renders a horizontal band of
+        // rows from the edges.  Agg clips to whole pixels, so the result is
+        // the same as rendering on a single thread.
+        //---------------------------------------------------------------------
+
+        private:
+        template<class path_type, class scanline_type, class renderer_type>
+        void _render_scanlines(path_type& input_path,
+                               agg24::filling_rule_e rule, double alpha,
+                               scanline_type& scanline,
+                               renderer_type& renderer)
+        {
+            agg24::rasterizer_scanline_aa<> rasterizer;
+            rasterizer.filling_rule(rule);
+            if (alpha != 1.0)
             {
-                rasterizer.gamma(alpha_gamma(this->state.alpha, 1.0));
+                rasterizer.gamma(alpha_gamma(alpha, 1.0));
             }
 
- 			// fix me: This isn't handling clipping. [ Test. I think it should now]
-            rasterizer.add_path(img_outline);
-            agg24::render_scanlines_aa(rasterizer, scanline, this->renderer,
-                                     span_allocator, span_generator);
+            if (this->_threads <= 1)
+            {
+                rasterizer.add_path(input_path);
+                agg24::render_scanlines(rasterizer, scanline, renderer);
+                return;
+            }
 
-       }
+            this->_render_scanline_bands(input_path, rule, alpha, rasterizer,
+                                         scanline, renderer,
+                                         static_cast<typename renderer_type::base_ren_type*>(0));
+        }
+
+        // Renderers which draw into something other than the context's
+        // pixels, like a marker stamp, are never split into bands.
+        template<class path_type, class scanline_type, class renderer_type,
+                 class base_renderer_type>
+        void _render_scanline_bands(path_type& input_path,
+                                    agg24::filling_rule_e rule, double alpha,
+                                    agg24::rasterizer_scanline_aa<>& rasterizer,
+                                    scanline_type& scanline,
+                                    renderer_type& renderer,
+                                    base_renderer_type*)
+        {
+            rasterizer.add_path(input_path);
+            agg24::render_scanlines(rasterizer, scanline, renderer);
+        }
+
+        template<class path_type, class scanline_type, class renderer_type>
+        void _render_scanline_bands(path_type& input_path,
+                                    agg24::filling_rule_e rule, double alpha,
+                                    agg24::rasterizer_scanline_aa<>& rasterizer,
+                                    scanline_type& scanline,
+                                    renderer_type& renderer,
+                                    renderer_base_type*)
+        {
+            kiva::edge_list edges;
+            edges.add_path(input_path);
+
+            int row1 = std::max(edges.min_row(), 0);
+            int row2 = std::min(edges.max_row(), this->height() - 1);
+            int bands = kiva::band_count(row2 - row1 + 1, this->_threads);
+            if (bands <= 1)
+            {
+                edges.add_band(rasterizer, edges.min_row(), edges.max_row());
+                agg24::render_scanlines(rasterizer, scanline, renderer);
+                return;
+            }
+
+            std::vector<agg24::rect_i> clip_boxes;
+            this->_get_clip_boxes(clip_boxes);
+
+            typedef scanline_band<scanline_type, renderer_type> band_type;
+            std::vector<band_type*> band_list;
+            std::vector<void*> args;
+            int rows = row2 - row1 + 1;
+            for (int i = 0; i < bands; i++)
+            {
+                band_type* band = new band_type(renderer);
+                band->pixfmt = &this->renderer_pixfmt;
+                band->clip_boxes = &clip_boxes;
+                band->edges = &edges;
+                band->rule = rule;
+                band->alpha = alpha;
+                band->row1 = row1 + (rows * i) / bands;
+                band->row2 = row1 + (rows * (i + 1)) / bands - 1;
+                band_list.push_back(band);
+                args.push_back(band);
+            }
+
+            kiva::run_parallel(&band_type::run, &args[0], bands);
+
+            for (int i = 0; i < bands; i++)
+            {
+                delete band_list[i];
+            }
+        }
+
+        // A band of rows rendered by one thread.  Each band has its own
+        // rasterizer, scanline and renderers, since all of those keep state
+        // while rendering.
+        template<class scanline_type, class renderer_type>
+        struct scanline_band
+        {
+            agg_pixfmt* pixfmt;
+            const std::vector<agg24::rect_i>* clip_boxes;
+            const kiva::edge_list* edges;
+            agg24::filling_rule_e rule;
+            double alpha;
+            int row1;
+            int row2;
+            renderer_type renderer;
+
+            scanline_band(const renderer_type& _renderer):
+                renderer(_renderer)
+            {
+            }
+
+            static void run(void* arg)
+            {
+                scanline_band* band = static_cast<scanline_band*>(arg);
+
+                renderer_base_type base_renderer(*band->pixfmt);
+                graphics_context::_set_clip_boxes(base_renderer,
+                                                  *band->clip_boxes);
+                band->renderer.attach(base_renderer);
+
+                agg24::rasterizer_scanline_aa<> rasterizer;
+                rasterizer.filling_rule(band->rule);
+                if (band->alpha != 1.0)
+                {
+                    rasterizer.gamma(alpha_gamma(band->alpha, 1.0));
+                }
+                band->edges->add_band(rasterizer, band->row1, band->row2);
+
+                scanline_type scanline;
+                kiva::render_scanline_band(rasterizer, scanline,
+                                           band->renderer,
+                                           band->row1, band->row2);
+            }
+        };
+
+        // Copies the clipping boxes of the renderer.  If nothing is visible
+        // the only box is invalid.
+        void _get_clip_boxes(std::vector<agg24::rect_i>& boxes)
+        {
+            this->renderer.first_clip_box();
+            do
+            {
+                boxes.push_back(this->renderer.clip_box());
+            }
+            while (this->renderer.next_clip_box());
+        }
+
+        static void _set_clip_boxes(renderer_base_type& ren,
+                                    const std::vector<agg24::rect_i>& boxes)
+        {
+            if (!boxes[0].is_valid())
+            {
+                ren.reset_clipping(false);
+                return;
+            }
+            ren.reset_clipping(true);
+            std::vector<agg24::rect_i>::const_iterator box;
+            for (box = boxes.begin(); box != boxes.end(); ++box)
+            {
+                ren.add_clip_box(box->x1, box->y1, box->x2, box->y2);
+            }
+        }
     };
 
     template <class agg_pixfmt>
@@ -1157,6 +1388,16 @@ namespace kiva
     template <class agg_pixfmt>
     int graphics_context<agg_pixfmt>::draw_marker_at_points(double* pts,int Npts,int size,
                                agg24::marker_e type)
+    {
+        return this->draw_marker_at_points(pts, Npts, size, type,
+                                           NULL, 0, NULL, 0);
+    }
+
+    template <class agg_pixfmt>
+    int graphics_context<agg_pixfmt>::draw_marker_at_points(double* pts,int Npts,int size,
+                               agg24::marker_e type,
+                               double* colors, int Ncolors,
+                               double* sizes, int Nsizes)
     {
         int success = 0;
         agg24::trans_affine ctm = this->get_ctm();
@@ -1178,9 +1419,25 @@ namespace kiva
             double tx, ty;
             get_translation(ctm, &tx, &ty);
 
-            for(int i = 0; i < Npts*2; i+=2)
+            bool line_marker = this->_is_line_marker(type);
+            for(int i = 0; i < Npts; i++)
             {
-                m.marker((int)(pts[i]+tx), int(pts[i+1]+ty), size, type);
+                if (Ncolors)
+                {
+                    agg24::rgba color(colors[4*i], colors[4*i+1],
+                                      colors[4*i+2], colors[4*i+3]);
+                    if (line_marker)
+                    {
+                        color.a *= this->state.line_width;
+                        m.line_color(color);
+                    }
+                    else
+                    {
+                        m.fill_color(color);
+                    }
+                }
+                m.marker((int)(pts[2*i]+tx), int(pts[2*i+1]+ty),
+                         Nsizes ? int(sizes[i]) : size, type);
             }
             success = 1;
         }
@@ -1191,6 +1448,15 @@ namespace kiva
     void graphics_context<agg_pixfmt>::draw_path_at_points(double* pts,int Npts,
                               kiva::compiled_path& marker,
                               draw_mode_e mode)
+    {
+        this->draw_path_at_points(pts, Npts, marker, mode, NULL, 0);
+    }
+
+    template <class agg_pixfmt>
+    void graphics_context<agg_pixfmt>::draw_path_at_points(double* pts,int Npts,
+                              kiva::compiled_path& marker,
+                              draw_mode_e mode,
+                              double* colors, int Ncolors)
     {
         // This routine draws a path (i.e. marker) at multiple points
         // on the screen.  It is used heavily when rendering scatter
@@ -1264,11 +1530,23 @@ namespace kiva
         // complicated ctm (rotation,scaling, or skew)
         else
         {
+            // Each point's color replaces the fill color, or the stroke
+            // color when the markers aren't filled.
+            agg24::rgba& point_color = (mode & (FILL | EOF_FILL))
+                                           ? this->state.fill_color
+                                           : this->state.line_color;
+            agg24::rgba saved_color = point_color;
+
             this->begin_path();
-            for(int i = 0; i < Npts*2; i+=2)
+            for(int i = 0; i < Npts; i++)
             {
-                const double x = pts[i];
-                const double y = pts[i+1];
+                const double x = pts[2*i];
+                const double y = pts[2*i+1];
+                if (Ncolors)
+                {
+                    point_color = agg24::rgba(colors[4*i], colors[4*i+1],
+                                              colors[4*i+2], colors[4*i+3]);
+                }
                 // This is faster than saving the entire state.
                 this->path.save_ctm();
                 this->translate_ctm(x,y);
@@ -1276,29 +1554,174 @@ namespace kiva
                 this->draw_path(mode);
                 this->path.restore_ctm();
             }
+            point_color = saved_color;
         }
 
     }
 
     template <class agg_pixfmt>
-    bool graphics_context<agg_pixfmt>::show_text(char*text)
+    int graphics_context<agg_pixfmt>::stamp_path_at_points(double* pts, int Npts,
+                              kiva::compiled_path& marker,
+                              draw_mode_e mode, double tolerance,
+                              double* colors, int Ncolors)
     {
-        typedef agg24::glyph_raster_bin<agg24::rgba8>                   GlyphGeneratorType;
-        typedef agg24::renderer_scanline_aa_solid<renderer_base_type> ScanlineRendererType;
+        // The marker is rendered into coverage stamps for phases x phases
+        // subpixel offsets, which are built the first time a point needs
+        // them.  Each point is then snapped to the nearest offset and its
+        // stamps are blended in, filling and then stroking each marker just
+        // as draw_path_at_points() does.  A point at a whole pixel gives
+        // exactly the same pixels as drawing the path there.
+
+        bool fill = (mode & (FILL | EOF_FILL)) != 0;
+        bool stroke = (mode & STROKE) != 0;
+        agg24::filling_rule_e rule = (mode & EOF_FILL) ? agg24::fill_even_odd
+                                                       : agg24::fill_non_zero;
+
+        int phases = kiva::stamp_phases(tolerance);
+        if (phases == 0 ||
+            (fill && this->state.gradient_fill.gradient_type != kiva::grad_none))
+        {
+            this->draw_path_at_points(pts, Npts, marker, mode,
+                                      colors, Ncolors);
+            return 0;
+        }
 
-        //GlyphGeneratorType glyphGen(0);
-        ScanlineRendererType scanlineRenderer(this->renderer);
+        // The linear part of the ctm is applied to the marker while the
+        // translation places it.
+        agg24::trans_affine ctm = this->get_ctm();
+        agg24::trans_affine linear = ctm;
+        linear.tx = 0.0;
+        linear.ty = 0.0;
+
+        kiva::compiled_path shape;
+        shape.set_ctm(linear);
+        shape.add_path(marker);
+
+        double x1 = 0.0, y1 = 0.0, x2 = -1.0, y2 = -1.0;
+        double vx, vy;
+        unsigned cmd;
+        shape.rewind(0);
+        while (!agg24::is_stop(cmd = shape.vertex(&vx, &vy)))
+        {
+            if (!agg24::is_vertex(cmd))
+                continue;
+            if (x1 > x2)
+            {
+                x1 = x2 = vx;
+                y1 = y2 = vy;
+            }
+            else
+            {
+                x1 = std::min(x1, vx);
+                x2 = std::max(x2, vx);
+                y1 = std::min(y1, vy);
+                y2 = std::max(y2, vy);
+            }
+        }
 
-        const agg24::glyph_cache *glyph = NULL;
+        // Leave room for the widest joins Agg's stroker draws with its
+        // default miter limit.
+        int margin = 2;
+        if (stroke)
+        {
+            margin += int(ceil(2.0 * this->state.line_width));
+        }
+        int origin_x = margin - int(floor(x1));
+        int origin_y = margin - int(floor(y1));
+        int stamp_width = int(ceil(x2)) - int(floor(x1)) + 2 * margin + 1;
+        int stamp_height = int(ceil(y2)) - int(floor(y1)) + 2 * margin + 1;
+
+        // Stamps are rendered through the usual pipelines, which clip paths
+        // to the size of the buffer.
+        if (x1 > x2 || stamp_width > int(this->buf.width()) ||
+            stamp_height > int(this->buf.height()))
+        {
+            this->draw_path_at_points(pts, Npts, marker, mode,
+                                      colors, Ncolors);
+            return 0;
+        }
 
-        // Explicitly decode UTF8 bytes to 32-bit codepoints to feed into the
-        // font API.
-        size_t text_length = strlen(text);
-        utf8::iterator<char*> p(text, text, text+text_length);
-        utf8::iterator<char*> p_end(text+text_length, text, text+text_length);
+        this->begin_path();
 
-        bool retval = true;
+        typedef kiva::marker_stamp<color_type> stamp_type;
+        std::vector<stamp_type> stamps(phases * phases);
+        std::vector<bool> built(phases * phases, false);
+
+        agg24::rgba fill_color = this->state.fill_color;
+        fill_color.a *= this->state.alpha;
+        agg24::rgba line_color = this->state.line_color;
+        line_color.a *= this->state.alpha;
+        color_type fill_c(fill_color);
+        color_type line_c(line_color);
+
+        double min_x = -stamp_width;
+        double min_y = -stamp_height;
+        double max_x = this->buf.width() + stamp_width;
+        double max_y = this->buf.height() + stamp_height;
+
+        for (int i = 0; i < Npts*2; i+=2)
+        {
+            double x = pts[i];
+            double y = pts[i+1];
+            ctm.transform(&x, &y);
+
+            // Skip markers which are entirely outside of the buffer.  This
+            // also skips NaN points.
+            if (!(x > min_x && x < max_x && y > min_y && y < max_y))
+                continue;
+
+            int kx = agg24::iround(x * phases);
+            int ky = agg24::iround(y * phases);
+            int px = kx - int(floor(double(kx) / phases)) * phases;
+            int py = ky - int(floor(double(ky) / phases)) * phases;
+            int ix = (kx - px) / phases;
+            int iy = (ky - py) / phases;
+
+            stamp_type& stamp = stamps[py * phases + px];
+            if (!built[py * phases + px])
+            {
+                agg24::trans_affine offset = linear;
+                offset.tx = origin_x + double(px) / phases;
+                offset.ty = origin_y + double(py) / phases;
+
+                kiva::compiled_path sprite;
+                sprite.set_ctm(offset);
+                sprite.add_path(marker);
+                if (fill)
+                {
+                    this->_fill_path(sprite, rule, stamp.fill);
+                }
+                if (stroke)
+                {
+                    this->_stroke_path(sprite, stamp.stroke);
+                }
+                built[py * phases + px] = true;
+            }
+
+            if (Ncolors)
+            {
+                // As in draw_path_at_points(), the point's color replaces
+                // the fill color, or the stroke color of unfilled markers.
+                double* rgba = colors + 2*i;
+                agg24::rgba color(rgba[0], rgba[1], rgba[2],
+                                  rgba[3] * this->state.alpha);
+                if (fill)
+                    fill_c = color_type(color);
+                else
+                    line_c = color_type(color);
+            }
+
+            stamp.fill.blend(this->renderer, ix - origin_x, iy - origin_y,
+                             fill_c);
+            stamp.stroke.blend(this->renderer, ix - origin_x, iy - origin_y,
+                               line_c);
+        }
+        return 1;
+    }
 
+    template <class agg_pixfmt>
+    bool graphics_context<agg_pixfmt>::show_text(char*text)
+    {
         // Check to make sure the font's loaded.
         if (!this->is_font_initialized())
         {
@@ -1306,75 +1729,197 @@ namespace kiva
         }
 
         this->_grab_font_manager();
-        font_engine_type *font_engine = kiva::GlobalFontEngine();
-        font_manager_type *font_manager = kiva::GlobalFontManager();
 
+        text_renderer_type scanlineRenderer(this->renderer);
+        double start_x, start_y;
+        glyph_atlas* atlas = this->_prepare_text(scanlineRenderer,
+                                                 &start_x, &start_y);
+
+        double advance_x = 0.0;
+        double advance_y = 0.0;
+        bool retval = this->_render_text(text, start_x, start_y, atlas,
+                                         scanlineRenderer,
+                                         &advance_x, &advance_y);
+
+        this->_release_font_manager();
+
+        agg24::trans_affine trans = agg24::trans_affine_translation(advance_x,
+    	                                                        advance_y);
+        this->text_matrix.multiply(trans);
+        return retval;
+    }
+
+    template <class agg_pixfmt>
+    bool graphics_context<agg_pixfmt>::show_texts(std::vector<std::string>& texts,
+                                                  double* pts, int Npts,
+                                                  double* anchors, int Nanchors)
+    {
+        if (!this->is_font_initialized())
+        {
+            return false;
+        }
+
+        int count = (int(texts.size()) < Npts) ? int(texts.size()) : Npts;
+
+        // Anchored strings have to be measured before the font manager is
+        // grabbed for drawing, since measuring resets the glyph transform.
+        std::vector<double> origins(pts, pts + 2*count);
+        if (Nanchors > 0)
+        {
+            for (int i = 0; i < count; i++)
+            {
+                this->_anchor_text_origin(const_cast<char*>(texts[i].c_str()),
+                                          anchors, Nanchors, i,
+                                          &origins[2*i], &origins[2*i+1]);
+            }
+        }
+
+        this->_grab_font_manager();
+        font_manager_type *font_manager = &this->_font_cache_entry->manager;
+
+        // Every string shares the glyph transform and color; only the
+        // starting offset changes.
+        text_renderer_type scanlineRenderer(this->renderer);
+        double start_x, start_y;
+        glyph_atlas* atlas = this->_prepare_text(scanlineRenderer,
+                                                 &start_x, &start_y);
+        agg24::trans_affine ctm = this->path.get_ctm();
+
+        bool retval = true;
+        for (int i = 0; i < count; i++)
+        {
+            start_x = origins[2*i];
+            start_y = origins[2*i+1];
+            ctm.transform(&start_x, &start_y);
+
+            // Kerning doesn't carry over from the end of the last string.
+            font_manager->reset_last_glyph();
+
+            double advance_x = 0.0;
+            double advance_y = 0.0;
+            if (!this->_render_text(const_cast<char*>(texts[i].c_str()),
+                                    start_x, start_y, atlas,
+                                    scanlineRenderer,
+                                    &advance_x, &advance_y))
+            {
+                retval = false;
+            }
+        }
+
+        this->_release_font_manager();
+        return retval;
+    }
+
+    template <class agg_pixfmt>
+    glyph_atlas* graphics_context<agg_pixfmt>::_prepare_text(text_renderer_type& text_renderer,
+                                                             double* start_x, double* start_y)
+    {
         // Concatenate the CTM with the text matrix to get the full transform for the
         // font engine.
     	agg24::trans_affine full_text_xform(this->text_matrix * this->path.get_ctm());
 
-       // the AGG freetype transform is a per character transform.  We need to remove the
-       // offset part of the transform to prevent that offset from occuring between each
-       // character.  We'll handle the intial offset ourselves.
-       double start_x, start_y;
-       double text_xform_array[6];
-       full_text_xform.store_to(text_xform_array);
-       // Pull the translation values out of the matrix as our starting offset and
-       // then replace them with zeros for use in the font engine.
-       start_x = text_xform_array[4];
-       start_y = text_xform_array[5];
+        // The glyph transform is per character, so the translation is
+        // handled separately as the starting offset of the text.  The
+        // remaining linear part picks the glyphs from the atlas, and the
+        // glyphs are rasterized with the atlas' rounded version of it.
+        *start_x = full_text_xform.tx;
+        *start_y = full_text_xform.ty;
 
-       text_xform_array[4] = 0.0;
-       text_xform_array[5] = 0.0;
+        font_cache_entry *font_entry = this->_font_cache_entry;
+        glyph_atlas_key key(font_entry->key.filename, font_entry->key.size,
+                            full_text_xform);
+        font_entry->transform(key.transform());
 
-       full_text_xform.load_from(text_xform_array);
-       font_engine->transform(full_text_xform);
+        glyph_atlas* atlas = ThreadGlyphAtlas();
+        atlas->select(key);
 
         if (this->state.text_drawing_mode == kiva::TEXT_FILL)
         {
-            scanlineRenderer.color(this->state.fill_color);
+            text_renderer.color(this->state.fill_color);
         }
         else if ((this->state.text_drawing_mode == kiva::TEXT_STROKE) ||
                  (this->state.text_drawing_mode == kiva::TEXT_FILL_STROKE))
         {
-            scanlineRenderer.color(this->state.line_color);
+            text_renderer.color(this->state.line_color);
         }
+        return atlas;
+    }
 
-        double advance_x = 0.0;
-        double advance_y = 0.0;
+    template <class agg_pixfmt>
+    bool graphics_context<agg_pixfmt>::_render_text(char* text,
+                                                    double start_x, double start_y,
+                                                    glyph_atlas* atlas,
+                                                    text_renderer_type& text_renderer,
+                                                    double* advance_x, double* advance_y)
+    {
+        font_cache_entry *font_entry = this->_font_cache_entry;
+        bool visible = (this->state.text_drawing_mode != kiva::TEXT_INVISIBLE);
+        unsigned last_index = 0;
+
+        // Explicitly decode UTF8 bytes to 32-bit codepoints to feed into the
+        // font API.
+        size_t text_length = strlen(text);
+        utf8::iterator<char*> p(text, text, text+text_length);
+        utf8::iterator<char*> p_end(text+text_length, text, text+text_length);
 
         for (; p!=p_end; ++p)
         {
-            double x = start_x + advance_x;
-            double y = start_y + advance_y;
-            glyph = font_manager->glyph(*p);
-
-            if (glyph == NULL)
+            // Glyphs are only rasterized the first time they are drawn with
+            // a font and transform; after that their coverage comes from
+            // the atlas.
+            const glyph_mask* mask = atlas->find(*p);
+            if (mask == NULL)
             {
-                retval = false;
-                break;
+                const agg24::glyph_cache *glyph = font_entry->manager.glyph(*p);
+                if (glyph == NULL)
+                {
+                    return false;
+                }
+                mask = atlas->insert(*p, font_entry->make_glyph_mask(glyph));
             }
-            font_manager->add_kerning(&x, &y);
-            font_manager->init_embedded_adaptors(glyph, x, y);
-            if (this->state.text_drawing_mode != kiva::TEXT_INVISIBLE)
+
+            double x = start_x + *advance_x;
+            double y = start_y + *advance_y;
+            font_entry->engine.add_kerning(last_index, mask->glyph_index,
+                                           &x, &y);
+            last_index = mask->glyph_index;
+
+            if (visible)
             {
-                agg24::render_scanlines(font_manager->gray8_adaptor(),
-                                      font_manager->gray8_scanline(),
-                                      scanlineRenderer);
+                this->_blend_glyph_mask(mask, agg24::iround(x),
+                                        agg24::iround(y),
+                                        text_renderer.color());
             }
 
-            advance_x += glyph->advance_x;
-            advance_y += glyph->advance_y;
+            *advance_x += mask->advance_x;
+            *advance_y += mask->advance_y;
         }
+        return true;
+    }
 
-        agg24::trans_affine null_xform = agg24::trans_affine_translation(0., 0.);
-        font_engine->transform(null_xform);
-        this->_release_font_manager();
-
-        agg24::trans_affine trans = agg24::trans_affine_translation(advance_x,
-    	                                                        advance_y);
-        this->text_matrix.multiply(trans);
-        return retval;
+    template <class agg_pixfmt>
+    void graphics_context<agg_pixfmt>::_blend_glyph_mask(const glyph_mask* mask,
+                                                         int x, int y,
+                                                         const color_type& color)
+    {
+        const agg24::int8u* covers = mask->covers.empty() ? NULL
+                                                          : &mask->covers[0];
+        std::vector<glyph_mask::span>::const_iterator span;
+        for (span = mask->spans.begin(); span != mask->spans.end(); ++span)
+        {
+            if (span->len > 0)
+            {
+                this->renderer.blend_solid_hspan(x + span->x, y + span->y,
+                                                 span->len, color,
+                                                 covers + span->start);
+            }
+            else
+            {
+                this->renderer.blend_hline(x + span->x, y + span->y,
+                                           x + span->x - span->len - 1,
+                                           color, covers[span->start]);
+            }
+        }
     }
 
     template <class agg_pixfmt>
@@ -1,13 +1,3 @@
-
-
-
-#ifdef _WIN32 // Win32 threads
-    #include <windows.h>
-    static CRITICAL_SECTION gCriticalSection;
-
-#else        // POSIX threads
-#endif
-
 #include <assert.h>
 
 #include "utf8.h"
@@ -19,41 +9,12 @@
 using namespace kiva;
 
 
-#ifdef KIVA_USE_FREETYPE
-static font_engine_type gFontEngine;
-#endif
-#ifdef KIVA_USE_WIN32
-static font_engine_type gFontEngine(hdc);
-#endif
-static font_manager_type gFontManager(gFontEngine);
-
-font_engine_type* kiva::GlobalFontEngine()
-{
-    return &gFontEngine;
-}
-
-font_manager_type* kiva::GlobalFontManager()
-{
-    return &gFontManager;
-}
-
-void kiva::cleanup_font_threading_primitives()
-{
-#ifdef _WIN32
-    DeleteCriticalSection(&gCriticalSection);
-#else
-
-#endif
-}
-
-
-// Create a static pool of font engines that get recycled.
-//static FontEngineCache font_engine_cache = FontEngineCache();
-
 graphics_context_base::graphics_context_base(unsigned char *data, int width,
                        int height, int stride, interpolation_e interp):
                        buf(),
-                       _image_interpolation(interp)
+                       _image_interpolation(interp),
+                       _threads(1),
+                       _font_cache_entry(NULL)
 {
    this->buf.attach(data, width, height, stride);
 }
@@ -106,6 +67,18 @@ void graphics_context_base::set_image_interpolation(kiva::interpolation_e interp
 }
 
 
+int graphics_context_base::get_threads()
+{
+    return this->_threads;
+}
+
+
+void graphics_context_base::set_threads(int threads)
+{
+    this->_threads = (threads < 1 ? 1 : threads);
+}
+
+
 //---------------------------------------------------------------
 // set graphics_state values
 //---------------------------------------------------------------
@@ -435,6 +408,25 @@ void graphics_context_base::lines(double* pts, int Npts)
     this->path.lines(pts, Npts);
 }
 
+void graphics_context_base::lines(double* pts, int Npts, bool break_on_nan)
+{
+    this->path.lines(pts, Npts, break_on_nan);
+}
+
+void graphics_context_base::decimated_lines(double* pts, int Npts,
+                                            double min_density,
+                                            bool break_on_nan)
+{
+    if (min_density > 0.0 && !this->state.line_dash.is_solid())
+    {
+        this->path.lines(pts, Npts, break_on_nan);
+    }
+    else
+    {
+        this->path.decimated_lines(pts, Npts, min_density, break_on_nan);
+    }
+}
+
 void graphics_context_base::line_set(double* start, int Nstart, double* end, int Nend)
 {
     this->path.line_set(start, Nstart, end, Nend);
@@ -579,24 +571,94 @@ bool graphics_context_base::show_text_at_point(char *text,
     return retval;
 }
 
+bool graphics_context_base::show_texts(std::vector<std::string>& texts,
+                                       double* pts, int Npts,
+                                       double* anchors, int Nanchors)
+{
+    bool retval = true;
+    int count = (int(texts.size()) < Npts) ? int(texts.size()) : Npts;
+
+    for (int i = 0; i < count; i++)
+    {
+        char* text = const_cast<char*>(texts[i].c_str());
+        double tx = pts[2*i];
+        double ty = pts[2*i+1];
+        if (Nanchors > 0)
+        {
+            this->_anchor_text_origin(text, anchors, Nanchors, i, &tx, &ty);
+        }
+        if (!this->show_text_at_point(text, tx, ty))
+        {
+            retval = false;
+        }
+    }
+    return retval;
+}
+
+void graphics_context_base::_anchor_text_origin(char* text, double* anchors,
+                                                int Nanchors, int index,
+                                                double* tx, double* ty)
+{
+    double* anchor = (Nanchors == 1) ? anchors : anchors + 2*index;
+    if (anchor[0] == 0.0 && anchor[1] == 0.0)
+    {
+        return;
+    }
+
+    kiva::rect_type extent = this->get_text_extent(text);
+    *tx -= anchor[0] * extent.w;
+    *ty -= anchor[1] * extent.h;
+}
+
 kiva::rect_type graphics_context_base::get_text_extent(char *text)
 {
+    this->_grab_font_manager();
+    kiva::rect_type extent = this->_text_extent(text);
+    this->_release_font_manager();
+
+    return extent;
+}
+
+void graphics_context_base::get_text_extents(std::vector<std::string>& texts,
+                                             double* extents, int Nextents)
+{
+    int count = (int(texts.size()) < Nextents) ? int(texts.size()) : Nextents;
+
+    this->_grab_font_manager();
+    for (int i = 0; i < count; i++)
+    {
+        kiva::rect_type extent = this->_text_extent(texts[i]);
+        extents[4*i] = extent.x;
+        extents[4*i+1] = extent.y;
+        extents[4*i+2] = extent.w;
+        extents[4*i+3] = extent.h;
+    }
+    this->_release_font_manager();
+}
+
+kiva::rect_type graphics_context_base::_text_extent(const std::string& text)
+{
+    const kiva::rect_type* memo = this->_font_cache_entry->find_text_extent(text);
+    if (memo != NULL)
+    {
+        return *memo;
+    }
+
     const agg24::glyph_cache *glyph = NULL;
 
     // Explicitly decode UTF8 bytes to 32-bit codepoints to feed into the
     // font API.
-    size_t text_length = strlen(text);
-    utf8::iterator<char*> p(text, text, text+text_length);
-    utf8::iterator<char*> p_end(text+text_length, text, text+text_length);
+    char* text_begin = const_cast<char*>(text.c_str());
+    char* text_end = text_begin + text.size();
+    utf8::iterator<char*> p(text_begin, text_begin, text_end);
+    utf8::iterator<char*> p_end(text_end, text_begin, text_end);
 
     double x1 = 0.0, x2 = 0.0, y1 = 0.0, y2= 0.0;
 
-    static font_manager_type *font_manager = GlobalFontManager();
-
-    if (font_manager == NULL)
-        return kiva::rect_type(0, 0, 0, 0);
-
-    this->_grab_font_manager();
+    // Extents are measured in the untransformed space of the text.
+    this->_font_cache_entry->transform(agg24::trans_affine());
+    font_manager_type *font_manager = &this->_font_cache_entry->manager;
+    font_manager->reset_last_glyph();
 
     //typedef agg24::glyph_raster_bin<agg24::rgba8> GlyphGeneratorType;
     //GlyphGeneratorType glyphGen(this->font_manager.glyph(*p)->data);
@@ -615,9 +677,9 @@ kiva::rect_type graphics_context_base::get_text_extent(char *text)
         y2 = kiva::max(y2, glyph->bounds.y2);
     }
 
-    this->_release_font_manager();
-
-    return kiva::rect_type(x1, y1, x2-x1, y2 - y1);
+    kiva::rect_type extent(x1, y1, x2-x1, y2 - y1);
+    this->_font_cache_entry->store_text_extent(text, extent);
+    return extent;
 }
 
 
@@ -632,82 +694,101 @@ int graphics_context_base::draw_image(kiva::graphics_context_base* img)
     return this->draw_image(img, tmp);
 }
 
-void graphics_context_base::_grab_font_manager()
+int graphics_context_base::draw_marker_at_points(double* pts, int Npts,
+                                                 int size,
+                                                 agg24::marker_e type,
+                                                 double* colors, int Ncolors,
+                                                 double* sizes, int Nsizes)
 {
-// Win32 threads
-#ifdef _WIN32
-    static bool critical_section_initialized = false;
-
-    if (!critical_section_initialized)
+    if (Ncolors == 0 && Nsizes == 0)
     {
-        // FIXME: We need to delete the CriticalSection object when the process
-        // exits, but where should we put that code?
-        InitializeCriticalSection(&gCriticalSection);
-        critical_section_initialized = true;
+        return this->draw_marker_at_points(pts, Npts, size, type);
     }
 
-    EnterCriticalSection(&gCriticalSection);
-
-// POSIX threads
-#else
-
-#endif  // _WIN32
-
-    font_engine_type *font_engine = GlobalFontEngine();
-    if (font_engine == NULL)
-        return;
-
-    font_type *font = &this->state.font;
-
-#ifdef KIVA_USE_FREETYPE
-    if (font->filename != "")
+    // Draw the markers one at a time.  Whether they can be drawn doesn't
+    // depend on the point, so the first failure stops the loop.
+    bool line_marker = _is_line_marker(type);
+    agg24::rgba saved_color = line_marker ? this->state.line_color
+                                          : this->state.fill_color;
+    int success = 1;
+    for (int i = 0; i < Npts && success; i++)
     {
-        font_engine->load_font(font->filename.c_str(), 0,
-                               agg24::glyph_ren_agg_gray8);
+        if (Ncolors)
+        {
+            agg24::rgba color(colors[4*i], colors[4*i+1], colors[4*i+2],
+                              colors[4*i+3]);
+            if (line_marker)
+                this->state.line_color = color;
+            else
+                this->state.fill_color = color;
+        }
+        success = this->draw_marker_at_points(pts + 2*i, 1,
+                                              Nsizes ? int(sizes[i]) : size,
+                                              type);
     }
+    if (line_marker)
+        this->state.line_color = saved_color;
     else
+        this->state.fill_color = saved_color;
+    return success;
+}
+
+void graphics_context_base::draw_path_at_points(double* pts, int Npts,
+                                                kiva::compiled_path& marker,
+                                                draw_mode_e mode,
+                                                double* colors, int Ncolors)
+{
+    if (Ncolors == 0)
+    {
+        this->draw_path_at_points(pts, Npts, marker, mode);
+        return;
+    }
+
+    agg24::rgba& point_color = (mode & (FILL | EOF_FILL))
+                                   ? this->state.fill_color
+                                   : this->state.line_color;
+    agg24::rgba saved_color = point_color;
+    for (int i = 0; i < Npts; i++)
     {
-        font_engine->load_font(font->name.c_str(), 0,
-                               agg24::glyph_ren_agg_gray8);
+        point_color = agg24::rgba(colors[4*i], colors[4*i+1], colors[4*i+2],
+                                  colors[4*i+3]);
+        this->draw_path_at_points(pts + 2*i, 1, marker, mode);
     }
-#endif
+    point_color = saved_color;
+}
 
-#ifdef KIVA_USE_WIN32
-    font_engine->create_font(font->name,
-                             agg24::glyph_ren_native_gray8,
-                             font->size);
-#endif
+int graphics_context_base::stamp_path_at_points(double* pts, int Npts,
+                                                kiva::compiled_path& marker,
+                                                draw_mode_e mode,
+                                                double tolerance,
+                                                double* colors, int Ncolors)
+{
+    this->draw_path_at_points(pts, Npts, marker, mode, colors, Ncolors);
+    return 0;
+}
 
-    font_engine->hinting(1);
-    font_engine->resolution(72);
+bool graphics_context_base::_is_line_marker(agg24::marker_e type)
+{
+    return (type == agg24::marker_four_rays || type == agg24::marker_cross ||
+            type == agg24::marker_x || type == agg24::marker_dash);
+}
 
-//    The following is a more laborious but more "correct" way of determining
-//    the correct font size to use under Win32.  Unfortunately, it doesn't
-//    work exactly right either; characters come out just a few pixels larger.
-//    Thus, for the time being, we're going to punt and leave the hard-coded
-//    adjustment factor.
-//
-//    this->font_engine.height(12.0);
-//    this->font_engine.width(12.0);
-//    kiva::rect_type tmp(this->get_text_extent("X"));
-//    this->font_engine.height(font.size*12.0/tmp.h);
-//    this->font_engine.width(font.size*12.0/tmp.w);
-    font_engine->height(font->size);
-    font_engine->width(font->size);
+void graphics_context_base::_grab_font_manager()
+{
+    // Every thread has its own font cache, so this needs no locking.  The
+    // cache hands back an engine which has already been loaded and sized
+    // for this font, so nothing is reconfigured unless the font actually
+    // changed.
+    this->_font_cache_entry = ThreadFontCache()->get(this->state.font);
 
+    // Don't apply kerning between the last glyph of the previous string
+    // and the first glyph of the next.
+    this->_font_cache_entry->manager.reset_last_glyph();
 }
 
 void graphics_context_base::_release_font_manager()
 {
-
-// Win32 thread-safe implementations of GlobalFontEngine and GlobalFontManager
-#ifdef _WIN32
-    LeaveCriticalSection(&gCriticalSection);
-
-// POSIX thread-safe implementations of GlobalFontEngine and GlobalFontManager
-#else
-
-#endif  // _WIN32
+    this->_font_cache_entry = NULL;
 }
 
 //---------------------------------------------------------------------
@@ -1,15 +1,6 @@
 #ifndef KIVA_GRAPHICS_CONTEXT_BASE_H
 #define KIVA_GRAPHICS_CONTEXT_BASE_H
 
-#define KIVA_USE_FREETYPE
-#ifdef KIVA_USE_FREETYPE
-#include "agg_font_freetype.h"
-#endif
-#ifdef KIVA_USE_WIN32
-#include "agg_font_win32_tt.h"
-#endif
-
-
 #include <stack>
 #include <vector>
 
@@ -19,6 +10,7 @@
 #include "agg_renderer_markers.h"
 
 #include "kiva_constants.h"
+#include "kiva_font_cache.h"
 #include "kiva_pix_format.h"
 #include "kiva_rect.h"
 #include "kiva_graphics_state.h"
@@ -30,25 +22,11 @@
 #include "agg_renderer_raster_text.h"
 #include "agg_embedded_raster_fonts.h"
 
-#include "agg_font_cache_manager.h"
-
 
 
 namespace kiva
 {
 
-#ifdef KIVA_USE_FREETYPE
-    typedef agg24::font_engine_freetype_int32 font_engine_type;
-#endif
-#ifdef KIVA_USE_WIN32
-    typedef agg24::font_engine_win32_tt_int32 font_engine_type;
-#endif
-    typedef agg24::font_cache_manager<font_engine_type> font_manager_type;
-
-    font_engine_type* GlobalFontEngine();
-    font_manager_type* GlobalFontManager();
-    void cleanup_font_threading_primitives();
-
 	class graphics_context_base
 	{
 	public:
@@ -68,6 +46,9 @@ namespace kiva
         // (TODO-PZW: revisit this)
         kiva::interpolation_e _image_interpolation;
 
+        // The number of threads used to rasterize paths and images.
+        int _threads;
+
         // text handling.
 
         graphics_context_base(unsigned char *data,
@@ -86,6 +67,8 @@ namespace kiva
         agg24::rendering_buffer& rendering_buffer();
         kiva::interpolation_e get_image_interpolation();
         void set_image_interpolation(interpolation_e interpolation);
+        int get_threads();
+        void set_threads(int threads);
 
         //---------------------------------------------------------------
         // set graphics_state values
@@ -152,6 +135,15 @@ namespace kiva
 
         bool show_text_at_point(char *text, double tx, double ty);
 
+        // Draws each string at the point with the same index without
+        // moving the text position.  anchors holds no (ax, ay) pairs, a
+        // single pair used for every string, or one pair per string; each
+        // string's origin is moved left by ax times its width and down by
+        // ay times its height.
+        virtual bool show_texts(std::vector<std::string>& texts,
+                                double* pts, int Npts,
+                                double* anchors, int Nanchors);
+
         // This will always return a font_type object.  The font's
         // is_loaded() method should be checked to see if the font is valid.
         kiva::font_type& get_font();
@@ -164,6 +156,11 @@ namespace kiva
         // has been properly loaded and initialized.
         kiva::rect_type get_text_extent(char *text);
 
+        // Stores the (x, y, w, h) extent of each string in a row of
+        // extents, which must have room for Nextents rows of 4 values.
+        void get_text_extents(std::vector<std::string>& texts,
+                              double* extents, int Nextents);
+
         bool get_text_bbox_as_rect(char *text);
 
         //---------------------------------------------------------------
@@ -248,6 +245,16 @@ namespace kiva
         kiva::rect_type _get_path_bounds();
 
         void lines(double* pts, int Npts);
+        // With break_on_nan, points which aren't finite are left out and
+        // the line starts again from the next finite point.
+        void lines(double* pts, int Npts, bool break_on_nan);
+        // Adds a polyline through the points, reducing the points in each
+        // device pixel column to the ones which stroking them can draw (see
+        // compiled_path::decimated_lines()).  Since that moves the dashes
+        // of a dashed line, dashed lines are only reduced when min_density
+        // is 0, which is what lines(decimate=True) passes to force it.
+        void decimated_lines(double* pts, int Npts, double min_density,
+                             bool break_on_nan=false);
         void line_set(double* start, int Nstart, double* end, int Nend);
 
         void rect(double x, double y, double sx, double sy);
@@ -309,6 +316,36 @@ namespace kiva
                                   kiva::compiled_path& marker,
                                   draw_mode_e mode) = 0;
 
+        // Like the methods above, but with an RGBA color for each point
+        // (Ncolors == Npts) and, for markers, a size for each point
+        // (Nsizes == Npts).  When Ncolors or Nsizes is 0, the current
+        // color or the given size is used for every point.
+        //
+        // A point's color replaces the fill color, or the stroke color when
+        // the marker is only stroked.
+        virtual int draw_marker_at_points(double* pts,int Npts,int size,
+                                   agg24::marker_e type,
+                                   double* colors, int Ncolors,
+                                   double* sizes, int Nsizes);
+
+        virtual void draw_path_at_points(double* pts,int Npts,
+                                  kiva::compiled_path& marker,
+                                  draw_mode_e mode,
+                                  double* colors, int Ncolors);
+
+        // Draw a path at all the points in the list, like
+        // draw_path_at_points(), but allow each copy to be moved by up to
+        // tolerance pixels.  This lets a backend render the marker once
+        // for a few subpixel offsets and blend the result at every point.
+        //
+        // Returns: int
+        //          0 if the path was drawn exactly at every point
+        //          1 if it was stamped
+        virtual int stamp_path_at_points(double* pts, int Npts,
+                                         kiva::compiled_path& marker,
+                                         draw_mode_e mode, double tolerance,
+                                         double* colors=NULL, int Ncolors=0);
+
         //---------------------------------------------------------------
         // Image handling
         //---------------------------------------------------------------
@@ -346,13 +383,29 @@ namespace kiva
                             const char* units="userSpaceOnUse");
 
     protected:
-        // Grabs and configure the font engine with the settings on our current
-        // state's font object.
+        // Grabs the font engine configured with the settings on our current
+        // state's font object from the calling thread's font cache.  The engine and
+        // its glyph cache manager are only valid until the matching call to
+        // _release_font_manager().
         void _grab_font_manager();
         void _release_font_manager();
 
+        // Measures a string with the grabbed font manager.
+        kiva::rect_type _text_extent(const std::string& text);
+
+        // Moves the origin (tx, ty) of a string passed to show_texts() by
+        // the string's anchor.
+        void _anchor_text_origin(char* text, double* anchors, int Nanchors,
+                                 int index, double* tx, double* ty);
+
+        // Whether renderer_markers draws a marker type with the line color
+        // alone, so that a point's color replaces the stroke color.
+        static bool _is_line_marker(agg24::marker_e type);
+
         bool _is_font_initialized;
 
+        font_cache_entry* _font_cache_entry;
+
     };
 
 
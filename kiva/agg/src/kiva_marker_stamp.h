@@ -0,0 +1,156 @@
+#ifndef KIVA_MARKER_STAMP_H
+#define KIVA_MARKER_STAMP_H
+
+#include <math.h>
+#include <vector>
+
+#include "agg_basics.h"
+
+namespace kiva
+{
+    // Stamps are rendered at no more than this many subpixel offsets along
+    // each axis.
+    const int max_stamp_phases = 8;
+
+    // Returns the number of subpixel offsets along each axis that a stamp
+    // needs so that no marker is moved by more than tolerance pixels, or 0
+    // if the tolerance is too small for stamping.
+    inline int stamp_phases(double tolerance)
+    {
+        if (tolerance <= 0.0)
+            return 0;
+        if (tolerance >= 0.5)
+            return 1;
+        int phases = int(ceil(0.5 / tolerance - 1e-9));
+        return phases > max_stamp_phases ? 0 : phases;
+    }
+
+    //---------------------------------------------------------------------
+    // Records the coverage of a shape which is rendered into it, so that
+    // the shape can then be blended anywhere without rasterizing it again.
+    //
+    // It has the parts of the renderer_base interface which Agg's scanline
+    // and primitive renderers use.  Colors are ignored, since they are only
+    // chosen when the coverage is blended.
+    //---------------------------------------------------------------------
+    template<class ColorT>
+    class coverage_recorder
+    {
+        public:
+            typedef ColorT color_type;
+
+            struct span
+            {
+                int x;
+                int y;
+                // A negative length marks a solid span which only has a
+                // single cover value.
+                int len;
+                // Index of the span's first cover value in covers.
+                unsigned start;
+            };
+
+            std::vector<span> spans;
+            std::vector<agg24::int8u> covers;
+
+            void clear()
+            {
+                this->spans.clear();
+                this->covers.clear();
+            }
+
+            void blend_solid_hspan(int x, int y, int len, const color_type&,
+                                   const agg24::int8u* span_covers)
+            {
+                span s = {x, y, len, unsigned(this->covers.size())};
+                this->spans.push_back(s);
+                this->covers.insert(this->covers.end(), span_covers,
+                                    span_covers + len);
+            }
+
+            void blend_hline(int x1, int y, int x2, const color_type&,
+                             agg24::int8u cover)
+            {
+                if (x1 > x2)
+                {
+                    int tmp = x1;
+                    x1 = x2;
+                    x2 = tmp;
+                }
+                span s = {x1, y, x1 - x2 - 1, unsigned(this->covers.size())};
+                this->spans.push_back(s);
+                this->covers.push_back(cover);
+            }
+
+            void blend_vline(int x, int y1, int y2, const color_type& c,
+                             agg24::int8u cover)
+            {
+                if (y1 > y2)
+                {
+                    int tmp = y1;
+                    y1 = y2;
+                    y2 = tmp;
+                }
+                for (int y = y1; y <= y2; y++)
+                {
+                    this->blend_hline(x, y, x, c, cover);
+                }
+            }
+
+            void blend_bar(int x1, int y1, int x2, int y2, const color_type& c,
+                           agg24::int8u cover)
+            {
+                if (y1 > y2)
+                {
+                    int tmp = y1;
+                    y1 = y2;
+                    y2 = tmp;
+                }
+                for (int y = y1; y <= y2; y++)
+                {
+                    this->blend_hline(x1, y, x2, c, cover);
+                }
+            }
+
+            void blend_pixel(int x, int y, const color_type& c,
+                             agg24::int8u cover)
+            {
+                this->blend_hline(x, y, x, c, cover);
+            }
+
+            // Blends the recorded coverage into a renderer with its origin
+            // moved to (x, y).
+            template<class Renderer>
+            void blend(Renderer& ren, int x, int y, const color_type& c) const
+            {
+                typename std::vector<span>::const_iterator s;
+                for (s = this->spans.begin(); s != this->spans.end(); ++s)
+                {
+                    if (s->len > 0)
+                    {
+                        ren.blend_solid_hspan(x + s->x, y + s->y, s->len, c,
+                                              &this->covers[s->start]);
+                    }
+                    else
+                    {
+                        ren.blend_hline(x + s->x, y + s->y,
+                                        x + s->x - s->len - 1, c,
+                                        this->covers[s->start]);
+                    }
+                }
+            }
+    };
+
+    //---------------------------------------------------------------------
+    // The fill and stroke coverage of a marker rendered at one subpixel
+    // offset.
+    //---------------------------------------------------------------------
+    template<class ColorT>
+    struct marker_stamp
+    {
+        coverage_recorder<ColorT> fill;
+        coverage_recorder<ColorT> stroke;
+    };
+}
+
+#endif /* KIVA_MARKER_STAMP_H */
@@ -0,0 +1,211 @@
+#ifdef _WIN32 // Win32 threads
+    #include <windows.h>
+    #include <process.h>
+#else        // POSIX threads
+    #include <pthread.h>
+#endif
+
+#include <deque>
+
+#include "kiva_parallel.h"
+
+using namespace kiva;
+
+// The pool never has more worker threads than this.
+static const int max_workers = 64;
+
+namespace
+{
+    // The calls of one run_parallel() which haven't finished yet.
+    struct parallel_job
+    {
+        int remaining;
+    };
+
+    struct parallel_call
+    {
+        parallel_task task;
+        void* arg;
+        parallel_job* job;
+    };
+}
+
+// The calls waiting for a worker, and the number of workers started.  The
+// workers live as long as the process, so the queue is never deleted.
+// Both are only touched with the pool locked.
+static std::deque<parallel_call>* gQueue = NULL;
+static int gWorkers = 0;
+
+static void _worker_loop();
+
+// Win32 threads
+#ifdef _WIN32
+
+static SRWLOCK gPoolLock = SRWLOCK_INIT;
+static CONDITION_VARIABLE gWorkReady = CONDITION_VARIABLE_INIT;
+static CONDITION_VARIABLE gWorkDone = CONDITION_VARIABLE_INIT;
+
+static void _lock_pool()
+{
+    AcquireSRWLockExclusive(&gPoolLock);
+}
+
+static void _unlock_pool()
+{
+    ReleaseSRWLockExclusive(&gPoolLock);
+}
+
+static void _wait(CONDITION_VARIABLE* condition)
+{
+    SleepConditionVariableSRW(condition, &gPoolLock, INFINITE, 0);
+}
+
+static void _wake_all(CONDITION_VARIABLE* condition)
+{
+    WakeAllConditionVariable(condition);
+}
+
+static unsigned __stdcall _run_worker(void*)
+{
+    _worker_loop();
+    return 0;
+}
+
+static bool _start_worker()
+{
+    HANDLE thread = (HANDLE)_beginthreadex(NULL, 0, _run_worker, NULL, 0,
+                                           NULL);
+    if (thread == 0)
+        return false;
+    CloseHandle(thread);
+    return true;
+}
+
+// POSIX threads
+#else
+
+static pthread_mutex_t gPoolLock = PTHREAD_MUTEX_INITIALIZER;
+static pthread_cond_t gWorkReady = PTHREAD_COND_INITIALIZER;
+static pthread_cond_t gWorkDone = PTHREAD_COND_INITIALIZER;
+
+static void _lock_pool()
+{
+    pthread_mutex_lock(&gPoolLock);
+}
+
+static void _unlock_pool()
+{
+    pthread_mutex_unlock(&gPoolLock);
+}
+
+static void _wait(pthread_cond_t* condition)
+{
+    pthread_cond_wait(condition, &gPoolLock);
+}
+
+static void _wake_all(pthread_cond_t* condition)
+{
+    pthread_cond_broadcast(condition);
+}
+
+static void* _run_worker(void*)
+{
+    _worker_loop();
+    return NULL;
+}
+
+static bool _start_worker()
+{
+    pthread_t thread;
+    if (pthread_create(&thread, NULL, _run_worker, NULL) != 0)
+        return false;
+    pthread_detach(thread);
+    return true;
+}
+
+#endif  // _WIN32
+
+// Runs the next queued call.  The pool must be locked and the queue not
+// empty; the pool is unlocked while the call runs.
+static void _run_next_call()
+{
+    parallel_call call = gQueue->front();
+    gQueue->pop_front();
+    _unlock_pool();
+
+    call.task(call.arg);
+
+    _lock_pool();
+    call.job->remaining--;
+    if (call.job->remaining == 0)
+    {
+        _wake_all(&gWorkDone);
+    }
+}
+
+static void _worker_loop()
+{
+    _lock_pool();
+    for (;;)
+    {
+        while (gQueue->empty())
+        {
+            _wait(&gWorkReady);
+        }
+        _run_next_call();
+    }
+}
+
+void kiva::run_parallel(parallel_task task, void** args, int count)
+{
+    if (count <= 0)
+    {
+        return;
+    }
+    if (count == 1)
+    {
+        task(args[0]);
+        return;
+    }
+
+    parallel_job job;
+    job.remaining = count - 1;
+
+    _lock_pool();
+    if (gQueue == NULL)
+    {
+        gQueue = new std::deque<parallel_call>();
+    }
+    for (int i = 0; i < count - 1; i++)
+    {
+        parallel_call call = {task, args[i], &job};
+        gQueue->push_back(call);
+    }
+    // Start workers the first time they are needed, and keep them.
+    while (gWorkers < max_workers && gWorkers < (int)gQueue->size())
+    {
+        if (!_start_worker())
+            break;
+        gWorkers++;
+    }
+    _wake_all(&gWorkReady);
+    _unlock_pool();
+
+    task(args[count - 1]);
+
+    // Run queued calls rather than wait for them, which also gets the work
+    // done if no worker could be started.
+    _lock_pool();
+    while (job.remaining > 0)
+    {
+        if (!gQueue->empty())
+        {
+            _run_next_call();
+        }
+        else
+        {
+            _wait(&gWorkDone);
+        }
+    }
+    _unlock_pool();
+}
@@ -0,0 +1,16 @@
+#ifndef KIVA_PARALLEL_H
+#define KIVA_PARALLEL_H
+
+namespace kiva
+{
+    typedef void (*parallel_task)(void* arg);
+
+    // Calls task(args[i]) for each of the count arguments, and returns once
+    // they have all finished.  The calls are shared between the calling
+    // thread and a pool of worker threads, which are started the first time
+    // they are needed and then kept for later calls.  Tasks must not touch
+    // Python objects, since the calling thread may not hold the GIL.
+    void run_parallel(parallel_task task, void** args, int count);
+}
+
+#endif /* KIVA_PARALLEL_H */
@@ -0,0 +1,233 @@
+#ifndef KIVA_PIXEL_CONVERT_H
+#define KIVA_PIXEL_CONVERT_H
+
+#include <string.h>
+
+#include "agg_basics.h"
+
+#include "kiva_constants.h"
+
+namespace kiva
+{
+    //---------------------------------------------------------------------
+    // Readers and writers of single pixels in each of the kiva pixel
+    // formats.  Colors are passed as 8 bit r, g, b and a values, and formats
+    // without alpha read as opaque.  The packed formats and gray8 are
+    // converted the same way as Agg's pixel formats convert them.
+    //---------------------------------------------------------------------
+
+    template<int Bytes, int R, int G, int B, int A>
+    struct byte_pixel
+    {
+        enum { bytes = Bytes };
+
+        static inline void read(const agg24::int8u* p, unsigned& r,
+                                unsigned& g, unsigned& b, unsigned& a)
+        {
+            r = p[R];
+            g = p[G];
+            b = p[B];
+            a = A < 0 ? 255 : p[A < 0 ? 0 : A];
+        }
+
+        static inline void write(agg24::int8u* p, unsigned r, unsigned g,
+                                 unsigned b, unsigned a)
+        {
+            p[R] = agg24::int8u(r);
+            p[G] = agg24::int8u(g);
+            p[B] = agg24::int8u(b);
+            if (A >= 0)
+                p[A < 0 ? 0 : A] = agg24::int8u(a);
+        }
+    };
+
+    typedef byte_pixel<3, 0, 1, 2, -1> rgb24_pixel;
+    typedef byte_pixel<3, 2, 1, 0, -1> bgr24_pixel;
+    typedef byte_pixel<4, 0, 1, 2, 3> rgba32_pixel;
+    typedef byte_pixel<4, 1, 2, 3, 0> argb32_pixel;
+    typedef byte_pixel<4, 3, 2, 1, 0> abgr32_pixel;
+    typedef byte_pixel<4, 2, 1, 0, 3> bgra32_pixel;
+
+    struct gray8_pixel
+    {
+        enum { bytes = 1 };
+
+        static inline void read(const agg24::int8u* p, unsigned& r,
+                                unsigned& g, unsigned& b, unsigned& a)
+        {
+            r = g = b = p[0];
+            a = 255;
+        }
+
+        static inline void write(agg24::int8u* p, unsigned r, unsigned g,
+                                 unsigned b, unsigned a)
+        {
+            // The ITU-R BT.709 luminance used by Agg's gray8.
+            p[0] = agg24::int8u((55u * r + 184u * g + 18u * b) >> 8);
+        }
+    };
+
+    struct rgb555_pixel
+    {
+        enum { bytes = 2 };
+
+        static inline void read(const agg24::int8u* p, unsigned& r,
+                                unsigned& g, unsigned& b, unsigned& a)
+        {
+            agg24::int16u pix;
+            memcpy(&pix, p, 2);
+            r = (pix >> 7) & 0xF8;
+            g = (pix >> 2) & 0xF8;
+            b = (pix << 3) & 0xF8;
+            a = 255;
+        }
+
+        static inline void write(agg24::int8u* p, unsigned r, unsigned g,
+                                 unsigned b, unsigned a)
+        {
+            agg24::int16u pix = agg24::int16u(
+                ((r & 0xF8) << 7) | ((g & 0xF8) << 2) | (b >> 3) | 0x8000);
+            memcpy(p, &pix, 2);
+        }
+    };
+
+    struct rgb565_pixel
+    {
+        enum { bytes = 2 };
+
+        static inline void read(const agg24::int8u* p, unsigned& r,
+                                unsigned& g, unsigned& b, unsigned& a)
+        {
+            agg24::int16u pix;
+            memcpy(&pix, p, 2);
+            r = (pix >> 8) & 0xF8;
+            g = (pix >> 3) & 0xFC;
+            b = (pix << 3) & 0xF8;
+            a = 255;
+        }
+
+        static inline void write(agg24::int8u* p, unsigned r, unsigned g,
+                                 unsigned b, unsigned a)
+        {
+            agg24::int16u pix = agg24::int16u(
+                ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3));
+            memcpy(p, &pix, 2);
+        }
+    };
+
+    // Converts the rows of an image.  Each pixel is read completely before
+    // it is written, so src and dst may be the same buffer when both
+    // formats have the same number of bytes per pixel.
+    template<class SrcPixel, class DstPixel>
+    void convert_pixel_rows(const agg24::int8u* src, int src_stride,
+                            agg24::int8u* dst, int dst_stride,
+                            int width, int height)
+    {
+        unsigned r, g, b, a;
+        for (int y = 0; y < height; ++y)
+        {
+            const agg24::int8u* s = src + y * src_stride;
+            agg24::int8u* d = dst + y * dst_stride;
+            for (int x = 0; x < width; ++x)
+            {
+                SrcPixel::read(s, r, g, b, a);
+                DstPixel::write(d, r, g, b, a);
+                s += SrcPixel::bytes;
+                d += DstPixel::bytes;
+            }
+        }
+    }
+
+    template<class SrcPixel>
+    bool convert_pixels_from(const agg24::int8u* src, int src_stride,
+                             agg24::int8u* dst, int dst_stride,
+                             pix_format_e dst_format, int width, int height)
+    {
+        switch (dst_format)
+        {
+            case pix_format_gray8:
+                convert_pixel_rows<SrcPixel, gray8_pixel>(
+                    src, src_stride, dst, dst_stride, width, height);
+                return true;
+            case pix_format_rgb555:
+                convert_pixel_rows<SrcPixel, rgb555_pixel>(
+                    src, src_stride, dst, dst_stride, width, height);
+                return true;
+            case pix_format_rgb565:
+                convert_pixel_rows<SrcPixel, rgb565_pixel>(
+                    src, src_stride, dst, dst_stride, width, height);
+                return true;
+            case pix_format_rgb24:
+                convert_pixel_rows<SrcPixel, rgb24_pixel>(
+                    src, src_stride, dst, dst_stride, width, height);
+                return true;
+            case pix_format_bgr24:
+                convert_pixel_rows<SrcPixel, bgr24_pixel>(
+                    src, src_stride, dst, dst_stride, width, height);
+                return true;
+            case pix_format_rgba32:
+                convert_pixel_rows<SrcPixel, rgba32_pixel>(
+                    src, src_stride, dst, dst_stride, width, height);
+                return true;
+            case pix_format_argb32:
+                convert_pixel_rows<SrcPixel, argb32_pixel>(
+                    src, src_stride, dst, dst_stride, width, height);
+                return true;
+            case pix_format_abgr32:
+                convert_pixel_rows<SrcPixel, abgr32_pixel>(
+                    src, src_stride, dst, dst_stride, width, height);
+                return true;
+            case pix_format_bgra32:
+                convert_pixel_rows<SrcPixel, bgra32_pixel>(
+                    src, src_stride, dst, dst_stride, width, height);
+                return true;
+            default:
+                return false;
+        }
+    }
+
+    // Converts an image from one pixel format to another by copying and
+    // reordering its channels, without any blending.  Returns false if
+    // either format is not known.
+    inline bool convert_pixels(const agg24::int8u* src, int src_stride,
+                               pix_format_e src_format,
+                               agg24::int8u* dst, int dst_stride,
+                               pix_format_e dst_format,
+                               int width, int height)
+    {
+        switch (src_format)
+        {
+            case pix_format_gray8:
+                return convert_pixels_from<gray8_pixel>(
+                    src, src_stride, dst, dst_stride, dst_format, width, height);
+            case pix_format_rgb555:
+                return convert_pixels_from<rgb555_pixel>(
+                    src, src_stride, dst, dst_stride, dst_format, width, height);
+            case pix_format_rgb565:
+                return convert_pixels_from<rgb565_pixel>(
+                    src, src_stride, dst, dst_stride, dst_format, width, height);
+            case pix_format_rgb24:
+                return convert_pixels_from<rgb24_pixel>(
+                    src, src_stride, dst, dst_stride, dst_format, width, height);
+            case pix_format_bgr24:
+                return convert_pixels_from<bgr24_pixel>(
+                    src, src_stride, dst, dst_stride, dst_format, width, height);
+            case pix_format_rgba32:
+                return convert_pixels_from<rgba32_pixel>(
+                    src, src_stride, dst, dst_stride, dst_format, width, height);
+            case pix_format_argb32:
+                return convert_pixels_from<argb32_pixel>(
+                    src, src_stride, dst, dst_stride, dst_format, width, height);
+            case pix_format_abgr32:
+                return convert_pixels_from<abgr32_pixel>(
+                    src, src_stride, dst, dst_stride, dst_format, width, height);
+            case pix_format_bgra32:
+                return convert_pixels_from<bgra32_pixel>(
+                    src, src_stride, dst, dst_stride, dst_format, width, height);
+            default:
+                return false;
+        }
+    }
+}
+
+#endif
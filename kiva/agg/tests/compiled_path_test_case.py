@@ -219,6 +219,20 @@ class TestCompiledPath(unittest.TestCase, Utils):
                  [4.0,4.0]]
         self.base_helper_lines(lines)
 
+    def test_lines_break_on_nan(self):
+        nan = float('nan')
+        lines = array(((3.0, 3.0), (4.0, 4.0), (nan, 5.0), (6.0, 6.0),
+                       (7.0, 7.0), (float('inf'), 8.0)))
+        path = agg.CompiledPath()
+        path.lines(lines, break_on_nan=True)
+        actual = path._vertices()
+        desired = array(((3.0,3.0,agg.path_cmd_move_to, agg.path_flags_none),
+                         (4.0,4.0,agg.path_cmd_line_to, agg.path_flags_none),
+                         (6.0,6.0,agg.path_cmd_move_to, agg.path_flags_none),
+                         (7.0,7.0,agg.path_cmd_line_to, agg.path_flags_none),
+                         (0.0,0.0,agg.path_cmd_stop, agg.path_flags_none),))
+        self.assertRavelEqual(actual, desired)
+
     def test_rect(self):
         path = agg.CompiledPath()
         path.rect(1.0,1.0,1.0,1.0)
@@ -0,0 +1,191 @@
+import threading
+import unittest
+
+from numpy import all, array_equal
+
+from kiva import agg
+from kiva.fonttools import Font
+
+
+class FontCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.old_capacity = agg.font_cache_capacity()
+        agg.clear_font_cache()
+        agg.reset_font_cache_stats()
+
+    def tearDown(self):
+        agg.set_font_cache_capacity(self.old_capacity)
+        agg.clear_font_cache()
+
+    def test_repeated_text_hits_cache(self):
+        gc = agg.GraphicsContextArray((100, 50))
+        gc.set_font(Font('modern', 12))
+        for i in range(10):
+            gc.get_text_extent("hello")
+            gc.show_text_at_point("hello", 5, 5)
+
+        info = agg.font_cache_info()
+        self.assertEqual(info['misses'], 1)
+        self.assertEqual(info['hits'], 19)
+        self.assertEqual(info['size'], 1)
+
+    def test_contexts_share_cache(self):
+        font = Font('modern', 12)
+        extents = []
+        for i in range(3):
+            gc = agg.GraphicsContextArray((100, 50))
+            gc.set_font(font)
+            extents.append(tuple(gc.get_text_extent("hello")))
+
+        self.assertEqual(agg.font_cache_misses(), 1)
+        self.assertEqual(agg.font_cache_hits(), 2)
+        self.assertEqual(len(set(extents)), 1)
+
+    def test_size_change_loads_new_entry(self):
+        gc = agg.GraphicsContextArray((100, 50))
+        gc.set_font(Font('modern', 12))
+        small = gc.get_text_extent("hello")
+        gc.set_font_size(24)
+        large = gc.get_text_extent("hello")
+
+        self.assertEqual(agg.font_cache_misses(), 2)
+        self.assertEqual(agg.font_cache_size(), 2)
+        self.assertTrue(large[2] > small[2])
+
+    def test_eviction(self):
+        agg.set_font_cache_capacity(2)
+        gc = agg.GraphicsContextArray((100, 50))
+        for size in (10, 12, 14, 10):
+            gc.set_font(Font('modern', size))
+            gc.get_text_extent("hello")
+
+        # The entry for size 10 was evicted by the time it was used again.
+        self.assertEqual(agg.font_cache_misses(), 4)
+        self.assertEqual(agg.font_cache_size(), 2)
+
+    def test_show_text_after_extent(self):
+        # Measuring text must not leave a glyph transform behind which
+        # affects drawing, and vice versa.
+        gc = agg.GraphicsContextArray((100, 50))
+        gc.set_font(Font('modern', 12))
+        before = gc.get_text_extent("hello")
+        gc.translate_ctm(10, 10)
+        gc.rotate_ctm(0.5)
+        gc.show_text_at_point("hello", 0, 0)
+        after = gc.get_text_extent("hello")
+
+        self.assertEqual(tuple(before), tuple(after))
+        self.assertFalse(all(gc.bmp_array == 255))
+
+
+class GlyphAtlasTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.old_budget = agg.glyph_atlas_budget()
+        agg.clear_glyph_atlas()
+        agg.reset_glyph_atlas_stats()
+
+    def tearDown(self):
+        agg.set_glyph_atlas_budget(self.old_budget)
+        agg.clear_glyph_atlas()
+
+    def draw_text(self, text, angle=0.0):
+        gc = agg.GraphicsContextArray((100, 50))
+        gc.set_font(Font('modern', 12))
+        gc.translate_ctm(5, 10)
+        gc.rotate_ctm(angle)
+        gc.show_text_at_point(text, 0, 0)
+        return gc.bmp_array.copy()
+
+    def test_redraw_hits_atlas(self):
+        first = self.draw_text("hello")
+        info = agg.glyph_atlas_info()
+        self.assertEqual(info['misses'], 4)
+        self.assertEqual(info['hits'], 1)
+        self.assertEqual(info['size'], 4)
+        self.assertTrue(info['bytes'] > 0)
+
+        # A second context draws every glyph from the atlas, and the result
+        # is the same as rasterizing them.
+        second = self.draw_text("hello")
+        self.assertEqual(agg.glyph_atlas_misses(), 4)
+        self.assertEqual(agg.glyph_atlas_hits(), 6)
+        self.assertTrue(array_equal(first, second))
+        self.assertFalse(all(second == 255))
+
+    def test_transform_selects_glyphs(self):
+        self.draw_text("hello")
+        self.draw_text("hello", angle=0.5)
+        self.assertEqual(agg.glyph_atlas_size(), 8)
+
+        # Nearly identical transforms share their glyphs.
+        self.draw_text("hello", angle=0.5 + 1e-5)
+        self.assertEqual(agg.glyph_atlas_size(), 8)
+
+    def test_budget_evicts(self):
+        self.draw_text("abcdefghij")
+        full = agg.glyph_atlas_bytes()
+        agg.set_glyph_atlas_budget(full // 2)
+        self.assertTrue(agg.glyph_atlas_bytes() <= full // 2)
+        self.assertTrue(0 < agg.glyph_atlas_size() < 10)
+
+        # Drawing with a tiny budget still works, one glyph at a time.
+        agg.set_glyph_atlas_budget(1)
+        self.assertTrue(array_equal(self.draw_text("abcdefghij"),
+                                    self.draw_text("abcdefghij")))
+        self.assertEqual(agg.glyph_atlas_size(), 1)
+
+    def test_clear_font_cache_keeps_atlas_valid(self):
+        first = self.draw_text("hello")
+        agg.clear_font_cache()
+        self.assertTrue(array_equal(first, self.draw_text("hello")))
+
+
+class ThreadedFontCacheTestCase(unittest.TestCase):
+
+    def draw_labels(self, size):
+        gc = agg.GraphicsContextArray((200, 200))
+        gc.set_font(Font('modern', size))
+        for i in range(20):
+            gc.show_text_at_point("label %d" % i, 5, 5 + 9 * i)
+        return gc.bmp_array.copy()
+
+    def test_threads_have_separate_caches(self):
+        agg.clear_font_cache()
+        agg.reset_font_cache_stats()
+        info = {}
+
+        def worker():
+            self.draw_labels(12)
+            info.update(agg.font_cache_info())
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+        self.assertEqual(info['misses'], 1)
+        self.assertEqual(agg.font_cache_misses(), 0)
+        self.assertEqual(agg.font_cache_size(), 0)
+
+    def test_concurrent_text_rendering(self):
+        sizes = (10, 12, 14, 16) * 2
+        expected = [self.draw_labels(size) for size in sizes]
+        results = [None] * len(sizes)
+
+        def worker(i):
+            results[i] = self.draw_labels(sizes[i])
+
+        threads = [threading.Thread(target=worker, args=(i,))
+                   for i in range(len(sizes))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for actual, desired in zip(results, expected):
+            self.assertTrue(array_equal(actual, desired))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,9 +2,15 @@ from __future__ import with_statement
 
 import unittest
 
-from numpy import all, allclose, array, dtype, pi, ones
+from numpy import (
+    all, allclose, arange, array, array_equal, column_stack, dtype, linspace,
+    ones, pi, random, sin
+)
 
 from kiva import agg
+from kiva.constants import (
+    CIRCLE_MARKER, CROSS_MARKER, FILL, SQUARE_MARKER, STROKE
+)
 from kiva.fonttools import Font
 
 
@@ -345,6 +351,224 @@ class GraphicsContextArrayTestCase(unittest.TestCase):
         self.assertEqual(font1.style, font3.style)
         self.assertEqual(font1.encoding, font3.encoding)
 
+    def test_get_text_extents(self):
+        gc = agg.GraphicsContextArray((5, 5))
+        gc.set_font(Font('modern', 12))
+        texts = ["one", "two", u"thr\xe9e", "", "one"]
+        desired = array([gc.get_text_extent(text) for text in texts])
+        actual = gc.get_text_extents(texts)
+        self.assertEqual(actual.shape, (5, 4))
+        self.assertTrue(array_equal(actual, desired))
+        self.assertEqual(gc.get_text_extents([]).shape, (0, 4))
+
+        gc.set_font_size(24)
+        self.assertTrue(all(gc.get_text_extents(texts)[:3, 2] >
+                            desired[:3, 2]))
+
+    def _text_gc(self):
+        gc = agg.GraphicsContextArray((200, 100))
+        gc.set_font(Font('modern', 12))
+        gc.translate_ctm(10, 5)
+        gc.rotate_ctm(0.1)
+        return gc
+
+    def test_show_texts(self):
+        texts = ["one", "two", u"thr\xe9e"]
+        points = array([[10, 10], [60, 40], [100, 70]], dtype=float)
+
+        desired = self._text_gc()
+        for text, (x, y) in zip(texts, points):
+            desired.show_text_at_point(text, x, y)
+
+        gc = self._text_gc()
+        gc.set_text_position(3, 4)
+        gc.show_texts(texts, points)
+        self.assertTrue(array_equal(gc.bmp_array, desired.bmp_array))
+        self.assertTrue(allclose(gc.get_text_position(), (3, 4)))
+
+    def test_show_texts_anchors(self):
+        texts = ["one", "two", "three"]
+        points = array([[10, 10], [60, 40], [100, 70]], dtype=float)
+        anchors = array([[0.5, 0.5], [1.0, 0.0], [0.0, 1.0]])
+
+        desired = self._text_gc()
+        for text, (x, y), (ax, ay) in zip(texts, points, anchors):
+            w, h, descent, leading = desired.get_full_text_extent(text)
+            desired.show_text_at_point(text, x - ax * w, y - ay * h)
+
+        gc = self._text_gc()
+        gc.show_texts(texts, points, anchors)
+        self.assertTrue(array_equal(gc.bmp_array, desired.bmp_array))
+
+        # A single anchor applies to every string.
+        centered = self._text_gc()
+        centered.show_texts(texts, points, [anchors[0]] * 3)
+        gc = self._text_gc()
+        gc.show_texts(texts, points, anchors[0])
+        self.assertTrue(array_equal(gc.bmp_array, centered.bmp_array))
+
+    def test_show_texts_multiline(self):
+        # Strings with several lines are drawn like show_text() draws them.
+        texts = ["one", "two\nlines", "three"]
+        points = array([[10, 10], [60, 40], [100, 70]], dtype=float)
+        anchors = array([[0.5, 0.5], [1.0, 0.0], [0.0, 1.0]])
+
+        desired = self._text_gc()
+        for text, (x, y), (ax, ay) in zip(texts, points, anchors):
+            w, h, descent, leading = desired.get_full_text_extent(text)
+            desired.show_text(text, (x - ax * w, y - ay * h))
+
+        gc = self._text_gc()
+        gc.show_texts(texts, points, anchors)
+        self.assertTrue(array_equal(gc.bmp_array, desired.bmp_array))
+
+    def test_show_texts_bad_input(self):
+        gc = self._text_gc()
+        points = array([[10, 10], [60, 40]], dtype=float)
+        self.assertRaises(ValueError, gc.show_texts, ["one"], points)
+        self.assertRaises(ValueError, gc.show_texts, ["one", "two"], points,
+                          ones((3, 2)))
+        self.assertRaises(TypeError, gc.show_texts, ["one", 2], points)
+
+    def _marker_points(self):
+        # Markers which don't overlap, so that the order they are drawn in
+        # doesn't matter.
+        points = array([[x, y] for x in range(10, 100, 20)
+                        for y in range(10, 100, 20)], dtype=float)
+        colors = random.RandomState(0).uniform(size=(len(points), 4))
+        sizes = 2.0 + (arange(len(points)) % 5)
+        return points, colors, sizes
+
+    def test_draw_marker_at_points_colors_and_sizes(self):
+        points, colors, sizes = self._marker_points()
+        for marker in (SQUARE_MARKER, CIRCLE_MARKER, CROSS_MARKER):
+            desired = agg.GraphicsContextArray((100, 100))
+            for point, color, size in zip(points, colors, sizes):
+                # Crosses are only stroked.
+                if marker == CROSS_MARKER:
+                    desired.set_stroke_color(color)
+                else:
+                    desired.set_fill_color(color)
+                desired.draw_marker_at_points([point], size, marker)
+
+            gc = agg.GraphicsContextArray((100, 100))
+            gc.draw_marker_at_points(points, 3, marker, colors=colors,
+                                     sizes=sizes)
+            self.assertTrue(array_equal(gc.bmp_array, desired.bmp_array))
+            self.assertTrue(array_equal(gc.get_fill_color(), (0, 0, 0, 1)))
+
+    def test_draw_path_at_points_colors(self):
+        points, colors, sizes = self._marker_points()
+        for mode in (FILL, STROKE):
+            desired = agg.GraphicsContextArray((100, 100))
+            path = desired.get_empty_path()
+            path.rect(-3, -3, 6, 6)
+            for point, color in zip(points, colors):
+                if mode == STROKE:
+                    desired.set_stroke_color(color)
+                else:
+                    desired.set_fill_color(color)
+                desired.draw_path_at_points([point], path, mode)
+
+            for stamp_tolerance in (0.0, 0.5):
+                gc = agg.GraphicsContextArray((100, 100))
+                gc.draw_path_at_points(points, path, mode, colors=colors,
+                                       stamp_tolerance=stamp_tolerance)
+                self.assertTrue(array_equal(gc.bmp_array, desired.bmp_array))
+
+    def test_draw_at_points_bad_colors(self):
+        gc = agg.GraphicsContextArray((100, 100))
+        points, colors, sizes = self._marker_points()
+        path = gc.get_empty_path()
+        self.assertRaises(ValueError, gc.draw_marker_at_points, points, 3,
+                          SQUARE_MARKER, colors=colors[:2])
+        self.assertRaises(ValueError, gc.draw_marker_at_points, points, 3,
+                          SQUARE_MARKER, sizes=sizes[:2])
+        self.assertRaises(ValueError, gc.draw_path_at_points, points, path,
+                          FILL, colors=colors[:, :2])
+
+    def _dense_line(self):
+        # Many points for each pixel column, in a band which zigzags up and
+        # down.
+        x = linspace(5, 95, 20000)
+        y = 50 + 20 * sin(x / 7.0) + random.RandomState(0).normal(size=x.shape)
+        return column_stack([x, y])
+
+    def _stroke_line(self, points, antialias=True, **kwargs):
+        gc = agg.GraphicsContextArray((100, 100))
+        gc.set_antialias(antialias)
+        gc.lines(points, **kwargs)
+        gc.stroke_path()
+        return gc.bmp_array.copy()
+
+    def test_lines_exact(self):
+        points = self._dense_line()
+        gc = agg.GraphicsContextArray((100, 100))
+        gc.move_to(*points[0])
+        for x, y in points[1:]:
+            gc.line_to(x, y)
+        gc.stroke_path()
+        desired = gc.bmp_array
+        self.assertTrue(array_equal(self._stroke_line(points, decimate=False),
+                                    desired))
+
+    def test_lines_decimation(self):
+        points = self._dense_line()
+        # Without antialiasing the stroke is the same, or very nearly so.
+        exact = self._stroke_line(points, antialias=False, decimate=False)
+        decimated = self._stroke_line(points, antialias=False)
+        drawn = (exact[..., 0] != 255).sum()
+        changed = (exact[..., 0] != decimated[..., 0]).sum()
+        self.assertLess(changed, 0.01 * drawn)
+
+        # The antialiased edges show that the points were reduced.
+        exact = self._stroke_line(points, decimate=False)
+        decimated = self._stroke_line(points)
+        self.assertFalse(array_equal(exact, decimated))
+        self.assertTrue(array_equal(self._stroke_line(points, decimate=True),
+                                    decimated))
+
+        # Points are reduced in device space.
+        gc = agg.GraphicsContextArray((100, 100))
+        gc.scale_ctm(0.1, 1.0)
+        gc.lines(points * [10, 1])
+        gc.stroke_path()
+        self.assertTrue(array_equal(gc.bmp_array, decimated))
+
+    def test_lines_decimation_threshold(self):
+        # Sparse lines and dashed lines are only reduced when asked to be.
+        points = self._dense_line()[::500]
+        self.assertTrue(array_equal(self._stroke_line(points),
+                                    self._stroke_line(points, decimate=False)))
+
+        points = self._dense_line()
+        images = []
+        for decimate in (None, False, True):
+            gc = agg.GraphicsContextArray((100, 100))
+            gc.set_line_dash([2, 2])
+            gc.lines(points, decimate=decimate)
+            gc.stroke_path()
+            images.append(gc.bmp_array)
+        self.assertTrue(array_equal(images[0], images[1]))
+        self.assertFalse(array_equal(images[0], images[2]))
+
+    def test_lines_break_on_nan(self):
+        # Gaps in a dense line are the same whether or not it is reduced.
+        points = self._dense_line()
+        gaps = points.copy()
+        gaps[5000:5200] = float('nan')
+        gaps[12000, 1] = float('inf')
+        for decimate in (None, False, True):
+            desired = agg.GraphicsContextArray((100, 100))
+            for run in (points[:5000], points[5200:12000], points[12001:]):
+                desired.lines(run, decimate=decimate)
+            desired.stroke_path()
+
+            gc = agg.GraphicsContextArray((100, 100))
+            gc.lines(gaps, decimate=decimate, break_on_nan=True)
+            gc.stroke_path()
+            self.assertTrue(array_equal(gc.bmp_array, desired.bmp_array))
+
     def test_set_line_dash_none(self):
         gc = agg.GraphicsContextArray((5,5))
         gc.set_line_dash(None)
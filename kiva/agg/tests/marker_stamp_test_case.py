@@ -0,0 +1,82 @@
+""" Tests for drawing markers with a stamp_tolerance.
+"""
+import unittest
+
+from numpy import array, array_equal, column_stack, pi, random
+
+from kiva import agg
+from kiva.constants import (
+    CIRCLE_MARKER, EOF_FILL_STROKE, FILL, FILL_STROKE, STROKE
+)
+
+
+def render(pts, mode=FILL_STROKE, stamp_tolerance=0.0, antialias=True,
+           line_width=1.0, alpha=1.0):
+    gc = agg.GraphicsContextArray((300, 200))
+    gc.set_antialias(antialias)
+    gc.set_line_width(line_width)
+    gc.set_alpha(alpha)
+    gc.set_fill_color((0.2, 0.5, 0.8, 0.7))
+    gc.set_stroke_color((0.8, 0.1, 0.1, 0.9))
+
+    path = gc.get_empty_path()
+    path.arc(0, 0, 4, 0, 2 * pi)
+    path.close_path()
+    path.rect(-2, 1, 5, 3)
+    gc.draw_path_at_points(pts, path, mode, stamp_tolerance=stamp_tolerance)
+    return gc.bmp_array.copy()
+
+
+class MarkerStampTestCase(unittest.TestCase):
+
+    def setUp(self):
+        state = random.RandomState(0)
+        # Keep the markers away from the edges of the buffer, where drawing
+        # them exactly clips their paths rather than their pixels.
+        self.pts = column_stack([state.randint(20, 280, 200),
+                                 state.randint(20, 180, 200)]).astype(float)
+
+    def test_whole_pixels_match_exact_drawing(self):
+        for mode in (FILL, STROKE, FILL_STROKE, EOF_FILL_STROKE):
+            for antialias in (True, False):
+                for line_width in (1.0, 3.0):
+                    expected = render(self.pts, mode, antialias=antialias,
+                                      line_width=line_width, alpha=0.5)
+                    actual = render(self.pts, mode, 0.25,
+                                    antialias=antialias,
+                                    line_width=line_width, alpha=0.5)
+                    self.assertTrue(array_equal(actual, expected))
+
+    def test_points_are_snapped_within_tolerance(self):
+        # A quarter of a pixel needs two offsets along each axis, so a point
+        # half way between them is rounded up.
+        expected = render(self.pts + 0.5)
+        actual = render(self.pts + 0.375, stamp_tolerance=0.25)
+        self.assertTrue(array_equal(actual, expected))
+
+    def test_stamp_path_at_points(self):
+        gc = agg.GraphicsContextArray((100, 100))
+        path = gc.get_empty_path()
+        path.rect(-2, -2, 4, 4)
+        pts = array([[10.0, 10.0], [50.0, 50.0]])
+        self.assertEqual(gc.stamp_path_at_points(pts, path, FILL, 0.1), 1)
+
+        # Tolerances which would need too many offsets and markers which
+        # are larger than the buffer are drawn exactly.
+        self.assertEqual(gc.stamp_path_at_points(pts, path, FILL, 0.01), 0)
+        path.rect(0, 0, 200, 200)
+        self.assertEqual(gc.stamp_path_at_points(pts, path, FILL, 0.1), 0)
+
+    def test_stamped_circle_marker(self):
+        # With half a pixel of tolerance, markers are moved to whole pixels.
+        gc = agg.GraphicsContextArray((300, 200))
+        gc.draw_marker_at_points(self.pts, 5, CIRCLE_MARKER)
+        expected = gc.bmp_array.copy()
+        gc = agg.GraphicsContextArray((300, 200))
+        gc.draw_marker_at_points(self.pts + 0.3, 5, CIRCLE_MARKER,
+                                 stamp_tolerance=0.5)
+        self.assertTrue(array_equal(gc.bmp_array, expected))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+
+from numpy import array, array_equal, random, uint8, uint16, zeros
+
+from kiva import agg
+
+
+def make_pixels(pix_format, shape=(7, 5)):
+    depth = agg.pix_format_bytes[pix_format]
+    if depth != 1:
+        shape = shape + (depth,)
+    return random.RandomState(0).randint(0, 256, shape).astype(uint8)
+
+
+class ConvertPixelsTestCase(unittest.TestCase):
+
+    def test_round_trip_32bit(self):
+        formats = ["rgba32", "argb32", "abgr32", "bgra32"]
+        src = make_pixels("rgba32")
+        for dst_format in formats:
+            converted = agg.convert_pixels(src, "rgba32", dst_format)
+            back = agg.convert_pixels(converted, dst_format, "rgba32")
+            self.assertTrue(array_equal(back, src), dst_format)
+
+    def test_channel_order(self):
+        src = array([[[1, 2, 3, 4]]], dtype=uint8)
+        self.assertEqual(
+            agg.convert_pixels(src, "rgba32", "argb32").tolist(),
+            [[[4, 1, 2, 3]]])
+        self.assertEqual(
+            agg.convert_pixels(src, "rgba32", "bgr24").tolist(),
+            [[[3, 2, 1]]])
+        rgb = array([[[1, 2, 3]]], dtype=uint8)
+        self.assertEqual(
+            agg.convert_pixels(rgb, "rgb24", "abgr32").tolist(),
+            [[[255, 3, 2, 1]]])
+
+    def test_alpha_is_not_blended(self):
+        gc = agg.GraphicsContextArray(make_pixels("bgra32"),
+                                      pix_format="bgra32")
+        converted = gc.convert_pixel_format("rgba32")
+        self.assertEqual(converted.format(), "rgba32")
+        self.assertTrue(array_equal(converted.bmp_array,
+                                    gc.bmp_array[..., [2, 1, 0, 3]]))
+
+    def test_gray8(self):
+        src = array([[[255, 0, 0], [0, 255, 0], [10, 10, 10]]], dtype=uint8)
+        gray = agg.convert_pixels(src, "rgb24", "gray8")
+        self.assertEqual(gray.shape, (1, 3))
+        self.assertEqual(gray.tolist(), [[54, 183, 10]])
+        rgba = agg.convert_pixels(gray, "gray8", "rgba32")
+        self.assertEqual(rgba[0, 2].tolist(), [10, 10, 10, 255])
+
+    def test_packed_formats(self):
+        src = array([[[255, 255, 255], [0x88, 0x44, 0x22]]], dtype=uint8)
+        rgb565 = agg.convert_pixels(src, "rgb24", "rgb565")
+        self.assertEqual(rgb565.view(uint16)[..., 0].tolist(),
+                         [[0xFFFF, 0x8A24]])
+        rgb555 = agg.convert_pixels(src, "rgb24", "rgb555")
+        self.assertEqual(rgb555.view(uint16)[..., 0].tolist(),
+                         [[0xFFFF, 0xC504]])
+        self.assertEqual(
+            agg.convert_pixels(rgb565, "rgb565", "rgb24").tolist(),
+            [[[0xF8, 0xFC, 0xF8], [0x88, 0x44, 0x20]]])
+        self.assertEqual(
+            agg.convert_pixels(rgb555, "rgb555", "rgb24").tolist(),
+            [[[0xF8, 0xF8, 0xF8], [0x88, 0x40, 0x20]]])
+
+    def test_out(self):
+        src = make_pixels("rgba32")
+        out = zeros(src.shape[:2] + (3,), dtype=uint8)
+        result = agg.convert_pixels(src, "rgba32", "bgr24", out=out)
+        self.assertIs(result, out)
+        self.assertTrue(array_equal(out, src[..., [2, 1, 0]]))
+
+    def test_out_in_place(self):
+        src = make_pixels("bgra32")
+        expected = src[..., [2, 1, 0, 3]]
+        agg.convert_pixels(src, "bgra32", "rgba32", out=src)
+        self.assertTrue(array_equal(src, expected))
+
+    def test_bad_out(self):
+        src = make_pixels("rgba32")
+        with self.assertRaises(ValueError):
+            agg.convert_pixels(src, "rgba32", "rgb24", out=src)
+        with self.assertRaises(ValueError):
+            agg.convert_pixels(src, "rgba32", "rgba32", out=src[1:])
+        with self.assertRaises(ValueError):
+            agg.convert_pixels(src, "rgba32", "rgba32", out=src[:, ::-1])
+        with self.assertRaises(ValueError):
+            agg.convert_pixels(src, "rgb24", "rgba32")
+
+
+class ConvertPixelFormatTestCase(unittest.TestCase):
+
+    def test_inplace_same_depth(self):
+        gc = agg.GraphicsContextArray(make_pixels("bgra32"),
+                                      pix_format="bgra32")
+        bmp_array = gc.bmp_array
+        expected = bmp_array[..., [3, 0, 1, 2]]
+        result = gc.convert_pixel_format("abgr32", inplace=1)
+        self.assertIs(result, gc)
+        self.assertEqual(gc.format(), "abgr32")
+        self.assertIs(gc.bmp_array, bmp_array)
+        self.assertTrue(array_equal(gc.bmp_array, expected))
+
+        # The gc still draws in its new format.
+        gc.set_fill_color((1.0, 0.0, 0.0, 1.0))
+        gc.rect(0, 0, 5, 7)
+        gc.fill_path()
+        self.assertEqual(gc.bmp_array[0, 0].tolist(), [255, 0, 0, 255])
+
+    def test_inplace_new_depth(self):
+        gc = agg.GraphicsContextArray(make_pixels("rgba32"),
+                                      pix_format="rgba32")
+        expected = gc.bmp_array[..., :3]
+        gc.convert_pixel_format("rgb24", inplace=1)
+        self.assertEqual(gc.format(), "rgb24")
+        self.assertTrue(array_equal(gc.bmp_array, expected))
+
+    def test_keeps_settings(self):
+        gc = agg.GraphicsContextArray((5, 7), interpolation="bilinear",
+                                      bottom_up=0)
+        converted = gc.convert_pixel_format("rgb24")
+        self.assertEqual(converted.get_image_interpolation(), "bilinear")
+        self.assertEqual(converted.bottom_up(), 0)
+
+    def test_unsupported_format(self):
+        gc = agg.GraphicsContextArray((5, 7))
+        for pix_format in ("gray8", "rgb555", "rgb565"):
+            with self.assertRaises(ValueError):
+                gc.convert_pixel_format(pix_format)
+        self.assertEqual(gc.format(), "bgra32")
+
+
+if __name__ == "__main__":
+    unittest.main()
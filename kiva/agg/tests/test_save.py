@@ -1,7 +1,9 @@
+import io
 import os
 import unittest
 
-from numpy import allclose, ravel
+from numpy import allclose, array, array_equal, ravel
+from PIL import Image
 
 import nose
 
@@ -46,5 +48,73 @@ class Test_Save(unittest.TestCase):
         self.assertEqual(list(ravel(img.bmp_array)),
                          self.format_output_map[fmt])
 
+
+class Test_SaveStream(unittest.TestCase):
+
+    def save(self, fmt, file_format):
+        gc = agg.GraphicsContextArray((4, 2), fmt)
+        gc.set_fill_color((1.0, 0.0, 0.0, 1.0))
+        gc.rect(0, 0, 2, 2)
+        gc.fill_path()
+        pixels = gc.bmp_array.copy()
+        test = self
+
+        class Stream(io.BytesIO):
+            def write(self, data):
+                # The pixels of the context are left alone during the save.
+                test.assertTrue(array_equal(gc.bmp_array, pixels))
+                return io.BytesIO.write(self, data)
+
+        stream = Stream()
+        gc.save(stream, file_format=file_format)
+        self.assertTrue(array_equal(gc.bmp_array, pixels))
+        stream.seek(0)
+        return array(Image.open(stream))
+
+    def test_formats_with_alpha(self):
+        for fmt in ("rgba32", "bgra32", "argb32", "abgr32"):
+            image = self.save(fmt, "png")
+            self.assertEqual(image[0, :, :].tolist(), [[255, 0, 0, 255]] * 2 +
+                             [[255, 255, 255, 255]] * 2)
+
+    def test_formats_without_alpha(self):
+        for fmt in ("rgb24", "bgr24", "bgra32"):
+            image = self.save(fmt, "bmp")
+            self.assertEqual(image[0, :, :].tolist(), [[255, 0, 0]] * 2 +
+                             [[255, 255, 255]] * 2)
+
+    def save_transparent(self, file_format):
+        # A half transparent red square on a transparent background.
+        gc = agg.GraphicsContextArray((4, 4))
+        gc.clear((0.0, 0.0, 0.0, 0.0))
+        gc.set_fill_color((1.0, 0.0, 0.0, 0.5))
+        gc.rect(1, 1, 2, 2)
+        gc.fill_path()
+        stream = io.BytesIO()
+        gc.save(stream, file_format=file_format)
+        stream.seek(0)
+        return array(Image.open(stream))
+
+    def test_transparent_without_alpha(self):
+        # Formats without alpha are flattened onto white.
+        for file_format in ("bmp", "jpeg"):
+            image = self.save_transparent(file_format)
+            self.assertEqual(image.shape, (4, 4, 3))
+            if file_format == "bmp":
+                self.assertEqual(image[0, 0].tolist(), [255, 255, 255])
+                self.assertEqual(image[1, 1].tolist(), [191, 127, 127])
+            else:
+                # JPEG is lossy, but the corners are close to white rather
+                # than black.
+                corners = image[[0, 0, 3, 3], [0, 3, 0, 3]]
+                self.assertTrue(allclose(corners, 255, atol=16))
+
+    def test_transparent_with_alpha(self):
+        # PNGs keep the transparency of the image.
+        image = self.save_transparent("png")
+        self.assertEqual(image[0, 0].tolist(), [0, 0, 0, 0])
+        self.assertEqual(image[1, 1].tolist(), [128, 0, 0, 128])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,107 @@
+""" Tests that Agg graphics contexts can be rasterized from several threads,
+and that rasterizing a single context in bands gives the same result.
+"""
+import threading
+import unittest
+
+from numpy import array_equal, cos, linspace, pi, sin, zeros
+
+from kiva import agg
+from kiva.constants import CIRCLE_MARKER, SQUARE_MARKER
+
+
+def render(size=(400, 400), n_lines=20, n_pts=2000, threads=1):
+    gc = agg.GraphicsContextArray(size, threads=threads)
+    width, height = size
+    pts = zeros((n_pts, 2))
+    pts[:, 0] = linspace(0, width, n_pts)
+    for i in range(n_lines):
+        pts[:, 1] = height / 2. + height / 2. * sin(pts[:, 0] / 10. + i)
+        gc.lines(pts)
+        gc.set_line_width(1 + i % 3)
+        gc.stroke_path()
+
+    gc.arc(width / 2., height / 2., width / 3., 0, 2 * pi)
+    gc.set_fill_color((0.2, 0.4, 0.6, 0.5))
+    gc.fill_path()
+
+    markers = zeros((500, 2))
+    markers[:, 0] = width / 2. + width / 3. * cos(linspace(0, 2 * pi, 500))
+    markers[:, 1] = height / 2. + height / 3. * sin(linspace(0, 2 * pi, 500))
+    gc.draw_marker_at_points(markers, 4, SQUARE_MARKER)
+    gc.draw_marker_at_points(markers, 6, CIRCLE_MARKER)
+
+    img = agg.GraphicsContextArray((50, 50))
+    img.clear((1, 0, 0, 1))
+    gc.draw_image(img, (10, 10, 100, 100))
+    return gc.bmp_array
+
+
+def run_threads(func, count):
+    results = [None] * count
+
+    def worker(i):
+        results[i] = func()
+
+    threads = [threading.Thread(target=worker, args=(i,))
+               for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class ThreadedDrawingTestCase(unittest.TestCase):
+
+    def test_threaded_output_matches_serial(self):
+        expected = render()
+        for actual in run_threads(render, 4):
+            self.assertTrue(array_equal(actual, expected))
+
+
+def render_clipped(threads=1):
+    gc = agg.GraphicsContextArray((300, 500), threads=threads)
+    gc.clip_to_rects([(20, 20, 100, 400), (150, 50, 120, 300)])
+    gc.set_line_dash([5, 3])
+    gc.set_line_width(3)
+    gc.move_to(0, 0)
+    gc.line_to(300, 500)
+    gc.stroke_path()
+    gc.set_fill_color((0.1, 0.7, 0.2, 0.4))
+    gc.arc(150, 250, 200, 0, 2 * pi)
+    gc.eof_fill_path()
+
+    img = agg.GraphicsContextArray((40, 30))
+    img.clear((0, 0, 1, 0.8))
+    img.set_image_interpolation("bilinear")
+    gc.set_alpha(0.6)
+    gc.rotate_ctm(0.1)
+    gc.draw_image(img, (30, 30, 250, 400))
+    return gc.bmp_array
+
+
+class BandedDrawingTestCase(unittest.TestCase):
+
+    def test_threads_option(self):
+        gc = agg.GraphicsContextArray((10, 10))
+        self.assertEqual(gc.get_threads(), 1)
+        gc = agg.GraphicsContextArray((10, 10), threads=4)
+        self.assertEqual(gc.get_threads(), 4)
+        with self.assertRaises(ValueError):
+            agg.GraphicsContextArray((10, 10), threads=0)
+
+    def test_banded_output_matches_serial(self):
+        expected = render()
+        for threads in (2, 3, 8):
+            actual = render(threads=threads)
+            self.assertTrue(array_equal(actual, expected))
+
+    def test_banded_clipping_matches_serial(self):
+        expected = render_clipped()
+        actual = render_clipped(threads=4)
+        self.assertTrue(array_equal(actual, expected))
+
+
+if __name__ == "__main__":
+    unittest.main()
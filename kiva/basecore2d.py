@@ -32,12 +32,10 @@ transform
 
 from __future__ import absolute_import, print_function
 
-import six.moves as sm
-
 import numpy as np
-from numpy import alltrue, array, asarray, float64, shape, pi, concatenate
+from numpy import alltrue, array, asarray, float64, pi
 
-from .constants import (POINT, LINE, LINES, RECT, NO_DASH, CLOSE,
+from .constants import (POINT, LINE, NO_DASH, CLOSE,
                         CAP_ROUND, CAP_BUTT, CAP_SQUARE,
                         JOIN_ROUND, JOIN_BEVEL, JOIN_MITER,
                         STROKE, FILL_STROKE, EOF_FILL_STROKE,
@@ -47,7 +45,9 @@ from .constants import (POINT, LINE, LINES, RECT, NO_DASH, CLOSE,
                         TEXT_FILL_STROKE_CLIP, TEXT_CLIP, TEXT_OUTLINE,
                         SCALE_CTM, TRANSLATE_CTM, ROTATE_CTM, CONCAT_CTM,
                         LOAD_CTM)
-from .abstract_graphics_context import AbstractGraphicsContext
+from .abstract_graphics_context import (
+    AbstractGraphicsContext, _finite_runs
+)
 from .line_state import LineState, line_state_equal
 from .graphics_state import GraphicsState
 from .fonttools import Font
@@ -83,6 +83,108 @@ def fill_equal(fill1, fill2):
     return alltrue(fill1 == fill2)
 
 
+# --------------------------------------------------------------------
+# Curve flattening.
+#
+# Curves are drawn as lines which stay within a tolerance of the curve in
+# device space.  The tolerance is the flatness of the graphics state times
+# CURVE_TOLERANCE.
+# --------------------------------------------------------------------
+
+CURVE_TOLERANCE = 0.1
+
+# Even small arcs use segments of at most this angle, so that circles still
+# look round, and no curve is split into more than MAX_CURVE_SEGMENTS lines.
+MAX_ARC_SEGMENT_ANGLE = pi / 4
+MAX_CURVE_SEGMENTS = 10000
+
+# Points on the unit circle, keyed by the number of segments and the angle
+# they span.  Markers draw the same circle many times.
+_unit_arc_cache = {}
+_UNIT_ARC_CACHE_SIZE = 64
+
+
+def unit_arc(n, sweep):
+    """ Returns the n+1 points at the ends of n equal segments of an arc
+    of the unit circle, from angle 0 to angle `sweep`.
+
+    The result is cached, and must not be changed.
+    """
+    key = (n, sweep)
+    pts = _unit_arc_cache.get(key)
+    if pts is None:
+        if len(_unit_arc_cache) >= _UNIT_ARC_CACHE_SIZE:
+            _unit_arc_cache.clear()
+        theta = np.linspace(0.0, sweep, n + 1)
+        pts = np.column_stack([np.cos(theta), np.sin(theta)])
+        pts.flags.writeable = False
+        _unit_arc_cache[key] = pts
+    return pts
+
+
+def ctm_scale(ctm):
+    """ Returns the largest factor by which a ctm stretches any distance.
+    """
+    (a, b), (c, d) = ctm[0, :2], ctm[1, :2]
+    p = (a*a + b*b + c*c + d*d) / 2.0
+    q = a*d - b*c
+    return np.sqrt(p + np.sqrt(max(p*p - q*q, 0.0)))
+
+
+class _GrowableArray(object):
+    """ An array which can be appended to in amortized constant time.
+
+    The storage doubles in size whenever it runs out of room, so building a
+    path doesn't copy all of the earlier points.  Single values are queued
+    in a list and copied into the array together, which is much cheaper
+    than storing them one at a time.
+    """
+
+    def __init__(self, shape=(), dtype=float64):
+        self._shape = tuple(shape)
+        self._data = np.empty((16,) + self._shape, dtype=dtype)
+        self._size = 0
+        self._pending = []
+        # Appending is the most common operation, so skip a method call.
+        self.append = self._pending.append
+
+    def __len__(self):
+        return self._size + len(self._pending)
+
+    @property
+    def array(self):
+        """ A view of the values which have been appended. """
+        if self._pending:
+            self._flush()
+        return self._data[:self._size]
+
+    def extend(self, values):
+        if isinstance(values, list):
+            self._pending.extend(values)
+            return
+        if self._pending:
+            self._flush()
+        self._store(values)
+
+    def clear(self):
+        self._size = 0
+        del self._pending[:]
+
+    def _flush(self):
+        self._store(self._pending)
+        del self._pending[:]
+
+    def _store(self, values):
+        end = self._size + len(values)
+        if end > len(self._data):
+            data = np.empty((max(end, 2 * len(self._data)),) + self._shape,
+                            dtype=self._data.dtype)
+            data[:self._size] = self._data[:self._size]
+            self._data = data
+        self._data[self._size:end] = values
+        self._size = end
+
+
 class GraphicsContextBase(AbstractGraphicsContext):
     """ Concrete base implementation of a GraphicsContext
 
@@ -93,10 +195,14 @@ class GraphicsContextBase(AbstractGraphicsContext):
         Current state of graphics context.
     state_stack
         Stack used to save graphics states
-    path
-        The drawing path.
-    active_subpath
-        The active drawing subpath
+    path_vertices
+        The points of the drawing path, as a growable Nx2 array.
+    path_codes
+        One code per point of the drawing path: POINT starts a new subpath,
+        LINE continues it and CLOSE closes it back to its first point.
+    path_transforms
+        The changes to the ctm made while the path was built, as
+        (vertex index, func, args) tuples.
 
     This class needs to be sub-classed by device types that handle
     drawing but don't handle more advanced concepts like paths, graphics state,
@@ -121,12 +227,15 @@ class GraphicsContextBase(AbstractGraphicsContext):
         self.state_stack = []
 
         # Variables for used in drawing paths.
-        # The path_transform_indices holds a list of indices pointing into
-        # active_subpath that affect the ctm.  It is necessary to preserve
-        # these across begin_path calls.
-        self.active_subpath = []
-        self.path_transform_indices = []
-        self.path = [self.active_subpath]
+        # The points and codes are kept in contiguous arrays so that
+        # draw_path can hand whole subpaths to the device at once.  The
+        # transforms made since the active subpath began are preserved
+        # across begin_path calls.
+        self.path_vertices = _GrowableArray((2,))
+        self.path_codes = _GrowableArray((), np.uint8)
+        self.path_transforms = []
+        self._subpath_start = (0, 0)
+        self._first_point = None
 
         # Whether the particular underlying graphics context considers the
         # "origin" of a pixel to be the center of the pixel or the lower-left
@@ -167,8 +276,7 @@ class GraphicsContextBase(AbstractGraphicsContext):
                 The new scale factor for the y axis
         """
         self.state.ctm = affine.scale(self.state.ctm, sx, sy)
-        self.active_subpath.append((SCALE_CTM, (sx, sy)))
-        self.path_transform_indices.append(len(self.active_subpath)-1)
+        self._add_transform(SCALE_CTM, (sx, sy))
 
     def translate_ctm(self, tx, ty):
         """ Translates the coordinate system by the value given by (tx, ty)
@@ -181,8 +289,7 @@ class GraphicsContextBase(AbstractGraphicsContext):
                 The distance to move in the y direction
         """
         self.state.ctm = affine.translate(self.state.ctm, tx, ty)
-        self.active_subpath.append((TRANSLATE_CTM, (tx, ty)))
-        self.path_transform_indices.append(len(self.active_subpath)-1)
+        self._add_transform(TRANSLATE_CTM, (tx, ty))
 
     def rotate_ctm(self, angle):
         """ Rotates the coordinate space for drawing by the given angle.
@@ -193,8 +300,7 @@ class GraphicsContextBase(AbstractGraphicsContext):
                 the angle, in radians, to rotate the coordinate system
         """
         self.state.ctm = affine.rotate(self.state.ctm, angle)
-        self.active_subpath.append((ROTATE_CTM, (angle,)))
-        self.path_transform_indices.append(len(self.active_subpath)-1)
+        self._add_transform(ROTATE_CTM, (angle,))
 
     def concat_ctm(self, transform):
         """ Concatenates the transform to current coordinate transform matrix.
@@ -206,8 +312,7 @@ class GraphicsContextBase(AbstractGraphicsContext):
                 the current coordinate matrix.
         """
         self.state.ctm = affine.concat(self.state.ctm, transform)
-        self.active_subpath.append((CONCAT_CTM, (transform,)))
-        self.path_transform_indices.append(len(self.active_subpath)-1)
+        self._add_transform(CONCAT_CTM, (transform,))
 
     def get_ctm(self):
         """ Returns the current coordinate transform matrix.
@@ -218,8 +323,7 @@ class GraphicsContextBase(AbstractGraphicsContext):
         """ Returns the current coordinate transform matrix.
         """
         self.state.ctm = transform
-        self.active_subpath.append((LOAD_CTM, (transform,)))
-        self.path_transform_indices.append(len(self.active_subpath)-1)
+        self._add_transform(LOAD_CTM, (transform,))
 
     # ----------------------------------------------------------------
     # Save/Restore graphics state.
@@ -238,8 +342,7 @@ class GraphicsContextBase(AbstractGraphicsContext):
     def restore_state(self):
         """ Restores the previous graphics state. """
         self.state = self.state_stack.pop(-1)
-        self.active_subpath.append((LOAD_CTM, (self.state.ctm,)))
-        self.path_transform_indices.append(len(self.active_subpath)-1)
+        self._add_transform(LOAD_CTM, (self.state.ctm,))
 
     # ----------------------------------------------------------------
     # context manager interface
@@ -373,14 +476,16 @@ class GraphicsContextBase(AbstractGraphicsContext):
         self.state.line_state.line_dash = (phase, pattern)
 
     def set_flatness(self, flatness):
-        """ Not implemented
+        """ Sets how accurately curves are rendered.
 
         It is device dependent and therefore not recommended by
         the PDF documentation.
 
         flatness determines how accurately curves are rendered.  Setting it
         to values less than one will result in more accurate drawings, but
-        they take longer.  It defaults to None
+        they take longer.  Curves and arcs are drawn as lines which stay
+        within flatness * CURVE_TOLERANCE of them in device space.  It
+        defaults to 1.0
 
         """
         self.state.flatness = flatness
@@ -443,17 +548,15 @@ class GraphicsContextBase(AbstractGraphicsContext):
     def begin_path(self):
         """ Clears the current drawing path and begin a new one.
         """
-        # Need to check here if the current subpath contains matrix
-        # transforms.  If  it does, pull these out, and stick them
-        # in the new subpath.
-        if self.path_transform_indices:
-            tf = array(self.active_subpath,
-                       object)[self.path_transform_indices, :]
-            self.path_transform_indices = list(sm.range(len(tf)))
-            self.active_subpath = list(tf)
-        else:
-            self.active_subpath = []
-        self.path = [self.active_subpath]
+        # The matrix transforms in the current subpath are kept, and moved
+        # to the start of the new path.
+        transforms = self.path_transforms[self._subpath_start[1]:]
+        self.path_transforms = [(0, func, args)
+                                for index, func, args in transforms]
+        self.path_vertices.clear()
+        self.path_codes.clear()
+        self._subpath_start = (0, 0)
+        self._first_point = None
 
     def move_to(self, x, y):
         """ Starts a new drawing subpath and place the current point at (x, y).
@@ -465,9 +568,10 @@ class GraphicsContextBase(AbstractGraphicsContext):
         """
         self._new_subpath()
 
-        pt = array((x, y), dtype=float64)
-        self.state.current_point = pt
-        self.active_subpath.append((POINT, pt))
+        self.state.current_point = array((x, y), dtype=float64)
+        self._first_point = (x, y)
+        self.path_vertices.append((x, y))
+        self.path_codes.append(POINT)
 
     def line_to(self, x, y):
         """ Adds a line from the current point to the given point (x, y).
@@ -480,11 +584,16 @@ class GraphicsContextBase(AbstractGraphicsContext):
             Notes:
                 See note in move_to about the current_point.
         """
-        pt = array((x, y), dtype=float64)
-        self.state.current_point = pt
-        self.active_subpath.append((LINE, pt))
+        self.state.current_point = array((x, y), dtype=float64)
+        self.path_vertices.append((x, y))
+        # A line at the start of a subpath starts it, like move_to.
+        if self._first_point is None:
+            self._first_point = (x, y)
+            self.path_codes.append(POINT)
+        else:
+            self.path_codes.append(LINE)
 
-    def lines(self, points):
+    def lines(self, points, break_on_nan=False):
         """ Adds a series of lines as a new subpath.
 
             Parameters
@@ -492,14 +601,59 @@ class GraphicsContextBase(AbstractGraphicsContext):
 
             points
                 an Nx2 array of x, y pairs
+            break_on_nan
+                If True, points which aren't finite are left out and the
+                line starts again from the next finite point.
 
             The current_point is moved to the last point in 'points'
         """
         self._new_subpath()
-        pts = points
-        self.active_subpath.append((LINES, pts))
+        if break_on_nan:
+            runs = _finite_runs(points)
+            for run in runs:
+                self._add_lines(run)
+            if runs:
+                self.state.current_point = runs[-1][-1]
+            return
+        self._add_lines(points)
         self.state.current_point = points[-1]
 
+    def _add_lines(self, points):
+        """ Appends points as a run of lines which starts a new subpath.
+        """
+        self._first_point = points[0]
+        self.path_vertices.extend(points)
+        self.path_codes.extend([POINT] + [LINE] * (len(points) - 1))
+
+    def _continue_lines(self, points):
+        """ Appends points as lines which continue the current subpath, or
+        start a new one if there isn't a current subpath.
+        """
+        if self._first_point is None:
+            self._add_lines(points)
+        else:
+            self.path_vertices.extend(points)
+            self.path_codes.extend([LINE] * len(points))
+
+    def _curve_tolerance(self):
+        """ Returns how far, in user space, the lines drawn for a curve may
+        stray from it.
+        """
+        flatness = self.state.flatness or 1.0
+        scale = ctm_scale(self.state.ctm)
+        if scale == 0:
+            return np.inf
+        return CURVE_TOLERANCE * flatness / scale
+
+    def _curve_segments(self, n):
+        """ Rounds a number of segments up to a whole number which isn't
+        too large.
+        """
+        if not n < MAX_CURVE_SEGMENTS:
+            # This includes NaN, from non-finite coordinates.
+            return MAX_CURVE_SEGMENTS
+        return max(int(np.ceil(n)), 1)
+
     def line_set(self, starts, ends):
         """ Adds a set of disjoint lines as a new subpath.
 
@@ -514,10 +668,14 @@ class GraphicsContextBase(AbstractGraphicsContext):
             The current point is moved to the last point in 'ends'.
         """
         self._new_subpath()
-        for i in sm.range(min(len(starts), len(ends))):
-            self.active_subpath.append((POINT, starts[i]))
-            self.active_subpath.append((LINE, ends[i]))
-        self.state.current_point = ends[i]
+        count = min(len(starts), len(ends))
+        pts = np.empty((count, 2, 2))
+        pts[:, 0] = asarray(starts)[:count]
+        pts[:, 1] = asarray(ends)[:count]
+        self._first_point = pts[-1, 0]
+        self.path_vertices.extend(pts.reshape(-1, 2))
+        self.path_codes.extend([POINT, LINE] * count)
+        self.state.current_point = pts[-1, 1]
 
     def rect(self, x, y, sx, sy):
         """ Adds a rectangle as a new subpath.
@@ -536,17 +694,37 @@ class GraphicsContextBase(AbstractGraphicsContext):
     def rects(self, rects):
         """ Adds multiple rectangles as separate subpaths to the path.
 
-            Not very efficient -- calls rect multiple times.
+            Parameters
+            ----------
+            rects
+                an Nx4 array of x, y, width, height rows
+
+            The subpaths are the same as those rect() adds for each row.
         """
-        for x, y, sx, sy in rects:
-            self.rect(x, y, sx, sy)
+        rects = asarray(rects, dtype=float64).reshape(-1, 4)
+        if not len(rects):
+            return
+        x, y, sx, sy = rects.T
+        pts = np.empty((len(rects), 5, 2))
+        pts[:, 0] = pts[:, 4] = np.column_stack([x, y])
+        pts[:, 1] = np.column_stack([x, y + sy])
+        pts[:, 2] = np.column_stack([x + sx, y + sy])
+        pts[:, 3] = np.column_stack([x + sx, y])
+        self._new_subpath()
+        self.path_vertices.extend(pts.reshape(-1, 2))
+        self.path_codes.extend([POINT, LINE, LINE, LINE, CLOSE] * len(rects))
+        self.state.current_point = pts[-1, 3]
+        self._new_subpath()
 
     def close_path(self, tag=None):
         """ Closes the path of the current subpath.
 
             Currently starts a new subpath -- is this what we want?
         """
-        self.active_subpath.append((CLOSE, (tag,)))
+        if self._first_point is not None:
+            self.path_vertices.append(self._first_point)
+            self.path_codes.append(CLOSE)
+            self._first_point = None
         self._new_subpath()
 
     def curve_to(self, x_ctrl1, y_ctrl1, x_ctrl2, y_ctrl2, x_to, y_to):
@@ -567,24 +745,28 @@ class GraphicsContextBase(AbstractGraphicsContext):
         y_to : float
             Y-value of the ending point of the curve.
         """
-        # XXX: figure out a reasonable number of points from the current scale
-        # and arc length. Since the arc length is expensive to calculate, the
-        # sum of the lengths of the line segments from (xy0, xy_ctrl1),
-        # (xy_ctrl1, xy_ctrl2), and (xy_ctrl2, xy_to) would be a reasonable
-        # approximation.
-        n = 100
-        t = np.arange(1, n+1) / float(n)
+        x0, y0 = self.state.current_point
+        # The curve is split into n equal steps of t.  The lines then stay
+        # within 1/8 * max|B''| / n**2 of the curve, and the second
+        # derivative is largest at one of the ends.
+        ddx = np.array([x0 - 2*x_ctrl1 + x_ctrl2, x_ctrl1 - 2*x_ctrl2 + x_to])
+        ddy = np.array([y0 - 2*y_ctrl1 + y_ctrl2, y_ctrl1 - 2*y_ctrl2 + y_to])
+        dd = np.sqrt(ddx*ddx + ddy*ddy).max()
+        n = self._curve_segments(np.sqrt(0.75 * dd / self._curve_tolerance()))
+        t = np.arange(n+1) / float(n)
         t2 = t*t
         t3 = t2*t
         u = 1 - t
         u2 = u*u
         u3 = u2*u
-        x0, y0 = self.state.current_point
         pts = np.column_stack([
             x0*u3 + 3*(x_ctrl1*t*u2 + x_ctrl2*t2*u) + x_to*t3,
             y0*u3 + 3*(y_ctrl1*t*u2 + y_ctrl2*t2*u) + y_to*t3,
         ])
-        self.active_subpath.append((LINES, pts))
+        if self._first_point is not None:
+            # The subpath already ends at the start of the curve.
+            pts = pts[1:]
+        self._continue_lines(pts)
         self.state.current_point = pts[-1]
 
     def quad_curve_to(self, x_ctrl, y_ctrl, x_to, y_to):
@@ -635,17 +817,23 @@ class GraphicsContextBase(AbstractGraphicsContext):
         cw : bool, optional
             Whether the arc should be drawn clockwise or not.
         """
-        # XXX: pick the number of line segments based on the current scale and
-        # the radius.
-        n = 100
         if end_angle < start_angle and not cw:
             end_angle += 2*pi
         elif start_angle < end_angle and cw:
             start_angle += 2*pi
-        theta = np.linspace(start_angle, end_angle, n)
-        pts = radius * np.column_stack([np.cos(theta), np.sin(theta)])
-        pts += np.array([x, y])
-        self.active_subpath.append((LINES, pts))
+        sweep = end_angle - start_angle
+
+        # Each segment may stray from the arc by radius*(1 - cos(angle/2)).
+        ratio = 1.0 - self._curve_tolerance() / max(abs(radius), 1e-300)
+        angle = min(2 * np.arccos(max(ratio, 0.0)), MAX_ARC_SEGMENT_ANGLE)
+        n = self._curve_segments(abs(sweep) / angle)
+
+        # Rotate the cached points on the unit circle to the start angle.
+        c, s = np.cos(start_angle), np.sin(start_angle)
+        rotation = radius * np.array([[c, s], [-s, c]])
+        pts = unit_arc(n, sweep).dot(rotation)
+        pts += (x, y)
+        self._continue_lines(pts)
         self.state.current_point = pts[-1]
 
     def arc_to(self, x1, y1, x2, y2, radius):
@@ -658,10 +846,15 @@ class GraphicsContextBase(AbstractGraphicsContext):
 
             Only creates a new subpath if the current one contains objects.
         """
-        if self.active_subpath:
-            self.active_subpath = []
-            self.path_transform_indices = []
-            self.path.append(self.active_subpath)
+        end = (len(self.path_codes), len(self.path_transforms))
+        if end != self._subpath_start:
+            self._subpath_start = end
+            self._first_point = None
+
+    def _add_transform(self, func, args):
+        """ Records a change to the ctm at the current point of the path.
+        """
+        self.path_transforms.append((len(self.path_codes), func, args))
 
     # ----------------------------------------------------------------
     # Getting infomration on paths
@@ -670,17 +863,8 @@ class GraphicsContextBase(AbstractGraphicsContext):
     def is_path_empty(self):
         """ Tests to see whether the current drawing path is empty
         """
-        # If the first subpath is empty, then the path is empty
-        res = 0
-        if not self.path[0]:
-            res = 1
-        else:
-            res = 1
-            for sub in self.path:
-                if not is_point(sub[-1]):
-                    res = 0
-                    break
-        return res
+        # The path is empty if it has only moved to points.
+        return not np.any(self.path_codes.array != POINT)
 
     def get_path_current_point(self):
         """ Returns the current point from the graphics context.
@@ -1113,35 +1297,36 @@ class GraphicsContextBase(AbstractGraphicsContext):
         self.device_update_line_state()
         self.device_update_fill_state()
 
-        for subpath in self.path:
-            # reset the current point for drawing.
-            self.clear_subpath_points()
-            for func, args in subpath:
-                if func == POINT:
-                    self.draw_subpath(mode)
-                    self.add_point_to_subpath(args)
-                    self.first_point = args
-                elif func == LINE:
-                    self.add_point_to_subpath(args)
-                elif func == LINES:
-                    self.draw_subpath(mode)
-                    # add all points in list to subpath.
-                    self.add_point_to_subpath(args)
-                    self.first_point = args[0]
-                elif func == CLOSE:
-                    self.add_point_to_subpath(self.first_point)
-                    self.draw_subpath(mode)
-                elif func == RECT:
-                    self.draw_subpath(mode)
-                    self.device_draw_rect(args[0], args[1], args[2], args[3],
-                                          mode)
-                elif func in [SCALE_CTM, ROTATE_CTM, TRANSLATE_CTM,
-                              CONCAT_CTM, LOAD_CTM]:
-                    self.device_transform_device_ctm(func, args)
-                else:
-                    print('oops:', func)
-            # finally, draw any remaining paths.
-            self.draw_subpath(mode)
+        # Each subpath runs from a POINT up to the next POINT, or up to and
+        # including a CLOSE.  The changes to the ctm are applied in the order
+        # they were made: those made before a closed subpath was closed, or
+        # before an open subpath was ended, apply to it.
+        vertices = self.path_vertices.array
+        codes = self.path_codes.array
+        bounds = np.union1d(np.flatnonzero(codes == POINT),
+                            np.flatnonzero(codes == CLOSE) + 1)
+        bounds = np.append(bounds[bounds < len(codes)], len(codes))
+        # Subpaths which aren't separated by a change to the ctm are drawn
+        # together.
+        transforms = self.path_transforms
+        subpaths = []
+        i = 0
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            closed = codes[end-1] == CLOSE
+            while i < len(transforms) and (transforms[i][0] < end or
+                                           transforms[i][0] == end and
+                                           not closed):
+                if subpaths:
+                    self.device_draw_subpaths(subpaths, mode)
+                    subpaths = []
+                self.device_transform_device_ctm(*transforms[i][1:])
+                i += 1
+            if end - start > 1:
+                subpaths.append((vertices[start:end], closed))
+        if subpaths:
+            self.device_draw_subpaths(subpaths, mode)
+        for index, func, args in transforms[i:]:
+            self.device_transform_device_ctm(func, args)
 
         # ---------------------------------------------------------------------
         # reset the alpha values for line and fill values.
@@ -1180,7 +1365,6 @@ class GraphicsContextBase(AbstractGraphicsContext):
     def device_draw_rect(self, x, y, sx, sy, mode):
         """ Default implementation of drawing  a rect.
         """
-        self._new_subpath()
         # When rectangles are rotated, they have to be drawn as a polygon
         # on most devices.  We'll need to specialize this on API's that
         # can handle rotated rects such as Quartz and OpenGL(?).
@@ -1190,8 +1374,7 @@ class GraphicsContextBase(AbstractGraphicsContext):
                      (x+sx, y+sy),
                      (x+sx, y),
                      (x, y)))
-        self.add_point_to_subpath(pts)
-        self.draw_subpath(mode)
+        self.draw_subpath(pts, mode)
 
     def stroke_rect(self):
         """
@@ -1219,42 +1402,37 @@ class GraphicsContextBase(AbstractGraphicsContext):
         pass
 
     # ----------------------------------------------------------------
-    # Subpath point management and drawing routines.
+    # Subpath drawing routines.
     # ----------------------------------------------------------------
 
-    def add_point_to_subpath(self, pt):
-        self.draw_points.append(pt)
+    def device_draw_subpaths(self, subpaths, mode):
+        """ Fills and strokes several subpaths which share the same ctm.
 
-    def clear_subpath_points(self):
-        self.draw_points = []
+            Parameters
+            ----------
 
-    def get_subpath_points(self, debug=0):
-        """ Gets the points that are in the current path.
+            subpaths
+                A list of (points, closed) pairs.  points is an Nx2 array
+                of the points in a subpath, and ends with its first point
+                when closed is True.
+            mode
+                Specifies how the subpaths are drawn, as for draw_subpath.
 
-            The first entry in the draw_points list may actually
-            be an array.  If this is true, the other points are
-            converted to an array and concatenated with the first
+            Devices which can draw a path made of several subpaths at once
+            should override this.  By default, each subpath is drawn
+            separately with draw_subpath.
         """
-        if self.draw_points and len(shape(self.draw_points[0])) > 1:
-            first_points = self.draw_points[0]
-            other_points = asarray(self.draw_points[1:])
-            if len(other_points):
-                pts = concatenate((first_points, other_points), 0)
-            else:
-                pts = first_points
-        else:
-            pts = asarray(self.draw_points)
-        return pts
-
-    def draw_subpath(self, mode):
-        """ Fills and strokes the point path.
+        for pts, closed in subpaths:
+            self.draw_subpath(pts, mode)
 
-            After the path is drawn, the subpath point list is
-            cleared and ready for the next subpath.
+    def draw_subpath(self, pts, mode):
+        """ Fills and strokes the points of a subpath.
 
             Parameters
             ----------
 
+            pts
+                An Nx2 array of the points in the subpath.
             mode
                 Specifies how the subpaths are drawn.  The default is
                 FILL_STROKE.  The following are valid values.
@@ -1284,11 +1462,9 @@ class GraphicsContextBase(AbstractGraphicsContext):
                 and allow devices to specify a faster version if the path is
                 closed.
         """
-        pts = self.get_subpath_points()
         if len(pts) > 1:
             self.device_fill_points(pts, mode)
             self.device_stroke_points(pts, mode)
-        self.clear_subpath_points()
 
     def get_text_extent(self, textstring):
         """
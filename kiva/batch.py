@@ -0,0 +1,255 @@
+"""
+Render many drawings in a pool of worker processes.
+
+Each `RenderJob` holds a drawing, which is either a `DisplayList` recorded
+with `kiva.recording.RecordingGraphicsContext` or a picklable callable which
+takes a graphics context.  The jobs are pickled to the workers, which keep
+their fonts loaded from one job to the next::
+
+    jobs = [RenderJob(display_list, (400, 300), 'chart%d.png' % i)
+            for i, display_list in enumerate(display_lists)]
+    results = render_many(jobs, processes=4)
+
+A job with a file name is saved by the worker, so the image never comes back
+to the calling process.  Without one, the image of the Agg ('image') backend
+is rendered straight into shared memory and returned as an RGBA array.
+
+"""
+
+from __future__ import absolute_import, print_function
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import importlib
+from timeit import default_timer
+
+import numpy as np
+
+from .recording import DisplayList
+
+try:
+    from multiprocessing.shared_memory import SharedMemory
+except ImportError:
+    SharedMemory = None
+
+#: The text drawn by workers to load the fonts they are given.
+_WARM_TEXT = "0123456789 abcdefghijklmnopqrstuvwxyz ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+class RenderJob(object):
+    """ A drawing to render in a worker process.
+
+    Parameters
+    ----------
+
+    drawing : DisplayList or callable
+        The recorded drawing, or a picklable callable which draws onto the
+        graphics context it is passed.
+    size : (int, int)
+        The width and height of the image.
+    filename : str, optional
+        The file to save the image to.  The image is returned instead if
+        this is not given.
+    file_format : str, optional
+        The format of the file, if it is not given by the file name.
+
+    """
+
+    def __init__(self, drawing, size, filename=None, file_format=None):
+        self.drawing = drawing
+        self.size = (int(size[0]), int(size[1]))
+        self.filename = filename
+        self.file_format = file_format
+
+
+class RenderResult(object):
+    """ The outcome of a RenderJob.
+
+    Attributes
+    ----------
+
+    index
+        The position of the job in the jobs passed to `render_many`.
+    filename
+        The file the image was saved to, or None.
+    image
+        An (height, width, 4) RGBA array of the image when it was not saved
+        to a file, or None.  It may be a view of shared memory which is
+        freed by `release`.
+    time
+        The number of seconds the worker spent on the job.
+
+    """
+
+    def __init__(self, index, filename=None, image=None, time=0.0,
+                 shared_memory=None):
+        self.index = index
+        self.filename = filename
+        self.image = image
+        self.time = time
+        self._shared_memory = shared_memory
+
+    def release(self):
+        """ Free the shared memory holding the image.
+
+        The image must not be used afterwards.
+        """
+        self.image = None
+        if self._shared_memory is not None:
+            self._shared_memory.close()
+            self._shared_memory.unlink()
+            self._shared_memory = None
+
+
+def render_many(jobs, backend='image', processes=None, warm_fonts=(),
+                progress=None):
+    """ Render a sequence of RenderJobs in a pool of processes.
+
+    Parameters
+    ----------
+
+    jobs : sequence of RenderJob
+        The drawings to render.
+    backend : str
+        The name of the kiva module which provides the GraphicsContext, such
+        as 'image', 'celiagg', 'svg' or 'ps'.  Only raster backends can
+        return images rather than save them.
+    processes : int, optional
+        The number of worker processes.  By default there is one per CPU.
+        With 0, the jobs are rendered in the calling process.
+    warm_fonts : sequence of Font
+        Fonts which each worker loads before it renders its first job.
+    progress : callable, optional
+        Called as progress(done, total, result) each time a job finishes.
+
+    Returns
+    -------
+
+    results : list of RenderResult
+        The results in the order of the jobs.
+
+    """
+    jobs = list(jobs)
+    results = [None] * len(jobs)
+    buffers = [_allocate_image(job, backend) for job in jobs]
+
+    def finished(result):
+        results[result.index] = result
+        if progress is not None:
+            progress(sum(r is not None for r in results), len(jobs), result)
+
+    try:
+        if processes == 0:
+            _initialize_worker(backend, warm_fonts)
+            for index, job in enumerate(jobs):
+                finished(_render(index, job, backend, _buffer_name(buffers,
+                                                                   index)))
+        else:
+            with ProcessPoolExecutor(
+                    max_workers=processes, initializer=_initialize_worker,
+                    initargs=(backend, tuple(warm_fonts))) as executor:
+                futures = [
+                    executor.submit(_render, index, job, backend,
+                                    _buffer_name(buffers, index))
+                    for index, job in enumerate(jobs)
+                ]
+                for future in as_completed(futures):
+                    finished(future.result())
+    except BaseException:
+        for shared_memory in buffers:
+            if shared_memory is not None:
+                shared_memory.close()
+                shared_memory.unlink()
+        raise
+
+    for result, job, shared_memory in zip(results, jobs, buffers):
+        if shared_memory is not None:
+            width, height = job.size
+            result.image = np.ndarray((height, width, 4), dtype=np.uint8,
+                                      buffer=shared_memory.buf)
+            result._shared_memory = shared_memory
+    return results
+
+
+def _allocate_image(job, backend):
+    """ Create the shared memory which the worker renders a job into.
+    """
+    if job.filename is not None or SharedMemory is None:
+        return None
+    width, height = job.size
+    return SharedMemory(create=True, size=max(width * height * 4, 1))
+
+
+def _buffer_name(buffers, index):
+    shared_memory = buffers[index]
+    return None if shared_memory is None else shared_memory.name
+
+
+def _initialize_worker(backend, warm_fonts):
+    """ Import the backend and load fonts in a new worker.
+    """
+    module = importlib.import_module('kiva.' + backend)
+    if warm_fonts:
+        gc = module.GraphicsContext((1, 1))
+        for font in warm_fonts:
+            gc.set_font(font)
+            gc.get_text_extent(_WARM_TEXT)
+
+
+def _render(index, job, backend, buffer_name):
+    """ Render one job in a worker.
+    """
+    start = default_timer()
+    module = importlib.import_module('kiva.' + backend)
+    GraphicsContext = module.GraphicsContext
+    width, height = job.size
+    gc = shared_memory = image = None
+    if job.filename is None and buffer_name is not None:
+        shared_memory = SharedMemory(name=buffer_name)
+        image = np.ndarray((height, width, 4), dtype=np.uint8,
+                           buffer=shared_memory.buf)
+
+    try:
+        if image is not None and backend == 'image':
+            # Agg draws straight into the shared memory.
+            image[:] = 255
+            gc = GraphicsContext(image, pix_format='rgba32')
+        else:
+            gc = GraphicsContext(job.size)
+
+        if isinstance(job.drawing, DisplayList):
+            job.drawing.replay(gc)
+        else:
+            job.drawing(gc)
+
+        if job.filename is not None:
+            gc.save(job.filename, file_format=job.file_format)
+        elif image is not None:
+            if backend != 'image':
+                image[:] = _rgba_image(gc)
+        else:
+            image = _rgba_image(gc).copy()
+    finally:
+        if shared_memory is not None:
+            # The views of the buffer must go before it can be closed.
+            gc = image = None
+            shared_memory.close()
+
+    return RenderResult(index, filename=job.filename, image=image,
+                        time=default_timer() - start)
+
+
+def _rgba_image(gc):
+    """ Return the image of a raster graphics context as RGBA.
+    """
+    if hasattr(gc, 'bmp_array'):
+        pixels = gc.bmp_array
+    else:
+        # celiagg keeps its pixels in the array of its canvas.
+        pixels = gc.gc.array
+    pix_format = getattr(gc, 'pix_format', 'rgba32')
+    if pix_format == 'bgra32':
+        return pixels[..., [2, 1, 0, 3]]
+    elif pix_format == 'rgba32':
+        return pixels
+    raise ValueError(
+        "Images in the {} format cannot be returned".format(pix_format))
@@ -11,10 +11,12 @@ from __future__ import absolute_import
 import cairo
 import copy
 import six.moves as sm
+import sys
 
 import numpy
 import warnings
 
+from .abstract_graphics_context import _finite_runs
 from .arc_conversion import arc_to_tangent_points
 from . import basecore2d, constants
 
@@ -558,7 +560,7 @@ class GraphicsContext(basecore2d.GraphicsContextBase):
         """
         self._ctx.line_to(x,y)
 
-    def lines(self,points):
+    def lines(self,points, break_on_nan=False):
         """ Adds a series of lines as a new subpath.
 
             Parameters
@@ -566,12 +568,17 @@ class GraphicsContext(basecore2d.GraphicsContextBase):
 
             points
                 an Nx2 array of x,y pairs
+            break_on_nan
+                If True, points which aren't finite are left out and the
+                line starts again from the next finite point.
 
             The current_point is moved to the last point in 'points'
         """
-        self._ctx.new_sub_path()
-        for point in points:
-            self._ctx.line_to(*point)
+        runs = _finite_runs(points) if break_on_nan else [points]
+        for run in runs:
+            self._ctx.new_sub_path()
+            for point in run:
+                self._ctx.line_to(*point)
 
     def line_set(self, starts, ends):
         """ Adds a set of disjoint lines as a new subpath.
@@ -601,14 +608,14 @@ class GraphicsContext(basecore2d.GraphicsContextBase):
 #    def draw_rect(self, rect, mode):
 #        self.rect(*rect)
 #        self.draw_path(mode=mode)
-#
-#    def rects(self,rects):
-#        """ Adds multiple rectangles as separate subpaths to the path.
-#
-#            Not very efficient -- calls rect multiple times.
-#        """
-#        for x,y,sx,sy in rects:
-#            self.rect(x,y,sx,sy)
+
+    def rects(self,rects):
+        """ Adds multiple rectangles as separate subpaths to the path.
+
+            Cairo has no call for many rectangles, so each is added in turn.
+        """
+        for x,y,sx,sy in rects:
+            self._ctx.rectangle(x,y,sx,sy)
 
     def close_path(self,tag=None):
         """ Closes the path of the current subpath.
@@ -877,11 +884,22 @@ class GraphicsContext(basecore2d.GraphicsContextBase):
             img_surface = cairo.ImageSurface.create_for_data(img.astype(numpy.uint8),
                                                              format, img_width, img_height)
         elif isinstance(img, agg.GraphicsContextArray):
-            converted_img = img.convert_pixel_format('rgba32', inplace=0)
+            # Cairo's ARGB32 pixels are native endian words with the
+            # colors premultiplied by alpha.
+            if sys.byteorder == 'little':
+                pix_format = 'bgra32'
+            else:
+                pix_format = 'argb32'
+            converted_img = img.convert_pixel_format(pix_format, inplace=0)
             flipped_array = numpy.flipud(converted_img.bmp_array)
+            alpha_index = pix_format.index('a')
+            alpha = flipped_array[..., alpha_index:alpha_index + 1]
+            premultiplied = (flipped_array.astype(numpy.uint16) * alpha +
+                             127) // 255
+            premultiplied[..., alpha_index] = flipped_array[..., alpha_index]
             img_width, img_height = converted_img.width(), converted_img.height()
-            img_surface = cairo.ImageSurface.create_for_data(flipped_array.flatten(),
-                                                             cairo.FORMAT_RGB24,
+            img_surface = cairo.ImageSurface.create_for_data(premultiplied.astype(numpy.uint8).flatten(),
+                                                             cairo.FORMAT_ARGB32,
                                                              img_width, img_height)
         elif isinstance(img, GraphicsContext):
             # Another cairo kiva context
@@ -11,13 +11,18 @@
 from __future__ import absolute_import, print_function, division
 
 from collections import namedtuple
-import os
 import warnings
 
 import numpy as np
 import celiagg as agg
 
-from .abstract_graphics_context import AbstractGraphicsContext
+from .abstract_graphics_context import (
+    AbstractGraphicsContext, _finite_runs, _point_colors_and_sizes,
+    _point_groups, _text_points_and_anchors
+)
+from ._marker_stamps import (
+    marker_shapes, overlap_free_batches, stamp_path_at_points
+)
 from .fonttools import Font
 import kiva.constants as constants
 
@@ -70,14 +75,41 @@ pix_formats = {
     'abgr32': agg.PixelFormat.ABGR32,
     'bgra32': agg.PixelFormat.BGRA32,
 }
+# The pixel formats which celiagg can draw images from. It draws nothing for
+# argb32 sources, so those are converted first.
+image_pix_formats = {
+    key: value for key, value in pix_formats.items() if key != 'argb32'
+}
 pix_format_canvases = {
     'rgba32': agg.CanvasRGBA32,
     'bgra32': agg.CanvasBGRA32,
     'rgb24': agg.CanvasRGB24,
 }
+# The position of each channel of a solid color in the pixel formats.
+pix_format_channels = {
+    'rgba32': (0, 1, 2, 3),
+    'bgra32': (2, 1, 0, 3),
+    'rgb24': (0, 1, 2),
+}
+# Widths of strings measured by get_text_extents(), keyed on the font and
+# then the string.  The memo for a font is dropped when it fills up.
+text_width_memo = {}
+text_width_memo_size = 2 ** 18
+# Fonts keyed on their file, size and cache type.  Fonts can't be changed, so
+# each one is shared by every GraphicsContext, along with its glyph cache.
+# The cache is dropped when it fills up.
+font_cache = {}
+font_cache_size = 256
+# The paths of the markers drawn by draw_marker_at_points(), keyed on the
+# marker and its size.  The cache is dropped when it fills up.
+marker_path_cache = {}
+marker_path_cache_size = 1024
+# ShapeAtPoints draws markers in chunks which cross no more than about this
+# many cells of the rasterizer.
+max_shape_cells = 2 ** 20
 StateBundle = namedtuple('StateBundle',
                          ['state', 'path', 'stroke', 'fill', 'transform',
-                          'text_transform', 'font'])
+                          'text_transform', 'font', 'font_key'])
 
 
 class GraphicsContext(object):
@@ -101,6 +133,7 @@ class GraphicsContext(object):
         self.text_pos = (0.0, 0.0)
         self.transform = agg.Transform()
         self.font = None
+        self.font_key = None
         self.__state_stack = []
 
     # ----------------------------------------------------------------
@@ -175,7 +208,8 @@ class GraphicsContext(object):
             fill=self.fill_paint.copy(),
             transform=self.transform.copy(),
             text_transform=self.text_transform.copy(),
-            font=(None if self.font is None else self.font.copy()))
+            font=self.font,
+            font_key=self.font_key)
         self.__state_stack.append(state)
 
     def restore_state(self):
@@ -189,6 +223,7 @@ class GraphicsContext(object):
         self.transform = state.transform
         self.text_transform = state.text_transform
         self.font = state.font
+        self.font_key = state.font_key
 
     # ----------------------------------------------------------------
     # context manager interface
@@ -326,14 +361,16 @@ class GraphicsContext(object):
         """
         self.path.line_to(x, y)
 
-    def lines(self, points):
+    def lines(self, points, break_on_nan=False):
         """ Add a series of lines as a new subpath.
 
             Currently implemented by calling line_to a zillion times.
 
-            Points is an Nx2 array of x, y pairs.
+            Points is an Nx2 array of x, y pairs.  With break_on_nan, points
+            which aren't finite are left out and the line starts again from
+            the next finite point.
         """
-        self.path.lines(points)
+        self.path.lines(points, break_on_nan)
 
     def line_set(self, starts, ends):
         """ Draw multiple disjoint line segments.
@@ -518,32 +555,38 @@ class GraphicsContext(object):
         img is either a N*M*3 or N*M*4 numpy array, or a Kiva image
 
         rect - a tuple (x, y, w, h)
-        """
-        def get_format(array):
-            if array.shape[2] == 3:
-                return agg.PixelFormat.RGB24
-            elif array.shape[2] == 4:
-                return agg.PixelFormat.RGBA32
 
-        img_format = agg.PixelFormat.RGB24
+        The pixels of contiguous uint8 arrays and of other graphics contexts
+        are drawn without being copied.
+        """
         if isinstance(img, np.ndarray):
             # Numeric array
-            img_array = img.astype(np.uint8)
-            img_format = get_format(img_array)
+            img_array = _image_array(img)
+            img_format = _array_pix_format(img_array)
         elif isinstance(img, GraphicsContext):
             img_array = img.gc.array
             img_format = pix_formats[img.pix_format]
         elif hasattr(img, 'bmp_array'):
             # An offscreen kiva context
-            # XXX: Use a copy to kill the read-only flag which plays havoc
-            # with the Cython memoryviews used by celiagg
-            img_array = img.bmp_array.copy()
-            img_format = get_format(img_array)
+            pix_format = getattr(img, 'format', lambda: None)()
+            if pix_format is not None and pix_format not in image_pix_formats:
+                img = img.convert_pixel_format('rgba32')
+                pix_format = 'rgba32'
+            img_array = _image_array(img.bmp_array)
+            if pix_format is None:
+                img_format = _array_pix_format(img_array)
+            else:
+                img_format = image_pix_formats[pix_format]
         else:
             msg = "Cannot render image of type '{}' into celiagg context."
             warnings.warn(msg.format(type(img)))
             return
 
+        if img_format is None:
+            msg = "Cannot render an image of shape {} into celiagg context."
+            warnings.warn(msg.format(img_array.shape))
+            return
+
         x, y, w, h = rect
         img_height, img_width = img_array.shape[:2]
         sx, sy = w / img_width, h / img_height
@@ -562,7 +605,14 @@ class GraphicsContext(object):
     def select_font(self, name, size, textEncoding):
         """ Set the font for the current graphics context.
         """
-        self.font = agg.Font(name, size, agg.FontCacheType.RasterFontCache)
+        key = (name, size, agg.FontCacheType.RasterFontCache)
+        font = font_cache.get(key)
+        if font is None:
+            if len(font_cache) >= font_cache_size:
+                font_cache.clear()
+            font = font_cache[key] = agg.Font(*key)
+        self.font = font
+        self.font_key = key
 
     def set_font(self, font):
         """ Set the font for the current graphics context.
@@ -575,8 +625,7 @@ class GraphicsContext(object):
         if self.font is None:
             return
 
-        font = self.font
-        self.select_font(font.filepath, size, font.cache_type)
+        self.select_font(self.font_key[0], size, None)
 
     def set_character_spacing(self, spacing):
         msg = "set_character_spacing not implemented on celiagg yet."
@@ -628,6 +677,32 @@ class GraphicsContext(object):
         """
         self.show_text(text, (x, y))
 
+    def show_texts(self, texts, points, anchors=None):
+        """ Draw each string at the matching point.
+
+            The font, transform and canvas state are shared by all of the
+            strings. celiagg can only draw one string per call, so this
+            draws each string the same way as show_text(), newlines
+            included.
+        """
+        if self.font is None:
+            raise RuntimeError("show_texts called before setting a font!")
+
+        points, anchors = _text_points_and_anchors(texts, points, anchors)
+        font = self.font
+        height = font.height
+        for text, (x, y), (ax, ay) in zip(texts, points, anchors):
+            if ax or ay:
+                x -= ax * font.width(text)
+                y -= ay * height
+
+            transform = agg.Transform()
+            transform.multiply(self.transform)
+            transform.translate(x, y)
+
+            self.gc.draw_text(text, font, transform, self.canvas_state,
+                              stroke=self.stroke_paint)
+
     def show_glyphs(self):
         msg = "show_glyphs not implemented on celiagg"
         raise NotImplementedError(msg)
@@ -642,6 +717,29 @@ class GraphicsContext(object):
         y1, y2 = 0.0, self.font.height
         return x1, y1, x2, y2
 
+    def get_text_extents(self, texts):
+        """ Returns an Nx4 array with the bounding rect of each string, as
+            returned by get_text_extent().
+        """
+        if self.font is None:
+            msg = "get_text_extents called before setting a font!"
+            raise RuntimeError(msg)
+
+        font = self.font
+        memo = text_width_memo.setdefault(self.font_key, {})
+
+        extents = np.zeros((len(texts), 4))
+        extents[:, 3] = font.height
+        widths = extents[:, 2]
+        for i, text in enumerate(texts):
+            width = memo.get(text)
+            if width is None:
+                if len(memo) >= text_width_memo_size:
+                    memo.clear()
+                width = memo[text] = font.width(text)
+            widths[i] = width
+        return extents
+
     def get_full_text_extent(self, text):
         """ Backwards compatibility API over .get_text_extent() for Enable
         """
@@ -724,45 +822,261 @@ class GraphicsContext(object):
         """
         return CompiledPath()
 
-    def draw_path_at_points(self, points, path, mode=constants.FILL_STROKE):
+    def draw_path_at_points(self, points, path, mode=constants.FILL_STROKE,
+                            colors=None, stamp_tolerance=0.0):
         """ Draw a path object at many different points.
 
-        XXX: This is currently broken for some reason
-        """
-        shape = agg.ShapeAtPoints(path.path, points)
-        self.canvas_state.drawing_mode = draw_modes[mode]
-        self.gc.draw_shape(shape, self.transform, self.canvas_state,
-                           stroke=self.stroke_paint, fill=self.fill_paint)
+        colors may give an RGBA color for each point, as an array of shape
+        (N, 4).  A point's color replaces the fill color, or the stroke color
+        when the mode doesn't fill.  The points of each color are drawn
+        together, in the order of each color's first point.
 
-    def save(self, filename, file_format=None):
-        """ Save the contents of the context to a file
+        The markers are all filled before any of them are stroked.  With a
+        stamp_tolerance greater than 0, each marker may be moved by up to
+        that many pixels, so that the path is only rendered for a few
+        subpixel offsets and then blended at every point.
         """
+        points, colors, _ = _point_colors_and_sizes(points, colors)
+        if colors is None:
+            self._draw_path_at_points(points, path, mode, stamp_tolerance)
+            return
+
+        paint = "stroke_paint" if mode == constants.STROKE else "fill_paint"
+        saved_paint = getattr(self, paint)
         try:
-            from kiva.compat import pilfromstring
-        except ImportError:
-            raise ImportError("need PIL (or Pillow) to save images")
+            for index, color in _point_groups(colors):
+                setattr(self, paint, agg.SolidPaint(*color))
+                self._draw_path_at_points(points[index], path, mode,
+                                          stamp_tolerance)
+        finally:
+            setattr(self, paint, saved_paint)
+
+    def _draw_path_at_points(self, points, path, mode, stamp_tolerance):
+        """ Draw a path at many points with the current paints.
+        """
+        if (stamp_tolerance > 0 and
+                stamp_path_at_points(self, points, path, mode,
+                                     stamp_tolerance)):
+            return
+        if len(points) == 0 or path.is_empty():
+            return
+
+        # ShapeAtPoints draws all of its markers as one shape, in which
+        # overlapping markers only cover a pixel once, and even-odd fills and
+        # strokes cancel out where they overlap.  So the markers are split
+        # into batches which don't overlap, which look the same as markers
+        # drawn one by one.
+        layers = self._marker_layers(mode)
+        box = self._marker_box(path, layers)
+        if box is None:
+            # Too large to batch, so draw the markers one at a time.
+            batches = [points[i:i+1] for i in range(len(points))]
+        else:
+            x0, y0, w, h = box
+            if w == 0:
+                return
+            x, y = self._device_points(points)
+            visible = np.nonzero(
+                (x + x0 + w > -1) & (x + x0 < self._width + 1) &
+                (y + y0 + h > -1) & (y + y0 < self._height + 1))[0]
+            if len(visible) == 0:
+                return
+            # Large shapes overflow the cells of the rasterizer.
+            chunk = max(1, max_shape_cells // (4 * (w + h)))
+            batches = overlap_free_batches(points[visible], x[visible],
+                                           y[visible], w, h, chunk)
+
+        for drawing_mode, paint in layers:
+            self.canvas_state.drawing_mode = drawing_mode
+            for batch in batches:
+                shape = agg.ShapeAtPoints(path.path, batch)
+                self.gc.draw_shape(shape, self.transform, self.canvas_state,
+                                   stroke=paint, fill=paint)
+
+    def draw_marker_at_points(self, points, size,
+                              marker=constants.SQUARE_MARKER, colors=None,
+                              sizes=None, stamp_tolerance=0.5):
+        """ Draw a marker at each of the points.
+
+        colors and sizes may give an RGBA color and a size for each point, as
+        arrays of shape (N, 4) and (N,).  A point's color replaces the fill
+        color, or the stroke color of markers which are only stroked.  The
+        markers are drawn for one size at a time, in the order of each
+        size's first point.
+
+        By default the markers are stamped at the nearest whole pixel, as
+        Agg draws its markers.  See draw_path_at_points() for
+        stamp_tolerance, which may be 0 to draw each marker exactly.
+
+        Returns False if the marker is not known, in which case nothing is
+        drawn.
+        """
+        if marker not in marker_shapes:
+            return False
+        points, colors, sizes = _point_colors_and_sizes(points, colors, sizes)
+        mode = marker_shapes[marker][1]
+        if sizes is None:
+            groups = [(slice(None), (size,))]
+        else:
+            groups = _point_groups(sizes)
+        for index, (marker_size,) in groups:
+            self.draw_path_at_points(
+                points[index], _marker_path(marker, marker_size), mode,
+                colors=None if colors is None else colors[index],
+                stamp_tolerance=stamp_tolerance)
+        return True
+
+    def _marker_layers(self, mode):
+        """ The drawing mode and paint of each layer of markers drawn with
+        mode, with the fill before the stroke.
+        """
+        layers = []
+        if mode != constants.STROKE:
+            if mode in (constants.EOF_FILL, constants.EOF_FILL_STROKE):
+                layers.append((agg.DrawingMode.DrawEofFill, self.fill_paint))
+            else:
+                layers.append((agg.DrawingMode.DrawFill, self.fill_paint))
+        if mode in (constants.STROKE, constants.FILL_STROKE,
+                    constants.EOF_FILL_STROKE):
+            layers.append((agg.DrawingMode.DrawStroke, self.stroke_paint))
+        return layers
+
+    def _marker_box(self, path, layers):
+        """ Find the pixels which the layers of a marker may cover.
+
+        Returns the offset from a marker's pixel to the corner of the box of
+        pixels it covers, and the width and height of the box, with a pixel
+        to spare on each side for subpixel offsets.  The box is empty if the
+        marker covers nothing, and None if it is too large to find.
+        """
+        # Path.bounding_rect() doesn't bound every curve, so render the
+        # marker into a generous probe to find how large it is.
+        t = self.transform
+        x, y, w, h = path.path.bounding_rect()
+        corners = np.array([[x, y], [x + w, y], [x, y + h], [x + w, y + h]])
+        reach = np.abs(corners[:, 0] * t.sx + corners[:, 1] * t.shx).max()
+        reach = max(reach, np.abs(corners[:, 0] * t.shy +
+                                  corners[:, 1] * t.sy).max())
+        if layers[-1][0] == agg.DrawingMode.DrawStroke:
+            scale = max(abs(t.sx) + abs(t.shx), abs(t.shy) + abs(t.sy))
+            miter = max(self.canvas_state.miter_limit, 1.5) / 2.0
+            reach += self.canvas_state.line_width * scale * miter
+        radius = int(np.ceil(2 * reach)) + 4
+        if 2 * radius + 1 > 2 * max(self._width, self._height):
+            return None
+
+        probe = np.zeros((2 * radius + 1, 2 * radius + 1), dtype=bool)
+        for layer in layers:
+            probe |= self._render_stamp(path, None, layer, (radius, radius),
+                                        probe.shape) != 0
+        rows = np.nonzero(probe.any(axis=1))[0]
+        cols = np.nonzero(probe.any(axis=0))[0]
+        if len(rows) == 0:
+            return 0, 0, 0, 0
+        if (rows[0] == 0 or cols[0] == 0 or rows[-1] == 2 * radius or
+                cols[-1] == 2 * radius):
+            return None
+        x0 = cols[0] - radius - 1
+        w = cols[-1] - cols[0] + 3
+        y0 = rows[0] - radius - 1
+        h = rows[-1] - rows[0] + 3
+        return x0, y0, w, h
+
+    def _can_stamp_layers(self, layers):
+        """ Whether markers with these layers may be blended in any order.
+        """
+        return (self.canvas_state.stencil is None and
+                all(isinstance(paint, agg.SolidPaint)
+                    for drawing_mode, paint in layers))
 
-        if file_format is None:
-            file_format = ''
+    def _device_points(self, points):
+        """ The device coordinates of points, as arrays of x and y.
+        """
+        t = self.transform
+        x = t.sx * points[:, 0] + t.shx * points[:, 1] + t.tx
+        y = t.shy * points[:, 0] + t.sy * points[:, 1] + t.ty
+        return x, y
 
-        # Data is BGRA; Convert to RGBA
+    def _stamp_clip(self):
+        """ The x and y ranges of the pixels which stamps may cover.
+        """
+        clip = self.canvas_state.clip_box
+        if clip.valid:
+            return ((max(int(clip.x), 0),
+                     min(int(clip.x + clip.w), self._width)),
+                    (max(int(clip.y), 0),
+                     min(int(clip.y + clip.h), self._height)))
+        return (0, self._width), (0, self._height)
+
+    def _layer_alpha(self, layer):
+        """ The opacity of a layer of markers.
+        """
+        drawing_mode, paint = layer
+        return paint.a * self.canvas_state.master_alpha
+
+    def _render_stamp(self, path, mode, layer, offset, shape):
+        """ Render the coverage of a layer of a path drawn with mode, with
+        the linear part of the ctm and moved by offset, into a new array of
+        the given shape, indexed by [y, x] from the bottom up.
+        """
+        drawing_mode, paint = layer
+        if (mode == constants.EOF_FILL_STROKE and
+                drawing_mode == agg.DrawingMode.DrawStroke):
+            # celiagg strokes with the even-odd rule of the fill before the
+            # stroke, so overlapping parts of the stroke cancel out.  This
+            # renders only the stroke, with the even-odd rule.
+            drawing_mode = agg.DrawingMode.DrawEofFillStroke
+
+        t = self.transform
+        transform = agg.Transform(t.sx, t.shy, t.shx, t.sy, *offset)
+        canvas = agg.CanvasG8(np.zeros(shape, dtype=np.uint8), bottom_up=True)
+        state = self.canvas_state.copy()
+        state.clip_box = agg.Rect(0, 0, shape[1], shape[0])
+        state.master_alpha = 1.0
+        state.drawing_mode = drawing_mode
+        paint = agg.SolidPaint(1.0, 1.0, 1.0, 1.0)
+        if drawing_mode == agg.DrawingMode.DrawEofFillStroke:
+            fill = agg.SolidPaint(0.0, 0.0, 0.0, 0.0)
+        else:
+            fill = paint
+        canvas.draw_shape(path.path, transform, state, stroke=paint,
+                          fill=fill)
+        # The canvas is bottom up, like the context.
+        return canvas.array[::-1]
+
+    def _draw_layer(self, log_t, layer):
+        """ Blend the color of a layer over the pixels with the opacity left
+        by the log of their transparency.
+        """
+        # The pixels are stored from the top down.
+        log_t = log_t[::-1]
+        touched = log_t != 0.0
+        if not touched.any():
+            return
+        drawing_mode, paint = layer
+        channels = pix_format_channels[self.pix_format]
+        color = (paint.r, paint.g, paint.b, 1.0)
+        target = np.array([color[c] for c in channels]) * 255.0
+        transparency = np.exp(log_t[touched])
         pixels = self.gc.array
-        data = np.empty(pixels.shape, dtype=np.uint8)
-        data[..., 0] = pixels[..., 2]
-        data[..., 1] = pixels[..., 1]
-        data[..., 2] = pixels[..., 0]
-        data[..., 3] = pixels[..., 3]
-        size = (int(self._width), int(self._height))
-        img = pilfromstring('RGBA', size, data)
+        blended = target + ((pixels[touched][..., :len(channels)] - target)
+                            * transparency[:, np.newaxis])
+        pixels[touched, :len(channels)] = np.rint(blended)
 
-        # Check the output format to see if it can handle an alpha channel.
-        no_alpha_formats = ('jpg', 'bmp', 'eps', 'jpeg')
-        if ((isinstance(filename, str) and
-                os.path.splitext(filename)[1][1:] in no_alpha_formats) or
-                (file_format.lower() in no_alpha_formats)):
-            img = img.convert('RGB')
+    def save(self, filename, file_format=None, pil_options=None):
+        """ Save the contents of the context to a file
 
-        img.save(filename, format=file_format)
+            The pixels are handed to PIL without copying them unless the
+            file format has no alpha channel.  filename may also be a
+            file-like object, in which case file_format must be given.
+        """
+        try:
+            from kiva.compat import save_pixels
+        except ImportError:
+            raise ImportError("need PIL (or Pillow) to save images")
+
+        save_pixels(self.gc.array, self.pix_format, filename, file_format,
+                    pil_options)
 
 
 class CompiledPath(object):
@@ -789,8 +1103,12 @@ class CompiledPath(object):
     def line_to(self, x, y):
         self.path.line_to(x, y)
 
-    def lines(self, points):
-        self.path.lines(points)
+    def lines(self, points, break_on_nan=False):
+        if break_on_nan:
+            for run in _finite_runs(points):
+                self.path.lines(run)
+        else:
+            self.path.lines(points)
 
     def line_set(self, starts, ends):
         self.path.lines_set(starts, ends)
@@ -828,6 +1146,45 @@ class CompiledPath(object):
 AbstractGraphicsContext.register(GraphicsContext)
 
 
+def _image_array(array):
+    """ Return a C contiguous, writable uint8 version of an image array,
+    copying it only when it is not one already.
+
+    celiagg reads images through writable Cython memoryviews, which cannot
+    be taken of read-only arrays such as those of PIL images or bytes, so
+    those are copied.  Backbuffers are writable and are drawn without a copy.
+    """
+    array = np.ascontiguousarray(array, dtype=np.uint8)
+    if not array.flags.writeable:
+        array = array.copy()
+    return array
+
+
+def _array_pix_format(array):
+    """ The pixel format of an RGB or RGBA image array, or None.
+    """
+    if array.ndim != 3:
+        return None
+    elif array.shape[2] == 3:
+        return agg.PixelFormat.RGB24
+    elif array.shape[2] == 4:
+        return agg.PixelFormat.RGBA32
+    return None
+
+
+def _marker_path(marker, size):
+    """ Return the cached path of a kiva marker of the given size.
+    """
+    key = (marker, size)
+    path = marker_path_cache.get(key)
+    if path is None:
+        if len(marker_path_cache) >= marker_path_cache_size:
+            marker_path_cache.clear()
+        path = marker_path_cache[key] = CompiledPath()
+        marker_shapes[marker][0](path, size)
+    return path
+
+
 def font_metrics_provider():
     """ Creates an object to be used for querying font metrics.
     """
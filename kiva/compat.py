@@ -3,7 +3,10 @@ Compatibility module to help support various versions of PIL and
 Pillow.
 
 """
+import os
+
 from PIL import Image
+import six
 
 HAS_FROM_BYTES = hasattr(Image, 'frombytes')
 
@@ -20,3 +23,102 @@ def pilfromstring(*args, **kwargs):
         return Image.frombytes(*args, **kwargs)
     else:
         return Image.fromstring(*args, **kwargs)
+
+
+# File formats which cannot store an alpha channel.
+NO_ALPHA_FORMATS = ('jpg', 'jpeg', 'bmp', 'eps')
+
+# The PIL raw modes of the kiva pixel formats, with and without their alpha
+# channel.
+_RAW_MODES = {
+    'rgba32': ('RGBA', 'RGBX'),
+    'bgra32': ('BGRA', 'BGRX'),
+    'argb32': ('ARGB', 'XRGB'),
+    'abgr32': ('ABGR', 'XBGR'),
+    'rgb24': ('RGB', 'RGB'),
+    'bgr24': ('BGR', 'BGR'),
+    'gray8': ('L', 'L'),
+}
+
+# The order in which to take the channels of a 32 bit pixel format to get
+# RGBA.
+_RGBA_ORDERS = {
+    'bgra32': (2, 1, 0, 3),
+    'argb32': (1, 2, 3, 0),
+    'abgr32': (3, 2, 1, 0),
+}
+
+# The number of bytes of pixels flattened at once by _flatten_on_white.
+_FLATTEN_BLOCK_BYTES = 1 << 22
+
+
+def _flatten_on_white(pixels, order):
+    """ Composite the 32 bit pixels of an (H, W, 4) array onto white, taking
+    the channels in order as RGBA, and return them as an (H, W, 3) RGB array.
+    """
+    import numpy as np
+
+    order = list(order)
+    flat = np.empty(pixels.shape[:2] + (3,), dtype=np.uint8)
+    rows = max(1, _FLATTEN_BLOCK_BYTES // max(pixels[0].nbytes * 4, 1))
+    for start in range(0, pixels.shape[0], rows):
+        block = pixels[start:start + rows].astype(np.uint16)
+        color = block[..., order[:3]]
+        alpha = block[..., order[3]:order[3] + 1]
+        flat[start:start + rows] = (
+            (color * alpha + 255 * (255 - alpha) + 127) // 255)
+    return flat
+
+
+def save_pixels(pixels, pix_format, filename, file_format=None,
+                pil_options=None):
+    """ Save an array of pixels in a kiva pixel format with PIL.
+
+    `filename` may be a file name or a file-like object, which PIL writes to
+    as it encodes.  Where the output format keeps the alpha channel, the
+    array is handed to the encoder as it is, so transparent pixels stay
+    transparent, and 32 bit pixels which are not RGBA are reordered by PIL
+    as it reads them.  For formats without alpha, 32 bit pixels are
+    composited onto white in a single copy.  The array itself is never
+    changed.
+    """
+    import numpy as np
+
+    if file_format is None:
+        file_format = ''
+    if isinstance(filename, six.string_types):
+        extension = os.path.splitext(filename)[1][1:]
+    else:
+        extension = ''
+    keep_alpha = (extension.lower() not in NO_ALPHA_FORMATS and
+                  file_format.lower() not in NO_ALPHA_FORMATS)
+
+    height, width = pixels.shape[:2]
+    size = (width, height)
+    raw_mode, no_alpha_raw_mode = _RAW_MODES[pix_format]
+    has_alpha = len(raw_mode) == 4
+    if raw_mode == 'L':
+        mode = 'L'
+    elif keep_alpha and has_alpha:
+        mode = 'RGBA'
+    else:
+        mode = 'RGB'
+        raw_mode = no_alpha_raw_mode
+    stride = pixels.strides[0]
+    options = pil_options or {}
+
+    if has_alpha and mode == 'RGB':
+        pixels = _flatten_on_white(pixels,
+                                   _RGBA_ORDERS.get(pix_format, (0, 1, 2, 3)))
+        img = Image.frombuffer(mode, size, pixels, 'raw', mode, 0, 1)
+        img.save(filename, format=file_format or None, **options)
+        return
+
+    if not pixels.flags.c_contiguous:
+        pixels = np.ascontiguousarray(pixels)
+        stride = pixels.strides[0]
+    if mode == raw_mode:
+        img = Image.frombuffer(mode, size, pixels, 'raw', raw_mode, stride, 1)
+    else:
+        img = pilfromstring(mode, size, pixels, 'raw', raw_mode, stride)
+    img.save(filename, format=file_format or None, **options)
@@ -25,6 +25,10 @@ font_styles = {'italic': ITALIC}
 font_weights = {'bold': BOLD}
 font_noise = ['pt', 'point', 'family']
 
+# The files found by Font.findfont(), keyed on the attributes which are used to
+# look them up.
+_findfont_cache = {}
+
 
 def str_to_font(fontspec):
     """
@@ -104,8 +108,12 @@ class Font(object):
         """ Returns the file name containing the font that most closely matches
         our font properties.
         """
-        fp = self._make_font_props()
-        return str(fontManager.findfont(fp))
+        key = (self.face_name, self.family, self.style, self.size)
+        filename = _findfont_cache.get(key)
+        if filename is None:
+            fp = self._make_font_props()
+            filename = _findfont_cache[key] = str(fontManager.findfont(fp))
+        return filename
 
     def findfontname(self):
         """ Returns the name of the font that most closely matches our font
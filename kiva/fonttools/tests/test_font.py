@@ -0,0 +1,25 @@
+from unittest import TestCase
+
+from ..font import Font, _findfont_cache
+from kiva.constants import BOLD, MODERN, ROMAN
+
+
+class TestFindFont(TestCase):
+
+    def test_findfont_cached(self):
+        _findfont_cache.clear()
+        font = Font(size=13, family=ROMAN)
+        filename = font.findfont()
+        self.assertEqual(len(_findfont_cache), 1)
+        self.assertEqual(Font(size=13, family=ROMAN).findfont(), filename)
+        self.assertEqual(len(_findfont_cache), 1)
+
+    def test_findfont_key_follows_changes(self):
+        _findfont_cache.clear()
+        font = Font(size=13, family=ROMAN)
+        font.findfont()
+        font.family = MODERN
+        font.findfont()
+        font.style = BOLD
+        font.findfont()
+        self.assertEqual(len(_findfont_cache), 3)
@@ -4,7 +4,7 @@ from __future__ import absolute_import, print_function
 # Major library imports
 import ctypes
 from math import floor
-from numpy import array, ndarray
+from numpy import array, ndarray, zeros
 
 # Pyglet and pyglet-related imports
 # Before we import anything else from pyglet, we need to set the shadow_window
@@ -337,6 +337,19 @@ class GraphicsContext(_GCL):
         label = GetLabel(text, pyglet_font)
         return (0, 0, label.content_width, label.content_height)
 
+    def get_text_extents(self, texts):
+        # Measure with pyglet, as get_text_extent() does, rather than with
+        # the Agg font engine.
+        extents = zeros((len(texts), 4))
+        if self._current_font is None:
+            return extents
+
+        pyglet_font = GetFont(self._current_font)
+        for i, text in enumerate(texts):
+            label = GetLabel(text, pyglet_font)
+            extents[i, 2:] = label.content_width, label.content_height
+        return extents
+
     def show_text(self, text, point=None):
         if point is None:
             point = (0, 0)
@@ -9,13 +9,11 @@ PDF backends, but not Agg or QPainter).
 
 from __future__ import absolute_import, print_function
 
-import copy
-
 from numpy import array, float64
 
 from .constants import CAP_ROUND, JOIN_MITER, TEXT_FILL
 from .fonttools import Font
-from .line_state import LineState
+from .line_state import CopyOnWrite, LineState
 import kiva.affine as affine
 
 
@@ -89,8 +87,17 @@ class GraphicsState(LineState):
         deals with colors and color correction in
         a sophisticated way.
 
+    Copies share their arrays and font until either of them touches one,
+    so `copy` is cheap however much of the state a drawing changes.
+
     """
 
+    ctm = CopyOnWrite('ctm')
+    fill_color = CopyOnWrite('fill_color')
+    font = CopyOnWrite('font')
+    text_matrix = CopyOnWrite('text_matrix')
+    current_point = CopyOnWrite('current_point')
+
     def __init__(self):
         # Line state default values.
         line_color = array((0.0, 0.0, 0.0, 1.0))
@@ -123,4 +130,6 @@ class GraphicsState(LineState):
         self.alpha = 1.0
 
     def copy(self):
-        return copy.deepcopy(self)
+        state = super(GraphicsState, self).copy()
+        state.line_state = state
+        return state
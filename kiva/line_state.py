@@ -9,6 +9,8 @@ state (eg. Wx, SVG and PDF backends, but not Agg or QPainter).
 
 from __future__ import absolute_import, print_function
 
+import copy
+
 from numpy import alltrue, array, asarray, shape, sometrue
 
 from .constants import NO_DASH
@@ -66,6 +68,63 @@ def line_state_equal(line1, line2):
     return result
 
 
+def copy_dash(dash):
+    """ Copies a (phase, pattern) dash, which holds a mutable array. """
+    return (dash[0], array(dash[1], copy=1))
+
+
+class CopyOnWrite(object):
+    """ An attribute whose mutable value is shared by copies of its owner.
+
+    The owner's `copy` shares the values of these attributes rather than
+    copying them.  A shared value is copied the first time it is accessed
+    through either owner afterwards, so changing it in place never affects
+    the other owner, and values which are never touched are never copied.
+
+    Parameters
+    ----------
+    name : str
+        The name of the attribute.
+    clone : callable
+        Returns a copy of a value of the attribute.  By default this is a
+        shallow copy, which suits arrays and fonts.
+    """
+
+    def __init__(self, name, clone=copy.copy):
+        self.name = name
+        self.clone = clone
+        self.key = '_cow_' + name
+
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            return self
+        value = obj.__dict__[self.key]
+        shared = obj.__dict__['_shared']
+        if self.name in shared:
+            shared.discard(self.name)
+            value = self.clone(value)
+            obj.__dict__[self.key] = value
+        return value
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.key] = value
+        obj.__dict__['_shared'].discard(self.name)
+
+
+_copy_on_write_names = {}
+
+
+def copy_on_write_names(cls):
+    """ Returns the names of the `CopyOnWrite` attributes of a class. """
+    names = _copy_on_write_names.get(cls)
+    if names is None:
+        names = frozenset(value.name for klass in cls.__mro__
+                          for value in vars(klass).values()
+                          if isinstance(value, CopyOnWrite))
+        _copy_on_write_names[cls] = names
+    return names
+
+
 class LineState(object):
     """ Stores information about the current line drawing settings.
 
@@ -73,8 +132,14 @@ class LineState(object):
     track line state changes.  All the methods for setting
     these variables are left in the GraphicsStateBase class.
 
+    Copies share their colors and dash patterns until either of them touches
+    them, so saving a state doesn't copy the values which don't change.
+
     """
 
+    line_color = CopyOnWrite('line_color')
+    line_dash = CopyOnWrite('line_dash', copy_dash)
+
     def __init__(self, color, width, cap, join, dash):
         """ Creates a new `LineState` object.
 
@@ -83,6 +148,9 @@ class LineState(object):
         from ever sharing and modifying the other's data.
 
         """
+        # The names of the copy on write attributes which are shared with
+        # copies of this object.
+        self._shared = set()
         self.line_color = array(color, copy=1)
         self.line_width = width
         self.line_cap = cap
@@ -91,13 +159,16 @@ class LineState(object):
             # always set line_dash to be a tuple
             self.line_dash = NO_DASH
         else:
-            self.line_dash = (dash[0], array(dash[1], copy=1))
+            self.line_dash = copy_dash(dash)
 
     def copy(self):
         """ Makes a copy of the current line state """
-        # Could just use deepcopy...
-        return LineState(self.line_color, self.line_width, self.line_cap,
-                         self.line_join, self.line_dash)
+        other = object.__new__(type(self))
+        other.__dict__.update(self.__dict__)
+        names = copy_on_write_names(type(self))
+        self._shared = set(names)
+        other._shared = set(names)
+        return other
 
     def is_dashed(self):
         # if line_dash only has one entry, it is a solid line.
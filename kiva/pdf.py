@@ -31,6 +31,7 @@ import reportlab.pdfbase._fontdata
 from reportlab.pdfgen import canvas
 
 # local, relative Kiva imports
+from .abstract_graphics_context import _finite_runs
 from .arc_conversion import arc_to_tangent_points
 from .basecore2d import GraphicsContextBase
 from .line_state import is_dashed
@@ -322,22 +323,26 @@ class GraphicsContext(GraphicsContextBase):
         self.current_pdf_path.lineTo(x, y)
         self.current_point = (x, y)
 
-    def lines(self, points):
+    def lines(self, points, break_on_nan=False):
         """ Adds a series of lines as a new subpath.
 
             Currently implemented by calling line_to a zillion times.
 
-            Points is an Nx2 array of x, y pairs.
+            Points is an Nx2 array of x, y pairs.  With break_on_nan, points
+            which aren't finite are left out and the line starts again from
+            the next finite point.
 
             current_point is moved to the last point in points
         """
         if self.current_pdf_path is None:
             self.begin_path()
 
-        self.current_pdf_path.moveTo(points[0][0], points[0][1])
-        for x, y in points[1:]:
-            self.current_pdf_path.lineTo(x, y)
-            self.current_point = (x, y)
+        runs = _finite_runs(points) if break_on_nan else [points]
+        for run in runs:
+            self.current_pdf_path.moveTo(run[0][0], run[0][1])
+            for x, y in run[1:]:
+                self.current_pdf_path.lineTo(x, y)
+                self.current_point = (x, y)
 
     def line_set(self, starts, ends):
         if self.current_pdf_path is None:
@@ -239,9 +239,11 @@ class PSGC(basecore2d.GraphicsContextBase):
         if rect == None:
             rect = (0, 0, img.width(), img.height())
 
-        # PIL PS output doesn't support alpha.
+        # PIL PS output doesn't support alpha, so flatten the image onto white.
         if format != 'RGB':
-            pil_img = pil_img.convert('RGB')
+            background = PilImage.new('RGB', pil_img.size, (255, 255, 255))
+            background.paste(pil_img, mask=pil_img.split()[3])
+            pil_img = background
 
         left, top, width, height = rect
         if width != img.width() or height != img.height():
@@ -254,8 +256,11 @@ class PSGC(basecore2d.GraphicsContextBase):
         self.contents.write('[%.3f %.3f %.3f %.3f %.3f %.3f] concat\n' % \
                             affine.affine_params(m))
         self.contents.write('%.3f %.3f translate\n' % (left, top))
-        # Rely on PIL's EpsImagePlugin to do the hard work here.
-        pil_img.save(self.contents, 'eps', eps=0)
+        # Rely on PIL's EpsImagePlugin to do the hard work here.  It writes
+        # bytes, which are all ASCII.
+        eps = six.BytesIO()
+        pil_img.save(eps, 'eps', eps=0)
+        self.contents.write(eps.getvalue().decode('ascii'))
         self.contents.write('grestore\n')
 
     def device_transform_device_ctm(self,func,args):
@@ -278,6 +283,17 @@ class PSGC(basecore2d.GraphicsContextBase):
                                 affine.affine_params(m))
 
     def device_fill_points(self, points, mode):
+        self._write_path([(points, False)], mode)
+
+    def device_draw_subpaths(self, subpaths, mode):
+        # Several subpaths are written as one path, which is smaller and
+        # fills them together, as a single path should be.
+        if len(subpaths) == 1:
+            super(PSGC, self).device_draw_subpaths(subpaths, mode)
+            return
+        self._write_path(subpaths, mode)
+
+    def _write_path(self, subpaths, mode):
         if self.state.clipping_path:
             self.contents.write('clipsave\n')
             self.contents.write('%3.3f %3.3f %3.3f %3.3f rectclip\n' % self.state.clipping_path)
@@ -290,10 +306,15 @@ class PSGC(basecore2d.GraphicsContextBase):
         self.contents.write('%d setlinecap\n' % linecap)
         self.contents.write('%d setlinejoin\n' % linejoin)
         self.contents.write('newpath\n')
-        x,y = points[0]
-        self.contents.write('    %3.3f %3.3f moveto\n' % (x,y))
-        for (x,y) in points[1:]:
-            self.contents.write('    %3.3f %3.3f lineto\n' % (x,y))
+        for points, closed in subpaths:
+            if closed:
+                points = points[:-1]
+            x,y = points[0]
+            self.contents.write('    %3.3f %3.3f moveto\n' % (x,y))
+            for (x,y) in points[1:]:
+                self.contents.write('    %3.3f %3.3f lineto\n' % (x,y))
+            if closed:
+                self.contents.write('    closepath\n')
 
         first_pass, second_pass = fill_stroke_map[mode]
 
@@ -12,16 +12,20 @@
 
 from __future__ import absolute_import, print_function
 
+from collections import OrderedDict
 from functools import partial
-import six.moves as sm
 import numpy as np
 import warnings
+import weakref
 
 # Major package imports.
 from pyface.qt import QtCore, QtGui
 
 # Local imports.
-from .abstract_graphics_context import AbstractGraphicsContext
+from .abstract_graphics_context import (
+    AbstractGraphicsContext, _point_colors_and_sizes, _point_groups
+)
+from ._marker_stamps import circle_ticks, marker_shapes, stamp_path_at_points
 from .arc_conversion import arc_to_tangent_points
 from .fonttools import Font
 import kiva.constants as constants
@@ -55,6 +59,11 @@ gradient_spread_modes['pad'] = QtGui.QGradient.PadSpread
 gradient_spread_modes['repeat'] = QtGui.QGradient.RepeatSpread
 gradient_spread_modes['reflect'] = QtGui.QGradient.ReflectSpread
 
+# The layout of an element of a QPainterPath written by a QDataStream.
+_stream_element = np.dtype([('type', '>i4'), ('x', '>f8'), ('y', '>f8')])
+_MOVE_TO = int(QtGui.QPainterPath.MoveToElement)
+_LINE_TO = int(QtGui.QPainterPath.LineToElement)
+
 
 class GraphicsContext(object):
     """ Simple wrapper around a Qt QPainter object.
@@ -330,21 +339,19 @@ class GraphicsContext(object):
         """
         self.path.line_to(x, y)
 
-    def lines(self, points):
+    def lines(self, points, break_on_nan=False):
         """ Add a series of lines as a new subpath.
 
-            Currently implemented by calling line_to a zillion times.
-
-            Points is an Nx2 array of x, y pairs.
+            Points is an Nx2 array of x, y pairs.  With break_on_nan, points
+            which aren't finite are left out and the line starts again from
+            the next finite point.
         """
-        self.path.lines(points)
+        self.path.lines(points, break_on_nan)
 
     def line_set(self, starts, ends):
         """ Draw multiple disjoint line segments.
         """
-        for start, end in sm.zip(starts, ends):
-            self.path.path.moveTo(start[0], start[1])
-            self.path.path.lineTo(end[0], end[1])
+        self.path.line_set(starts, ends)
 
     def rect(self, x, y, sx, sy):
         """ Add a rectangle as a new subpath.
@@ -547,47 +554,40 @@ class GraphicsContext(object):
     # Drawing Images
     # ----------------------------------------------------------------
 
-    def draw_image(self, img, rect=None):
+    def draw_image(self, img, rect=None, version=None):
         """
         img is either a N*M*3 or N*M*4 numpy array, or a Kiva image
 
         rect - a tuple (x, y, w, h)
+
+        version - any value which changes whenever the pixels of img do,
+        such as a count of the times it has been drawn into.  The pixmap
+        made from img is reused while the version stays the same.  Without
+        a version, the pixels are compared with a copy of them instead.
         """
         from kiva import agg
 
-        def copy_padded(array):
-            """ Pad image width to a multiple of 4 pixels, and minimum dims of
-                12x12. QImage is very particular about its data.
-            """
-            y, x, d = array.shape
-            pad = lambda v: (4 - (v % 4)) % 4
-            nx = max(x + pad(x), 12)
-            ny = max(y, 12)
-            if x == nx and y == ny:
-                return array
-            ret = np.zeros((ny, nx, d), dtype=np.uint8)
-            ret[:y, :x] = array[:]
-            return ret
-
-        if type(img) == type(np.array([])):
+        if isinstance(img, np.ndarray):
             # Numeric array
-            if img.shape[2] == 3:
-                format = QtGui.QImage.Format_RGB888
-            elif img.shape[2] == 4:
-                format = QtGui.QImage.Format_RGB32
-            width, height = img.shape[:2]
-            copy_array = copy_padded(img)
-            draw_img = QtGui.QImage(img.astype(np.uint8), copy_array.shape[1],
-                                    height, format)
-            pixmap = QtGui.QPixmap.fromImage(draw_img)
+            entry = image_cache.get(img, img, version=version)
+            if entry is None:
+                if img.shape[2] == 3:
+                    format = QtGui.QImage.Format_RGB888
+                elif img.shape[2] == 4:
+                    format = QtGui.QImage.Format_RGB32
+                entry = _image_pixmap(img.astype(np.uint8), format)
+                image_cache.put(img, img, entry, version=version)
+            pixmap, width, height = entry
         elif isinstance(img, agg.GraphicsContextArray):
-            converted_img = img.convert_pixel_format('bgra32', inplace=0)
-            copy_array = copy_padded(converted_img.bmp_array)
-            width, height = img.width(), img.height()
-            draw_img = QtGui.QImage(copy_array.flatten(),
-                                    copy_array.shape[1], height,
-                                    QtGui.QImage.Format_RGB32)
-            pixmap = QtGui.QPixmap.fromImage(draw_img)
+            entry = image_cache.get(img, img.bmp_array, img.format(),
+                                    version)
+            if entry is None:
+                converted_img = img.convert_pixel_format('bgra32', inplace=0)
+                entry = _image_pixmap(converted_img.bmp_array,
+                                      QtGui.QImage.Format_ARGB32)
+                image_cache.put(img, img.bmp_array, entry, img.format(),
+                                version)
+            pixmap, width, height = entry
         elif (isinstance(img, GraphicsContext) and
               isinstance(img.qt_dc, QtGui.QPixmap) and img.gc.isActive()):
             # An offscreen Qt kiva context
@@ -596,6 +596,9 @@ class GraphicsContext(object):
             # the same outcome.
             pixmap = img.qt_dc
             width, height = pixmap.width(), pixmap.height()
+            flip_trans = QtGui.QTransform()
+            flip_trans.scale(1.0, -1.0)
+            pixmap = pixmap.transformed(flip_trans)
         else:
             msg = ("Cannot render image of type '%r' into Qt4 context." %
                    type(img))
@@ -608,12 +611,10 @@ class GraphicsContext(object):
         else:
             dest_rect = QtCore.QRectF(*rect)
 
-        # draw using the entire image's data
-        source_rect = QtCore.QRectF(0.0, 0.0, width, height)
-
-        flip_trans = QtGui.QTransform()
-        flip_trans.scale(1.0, -1.0)
-        pixmap = pixmap.transformed(flip_trans)
+        # draw using the entire image's data, which is at the bottom of the
+        # flipped pixmap if it was padded.
+        source_rect = QtCore.QRectF(0.0, pixmap.height() - height,
+                                    width, height)
 
         # draw
         self.gc.drawPixmap(dest_rect, pixmap, source_rect)
@@ -710,6 +711,18 @@ class GraphicsContext(object):
 
         return rect.left(), -fm.descent(), rect.right(), fm.height()
 
+    def get_text_extents(self, texts):
+        """ Returns the bounding rects of a sequence of strings as an (N, 4)
+        array, measuring them all with the same font metrics
+        """
+        fm = self.gc.fontMetrics()
+        descent, height = -fm.descent(), fm.height()
+        extents = np.empty((len(texts), 4))
+        for i, text in enumerate(texts):
+            rect = fm.boundingRect(text)
+            extents[i] = rect.left(), descent, rect.right(), height
+        return extents
+
     def get_full_text_extent(self, text):
         """ Backwards compatibility API over .get_text_extent() for Enable
         """
@@ -805,26 +818,251 @@ class GraphicsContext(object):
         """
         return CompiledPath()
 
-    def draw_path_at_points(self, points, path, mode=constants.FILL_STROKE):
+    def draw_path_at_points(self, points, path, mode=constants.FILL_STROKE,
+                            colors=None, stamp_tolerance=0.0):
+        """ Draw a path object at many different points.
+
+        colors may give an RGBA color for each point, as an array of shape
+        (N, 4).  A point's color replaces the fill color, or the stroke color
+        when the mode doesn't fill.  The points of each color are drawn
+        together, in the order of each color's first point.
+
+        With a stamp_tolerance greater than 0, each marker may be moved by up
+        to that many pixels, so that the path is only rendered for a few
+        subpixel offsets and then blended at every point.  The stamped
+        markers are all filled before any of them are stroked.
+        """
+        points, colors, _ = _point_colors_and_sizes(points, colors)
+        if colors is None:
+            self._draw_path_at_points(points, path, mode, stamp_tolerance)
+            return
+
+        self.gc.save()
+        try:
+            for index, color in _point_groups(colors):
+                color = QtGui.QColor.fromRgbF(*color)
+                if mode == constants.STROKE:
+                    pen = self.gc.pen()
+                    pen.setColor(color)
+                    self.gc.setPen(pen)
+                else:
+                    brush = self.gc.brush()
+                    brush.setColor(color)
+                    self.gc.setBrush(brush)
+                self._draw_path_at_points(points[index], path, mode,
+                                          stamp_tolerance)
+        finally:
+            self.gc.restore()
+
+    def _draw_path_at_points(self, points, path, mode, stamp_tolerance):
+        """ Draw a path at many points with the current pen and brush.
+        """
+        if (stamp_tolerance > 0 and
+                stamp_path_at_points(self, points, path, mode,
+                                     stamp_tolerance)):
+            return
+
         # set up drawing state and function
         if mode == constants.STROKE:
             draw_func = partial(self.gc.strokePath, path.path, self.gc.pen())
         elif mode in [constants.FILL, constants.EOF_FILL]:
-            mode = draw_modes[mode]
-            path.path.setFillRule(mode)
+            path.path.setFillRule(draw_modes[mode])
             draw_func = partial(self.gc.fillPath, path.path, self.gc.brush())
         else:
-            mode = draw_modes[mode]
-            path.path.setFillRule(mode)
+            path.path.setFillRule(draw_modes[mode])
             draw_func = partial(self.gc.drawPath, path.path)
 
-        for point in points:
-            x, y = point
+        for x, y in points:
             self.gc.save()
             self.gc.translate(x, y)
             draw_func()
             self.gc.restore()
 
+    def _marker_layers(self, mode):
+        """ The paint of each layer of markers drawn with mode, and the pen
+        to draw it with or None, with the fill before the stroke.
+        """
+        layers = []
+        if mode != constants.STROKE:
+            layers.append((self.gc.brush(), None))
+        pen = self.gc.pen()
+        if (mode not in (constants.FILL, constants.EOF_FILL) and
+                pen.style() != QtCore.Qt.NoPen):
+            layers.append((pen.brush(), pen))
+        return layers
+
+    def _marker_box(self, path, layers):
+        """ Find the pixels which the layers of a marker may cover.
+
+        Returns the offset from a marker's pixel to the corner of the box of
+        pixels it covers, and the width and height of the box, with a pixel
+        to spare on each side for subpixel offsets.  Returns None if the box
+        is too large to render.
+        """
+        rect = path.path.controlPointRect()
+        device_pad = 1.0
+        for paint, pen in layers:
+            if pen is None:
+                continue
+            width = pen.widthF()
+            pad = max(width, 1.0) / 2 * max(pen.miterLimit(), 1.0)
+            if pen.isCosmetic() or width == 0:
+                device_pad += pad
+            else:
+                rect = rect.adjusted(-pad, -pad, pad, pad)
+
+        t = self.gc.worldTransform()
+        rect = t.mapRect(rect).translated(-t.dx(), -t.dy())
+        x0 = int(np.floor(rect.left() - device_pad))
+        y0 = int(np.floor(rect.top() - device_pad))
+        x1 = int(np.ceil(rect.right() + device_pad))
+        y1 = int(np.ceil(rect.bottom() + device_pad))
+        if max(x1 - x0, y1 - y0) > 2 * max(self._width, self._height):
+            return None
+        return x0, y0, x1 - x0, y1 - y0
+
+    def _can_stamp_layers(self, layers):
+        """ Whether markers with these layers may be blended in any order.
+        """
+        return (self.gc.compositionMode() ==
+                QtGui.QPainter.CompositionMode_SourceOver and
+                all(paint.style() == QtCore.Qt.SolidPattern
+                    for paint, pen in layers))
+
+    def _device_points(self, points):
+        """ The device coordinates of points, as arrays of x and y.
+        """
+        t = self.gc.worldTransform()
+        x = t.m11() * points[:, 0] + t.m21() * points[:, 1] + t.dx()
+        y = t.m12() * points[:, 0] + t.m22() * points[:, 1] + t.dy()
+        return x, y
+
+    def _stamp_clip(self):
+        """ The x and y ranges of the pixels which stamps may cover.
+        """
+        return (0, self._width), (0, self._height)
+
+    def _layer_alpha(self, layer):
+        """ The opacity of a layer of markers.
+        """
+        paint, pen = layer
+        return paint.color().alphaF() * self.gc.opacity()
+
+    def _render_stamp(self, path, mode, layer, offset, shape):
+        """ Render the coverage of a path with the linear part of the world
+        transform, moved by offset, into a new array of the given shape.
+
+        The path is stroked with the pen of the layer, or filled if it is
+        None.
+        """
+        paint, pen = layer
+        height, width = shape
+        image = QtGui.QImage(width, height,
+                             QtGui.QImage.Format_ARGB32_Premultiplied)
+        image.fill(0)
+        t = self.gc.worldTransform()
+        painter = QtGui.QPainter(image)
+        painter.setRenderHints(self.gc.renderHints())
+        painter.setTransform(QtGui.QTransform(t.m11(), t.m12(), t.m21(),
+                                              t.m22(), offset[0], offset[1]))
+        if pen is None:
+            path.path.setFillRule(draw_modes[mode])
+            painter.fillPath(path.path, QtGui.QBrush(QtCore.Qt.white))
+        else:
+            pen = QtGui.QPen(pen)
+            pen.setColor(QtCore.Qt.white)
+            painter.strokePath(path.path, pen)
+        painter.end()
+        return (_image_pixels(image) >> 24).astype(np.uint8)
+
+    def _draw_layer(self, log_t, layer):
+        """ Blend the color of a layer over the pixels with the opacity left
+        by the log of their transparency.
+        """
+        color = layer[0].color()
+        rows = np.flatnonzero(log_t.any(axis=1))
+        cols = np.flatnonzero(log_t.any(axis=0))
+        if len(rows) == 0:
+            return
+        log_t = log_t[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+        opacity = 1.0 - np.exp(log_t)
+        pixels = np.rint(opacity * 255).astype(np.uint32) << 24
+        for shift, channel in ((16, color.redF()), (8, color.greenF()),
+                               (0, color.blueF())):
+            pixels |= np.rint(opacity * (channel * 255)).astype(
+                np.uint32) << shift
+        height, width = log_t.shape
+        image = QtGui.QImage(pixels, width, height, width * 4,
+                             QtGui.QImage.Format_ARGB32_Premultiplied)
+
+        self.gc.save()
+        try:
+            self.gc.resetTransform()
+            self.gc.setOpacity(1.0)
+            self.gc.drawImage(QtCore.QPointF(cols[0], rows[0]), image)
+        finally:
+            self.gc.restore()
+
+    def draw_marker_at_points(self, points, size,
+                              marker=constants.SQUARE_MARKER, colors=None,
+                              sizes=None, stamp_tolerance=0.5):
+        """ Draw a marker at each of the points.
+
+        colors and sizes may give an RGBA color and a size for each point, as
+        arrays of shape (N, 4) and (N,).  A point's color replaces the fill
+        color, or the stroke color of markers which are only stroked.  The
+        markers are drawn for one size at a time, in the order of each
+        size's first point.
+
+        By default the markers are stamped at the nearest whole pixel, as
+        Agg draws its markers.  See draw_path_at_points() for
+        stamp_tolerance, which may be 0 to draw each marker exactly.
+
+        Returns False if the marker is not known, in which case nothing is
+        drawn.
+        """
+        if marker not in marker_shapes:
+            return False
+        points, colors, sizes = _point_colors_and_sizes(points, colors, sizes)
+        if marker == constants.PIXEL_MARKER:
+            self._draw_pixels(points, colors)
+            return True
+
+        mode = marker_shapes[marker][1]
+        if sizes is None:
+            groups = [(slice(None), (size,))]
+        else:
+            groups = _point_groups(sizes)
+        for index, (marker_size,) in groups:
+            self.draw_path_at_points(
+                points[index], _marker_path(marker, marker_size), mode,
+                colors=None if colors is None else colors[index],
+                stamp_tolerance=stamp_tolerance)
+        return True
+
+    def _draw_pixels(self, points, colors):
+        """ Draw a single pixel in the fill color at each point.
+        """
+        points = points[np.isfinite(points).all(axis=1)]
+        if colors is None:
+            groups = [(slice(None), None)]
+        else:
+            groups = _point_groups(colors)
+
+        self.gc.save()
+        try:
+            self.gc.setRenderHint(QtGui.QPainter.Antialiasing, False)
+            pen = QtGui.QPen(self.gc.brush().color())
+            pen.setCosmetic(True)
+            pen.setWidth(1)
+            for index, color in groups:
+                if color is not None:
+                    pen.setColor(QtGui.QColor.fromRgbF(*color))
+                self.gc.setPen(pen)
+                self.gc.drawPoints(_polygon_from_points(points[index]))
+        finally:
+            self.gc.restore()
+
     def _flip_y(self, y):
         "Converts between a Kiva and a Qt y coordinate"
         return self._height - y - 1
@@ -871,10 +1109,26 @@ class CompiledPath(object):
     def line_to(self, x, y):
         self.path.lineTo(x, y)
 
-    def lines(self, points):
-        self.path.moveTo(points[0][0], points[0][1])
-        for x, y in points[1:]:
-            self.path.lineTo(x, y)
+    def lines(self, points, break_on_nan=False):
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        types = np.full(len(points), _LINE_TO)
+        if break_on_nan:
+            finite = np.isfinite(points).all(axis=1)
+            types[finite & ~np.r_[False, finite[:-1]]] = _MOVE_TO
+            types, points = types[finite], points[finite]
+        elif len(points):
+            types[0] = _MOVE_TO
+        self.path.addPath(_path_from_elements(types, points))
+
+    def line_set(self, starts, ends):
+        starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+        # Pair them up like zip(), ignoring any extra starts or ends.
+        count = min(len(starts), len(ends))
+        points = np.stack([starts[:count], ends[:count]], axis=1)
+        points = points.reshape(-1, 2)
+        types = np.tile([_MOVE_TO, _LINE_TO], count)
+        self.path.addPath(_path_from_elements(types, points))
 
     def curve_to(self, cx1, cy1, cx2, cy2, x, y):
         self.path.cubicTo(cx1, cy1, cx2, cy2, x, y)
@@ -886,8 +1140,15 @@ class CompiledPath(object):
         self.path.addRect(x, y, sx, sy)
 
     def rects(self, rects):
-        for x, y, sx, sy in rects:
-            self.path.addRect(x, y, sx, sy)
+        rects = np.asarray(rects, dtype=float).reshape(-1, 4)
+        # QPainterPath.addRect() leaves out empty rectangles.
+        rects = rects[(rects[:, 2] != 0) | (rects[:, 3] != 0)]
+        x, y, sx, sy = rects.T
+        # Each rectangle is a closed subpath, as made by addRect().
+        points = np.stack([x, y, x + sx, y, x + sx, y + sy, x, y + sy, x, y],
+                          axis=1).reshape(-1, 2)
+        types = np.tile([_MOVE_TO] + [_LINE_TO] * 4, len(rects))
+        self.path.addPath(_path_from_elements(types, points))
 
     def add_path(self, other_path):
         if isinstance(other_path, CompiledPath):
@@ -912,6 +1173,219 @@ class CompiledPath(object):
 AbstractGraphicsContext.register(GraphicsContext)
 
 
+def _path_from_elements(types, points):
+    """ Make a QPainterPath from arrays of the types and points of its
+    elements.
+
+    The path is read from the bytes which a QDataStream would write for it,
+    rather than being built one element at a time.  Elements which aren't
+    finite are left out, as QPainterPath leaves them out.
+    """
+    path = QtGui.QPainterPath()
+    finite = np.isfinite(points).all(axis=1)
+    if not finite.all():
+        types, points = types[finite], points[finite]
+    if len(types) == 0:
+        return path
+    if types[0] != _MOVE_TO:
+        types = types.copy()
+        types[0] = _MOVE_TO
+
+    elements = np.empty(len(types), dtype=_stream_element)
+    elements['type'] = types
+    elements['x'] = points[:, 0]
+    elements['y'] = points[:, 1]
+    # The start of the last subpath, and the fill rule
+    trailer = (np.flatnonzero(types == _MOVE_TO)[-1], int(path.fillRule()))
+    data = b''.join([np.array([len(types)], dtype='>i4').tobytes(),
+                     elements.tobytes(),
+                     np.array(trailer, dtype='>i4').tobytes()])
+    stream = QtCore.QDataStream(QtCore.QByteArray(data))
+    stream >> path
+    return path
+
+
+def _polygon_from_points(points):
+    """ Make a QPolygonF from an array of points of shape (N, 2).
+    """
+    polygon = QtGui.QPolygonF()
+    data = b''.join([np.array([len(points)], dtype='>u4').tobytes(),
+                     np.asarray(points, dtype='>f8').tobytes()])
+    stream = QtCore.QDataStream(QtCore.QByteArray(data))
+    stream >> polygon
+    return polygon
+
+
+def _image_pixels(image):
+    """ Return a view of the pixels of a 32 bit QImage as an array of shape
+    (height, width).
+    """
+    bits = image.constBits()
+    if hasattr(bits, 'setsize'):
+        # PyQt gives a pointer without a size.
+        bits.setsize(image.bytesPerLine() * image.height())
+    pixels = np.frombuffer(bits, dtype=np.uint32)
+    pixels = pixels.reshape(image.height(), image.bytesPerLine() // 4)
+    return pixels[:, :image.width()]
+
+
+def _circle_marker(path, size):
+    # CompiledPath.arc() starts with a line from the center, which would be
+    # stroked.
+    path.path.addEllipse(QtCore.QPointF(0.0, 0.0), size, size)
+
+
+def _crossed_circle_marker(path, size):
+    _circle_marker(path, size)
+    circle_ticks(path, size)
+
+
+_qt_marker_shapes = {
+    constants.CIRCLE_MARKER: _circle_marker,
+    constants.CROSSED_CIRCLE_MARKER: _crossed_circle_marker,
+    constants.DOT_MARKER: _circle_marker,
+}
+
+
+def _marker_path(marker, size):
+    """ Return the path of a kiva marker of the given size.
+    """
+    path = CompiledPath()
+    build = _qt_marker_shapes.get(marker, marker_shapes[marker][0])
+    build(path, size)
+    return path
+
+
+class _PixmapCache(object):
+    """ The pixmaps made by draw_image() from arrays and Agg images, so that
+    an image which is drawn again unchanged is blitted straight from its
+    pixmap.
+
+    Entries are keyed on the identity of the image, and only live as long as
+    it does.  An entry is used while the image's buffer, layout and pixel
+    format are the ones it was made from, and while its version is the one
+    it was drawn with.  Images drawn without a version keep a copy of their
+    pixels with the pixmap instead, and the entry is used while the pixels
+    still equal it.  The least recently drawn entries are dropped to keep
+    the pixmaps and copies within max_bytes.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+
+    def get(self, image, array, pix_format=None, version=None):
+        """ Return the cached (pixmap, width, height) of an image whose
+        pixels are in array, or None.
+        """
+        key = id(image)
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        ref, signature, cached_version, snapshot, entry, nbytes = item
+        if (ref() is image and signature == _signature(array, pix_format)
+                and cached_version == version and
+                (version is not None or _same_pixels(snapshot, array))):
+            # Mark the entry as the most recently used.
+            del self._entries[key]
+            self._entries[key] = item
+            return entry
+        self._discard(key)
+        return None
+
+    def put(self, image, array, entry, pix_format=None, version=None):
+        """ Cache the (pixmap, width, height) made from an image.
+        """
+        pixmap = entry[0]
+        nbytes = pixmap.width() * pixmap.height() * 4
+        if version is None:
+            nbytes += array.nbytes
+        if nbytes > self.max_bytes:
+            return
+        key = id(image)
+        try:
+            ref = weakref.ref(image, partial(self._forget, key))
+        except TypeError:
+            return
+        self._discard(key)
+        while self._entries and self.nbytes + nbytes > self.max_bytes:
+            self._discard(next(iter(self._entries)))
+        snapshot = array.copy() if version is None else None
+        self._entries[key] = (ref, _signature(array, pix_format), version,
+                              snapshot, entry, nbytes)
+        self.nbytes += nbytes
+
+    def clear(self):
+        """ Drop every entry.
+        """
+        self._entries.clear()
+        self.nbytes = 0
+
+    def _discard(self, key):
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self.nbytes -= item[-1]
+
+    def _forget(self, key, ref):
+        # The id of a dead image may have been reused by a newer entry.
+        item = self._entries.get(key)
+        if item is not None and item[0] is ref:
+            self._discard(key)
+
+
+# The pixmaps of the images drawn by draw_image(), within 64MB.
+image_cache = _PixmapCache(64 * 2 ** 20)
+
+
+def _signature(array, pix_format):
+    """ The buffer, layout and format of the pixels of an image.
+    """
+    return (array.__array_interface__['data'][0], array.shape,
+            array.strides, array.dtype.str, pix_format)
+
+
+def _same_pixels(snapshot, array):
+    """ Whether an array holds the same bytes as an earlier copy of it.
+    """
+    if array.flags.c_contiguous and array.nbytes % 8 == 0:
+        # Comparing eight bytes at a time takes half as long.
+        snapshot = snapshot.reshape(-1).view(np.uint64)
+        array = array.reshape(-1).view(np.uint64)
+    return np.array_equal(snapshot, array)
+
+
+def _image_pixmap(array, format):
+    """ Make a vertically flipped pixmap of an image array.
+
+    Returns the pixmap and the width and height of the image, which may be
+    smaller than the pixmap.
+    """
+    height, width = array.shape[:2]
+    copy_array = _copy_padded(array)
+    draw_img = QtGui.QImage(copy_array.flatten(), copy_array.shape[1],
+                            copy_array.shape[0], format)
+    flip_trans = QtGui.QTransform()
+    flip_trans.scale(1.0, -1.0)
+    pixmap = QtGui.QPixmap.fromImage(draw_img).transformed(flip_trans)
+    return pixmap, width, height
+
+
+def _copy_padded(array):
+    """ Pad image width to a multiple of 4 pixels, and minimum dims of
+        12x12. QImage is very particular about its data.
+    """
+    y, x, d = array.shape
+    pad = lambda v: (4 - (v % 4)) % 4
+    nx = max(x + pad(x), 12)
+    ny = max(y, 12)
+    if x == nx and y == ny:
+        return array
+    ret = np.zeros((ny, nx, d), dtype=np.uint8)
+    ret[:y, :x] = array[:]
+    return ret
+
+
 def font_metrics_provider():
     """ Creates an object to be used for querying font metrics.
     """
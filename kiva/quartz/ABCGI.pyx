@@ -891,6 +891,15 @@ cdef class CGContext:
 
         return x1, y1, x2, y2
 
+    def get_text_extents(self, object texts):
+        """ Measure a sequence of strings.  Returns an Nx4 array with the
+            result of get_text_extent() for each string.
+        """
+        extents = numpy.zeros((len(texts), 4))
+        for i, text in enumerate(texts):
+            extents[i] = self.get_text_extent(text)
+        return extents
+
     def get_full_text_extent(self, object text):
         """ Backwards compatibility API over .get_text_extent() for Enable.
         """
@@ -0,0 +1,557 @@
+"""
+A graphics context which records the calls made to it.
+
+The calls are kept in a `DisplayList`, a compact command buffer which can be
+replayed onto any other graphics context and written to disk.  Drawing code
+can therefore be run once and its output reused, for example to redraw a
+component which has only been moved, or to export a drawing later on in
+another process::
+
+    gc = RecordingGraphicsContext((300, 300))
+    component.draw(gc)
+    gc.display_list.save('drawing.kdl')
+    ...
+    display_list = DisplayList.load('drawing.kdl')
+    display_list.replay(kiva.image.GraphicsContext((300, 300)))
+
+"""
+
+from __future__ import absolute_import, print_function
+
+from array import array
+import copy
+import pickle
+
+import numpy as np
+import six
+
+from .abstract_graphics_context import AbstractGraphicsContext
+from .constants import (TEXT_FILL, TEXT_STROKE, TEXT_FILL_STROKE,
+                        TEXT_INVISIBLE, TEXT_FILL_CLIP, TEXT_STROKE_CLIP,
+                        TEXT_FILL_STROKE_CLIP, TEXT_CLIP, TEXT_OUTLINE)
+from .fonttools import Font
+from .graphics_state import GraphicsState
+import kiva.affine as affine
+
+# The commands which can be recorded, with the number of float arguments of
+# the calls which are stored unboxed.  A call with any other arguments, and
+# any call of a command without a count, is stored with its arguments as
+# objects.
+COMMANDS = (
+    ('save_state', 0),
+    ('restore_state', 0),
+    ('set_stroke_color', None),
+    ('set_line_width', 1),
+    ('set_line_join', None),
+    ('set_line_cap', None),
+    ('set_line_dash', None),
+    ('set_fill_color', None),
+    ('linear_gradient', None),
+    ('radial_gradient', None),
+    ('set_alpha', 1),
+    ('set_antialias', None),
+    ('set_miter_limit', 1),
+    ('set_flatness', 1),
+    ('set_image_interpolation', None),
+    ('translate_ctm', 2),
+    ('rotate_ctm', 1),
+    ('concat_ctm', None),
+    ('scale_ctm', 2),
+    ('set_ctm', None),
+    ('clip_to_rect', 4),
+    ('clip_to_rects', None),
+    ('clip', 0),
+    ('even_odd_clip', 0),
+    ('begin_path', 0),
+    ('close_path', 0),
+    ('add_path', None),
+    ('move_to', 2),
+    ('line_to', 2),
+    ('lines', None),
+    ('line_set', None),
+    ('rect', 4),
+    ('rects', None),
+    ('curve_to', 6),
+    ('quad_curve_to', 4),
+    ('arc', 5),
+    ('arc_to', 5),
+    ('stroke_path', 0),
+    ('fill_path', 0),
+    ('eof_fill_path', 0),
+    ('draw_path', None),
+    ('draw_rect', None),
+    ('draw_image', None),
+    ('set_text_drawing_mode', None),
+    ('set_text_matrix', None),
+    ('set_text_position', 2),
+    ('show_text', None),
+    ('show_text_at_point', None),
+    ('show_texts', None),
+    ('select_font', None),
+    ('set_font', None),
+    ('set_font_size', 1),
+    ('set_character_spacing', 1),
+    ('flush', 0),
+    ('synchronize', 0),
+    ('begin_page', 0),
+    ('end_page', 0),
+    ('clear_rect', None),
+    ('clear', None),
+)
+
+# The commands which a RecordingPath accepts.
+PATH_COMMANDS = (
+    'begin_path', 'close_path', 'add_path', 'move_to', 'line_to', 'lines',
+    'line_set', 'rect', 'rects', 'curve_to', 'quad_curve_to', 'arc',
+    'arc_to', 'translate_ctm', 'rotate_ctm', 'scale_ctm', 'concat_ctm',
+)
+
+_OPCODES = dict((name, opcode) for opcode, (name, _) in enumerate(COMMANDS))
+_FLOAT_COUNTS = [-1 if count is None else count for _, count in COMMANDS]
+
+_TEXT_MODES = (TEXT_FILL, TEXT_STROKE, TEXT_FILL_STROKE, TEXT_INVISIBLE,
+               TEXT_FILL_CLIP, TEXT_STROKE_CLIP, TEXT_FILL_STROKE_CLIP,
+               TEXT_CLIP, TEXT_OUTLINE)
+
+
+def _copy_arg(arg):
+    """ Copy a mutable argument so that the recording cannot change.
+    """
+    if isinstance(arg, np.ndarray):
+        return arg.copy()
+    elif isinstance(arg, list):
+        return copy.deepcopy(arg)
+    elif isinstance(arg, RecordingPath):
+        return arg.snapshot()
+    elif isinstance(arg, Font):
+        return arg.copy()
+    return arg
+
+
+class DisplayList(object):
+    """ A replayable list of graphics context calls.
+
+    Attributes
+    ----------
+
+    opcodes
+        The index in COMMANDS of each call, as an array of bytes.
+    float_counts
+        The number of arguments of each call stored in `floats`, or -1 for
+        a call whose arguments are stored in `objects`.
+    floats
+        The arguments of the calls which take only numbers, such as move_to
+        and translate_ctm, as an array of doubles.
+    objects
+        The (args, kwargs) of the other calls, with their arrays copied.
+
+    """
+
+    def __init__(self):
+        self.opcodes = array('B')
+        self.float_counts = array('b')
+        self.floats = array('d')
+        self.objects = []
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def __getstate__(self):
+        # Store the command names so that lists saved by other versions of
+        # kiva keep their meaning.
+        state = self.__dict__.copy()
+        state['commands'] = [name for name, _ in COMMANDS]
+        return state
+
+    def __setstate__(self, state):
+        try:
+            table = [_OPCODES[name] for name in state.pop('commands')]
+        except KeyError as exc:
+            raise ValueError("Unknown display list command {}".format(exc))
+        self.__dict__.update(state)
+        if table != list(range(len(table))):
+            self.opcodes = array(
+                'B', (table[opcode] for opcode in self.opcodes))
+
+    def record(self, name, args=(), kwargs=None):
+        """ Append a call of the named command to the list.
+        """
+        opcode = _OPCODES[name]
+        count = len(args)
+        if count == _FLOAT_COUNTS[opcode] and not kwargs:
+            floats = self.floats
+            start = len(floats)
+            try:
+                floats.extend(args)
+            except TypeError:
+                del floats[start:]
+            else:
+                self.opcodes.append(opcode)
+                self.float_counts.append(count)
+                return
+        self.opcodes.append(opcode)
+        self.float_counts.append(-1)
+        self.objects.append((
+            tuple(_copy_arg(arg) for arg in args),
+            dict((key, _copy_arg(value))
+                 for key, value in (kwargs or {}).items()),
+        ))
+
+    def copy(self):
+        """ Return an independent copy of the list.
+        """
+        other = DisplayList()
+        other.opcodes = array('B', self.opcodes)
+        other.float_counts = array('b', self.float_counts)
+        other.floats = array('d', self.floats)
+        other.objects = list(self.objects)
+        return other
+
+    def clear(self):
+        """ Remove all of the recorded calls.
+        """
+        self.__init__()
+
+    def replay(self, gc):
+        """ Make the recorded calls on a graphics context or compiled path.
+
+        The calls are made relative to the current state of `gc`, so a list
+        recorded without calls to set_ctm can be drawn anywhere by changing
+        the ctm of `gc` first.  The methods of `gc` are looked up once per
+        replay rather than once per call.
+        """
+        methods = [None] * len(COMMANDS)
+        for opcode in set(self.opcodes):
+            name = COMMANDS[opcode][0]
+            if name == 'add_path':
+                methods[opcode] = _path_adder(gc)
+            else:
+                methods[opcode] = getattr(gc, name)
+
+        floats = self.floats
+        objects = iter(self.objects)
+        position = 0
+        for opcode, count in zip(self.opcodes, self.float_counts):
+            if count < 0:
+                args, kwargs = next(objects)
+                methods[opcode](*args, **kwargs)
+            else:
+                end = position + count
+                methods[opcode](*floats[position:end])
+                position = end
+
+    def save(self, file):
+        """ Write the list to a file name or a binary file object.
+        """
+        if isinstance(file, six.string_types):
+            with open(file, 'wb') as fp:
+                pickle.dump(self, fp, pickle.HIGHEST_PROTOCOL)
+        else:
+            pickle.dump(self, file, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, file):
+        """ Read a list written by `save` from a file name or file object.
+        """
+        if isinstance(file, six.string_types):
+            with open(file, 'rb') as fp:
+                display_list = pickle.load(fp)
+        else:
+            display_list = pickle.load(file)
+        if not isinstance(display_list, cls):
+            raise ValueError("The file does not hold a display list")
+        return display_list
+
+
+def _path_adder(gc):
+    """ Return a function which adds recorded paths to `gc`.
+
+    Each recorded path is compiled into a path of `gc` the first time it is
+    added.  Backends without compiled paths get the path drawn directly.
+    """
+    compiled = {}
+
+    def add_path(display_list):
+        key = id(display_list)
+        path = compiled.get(key)
+        if path is None:
+            path = gc.get_empty_path()
+            if path is None:
+                display_list.replay(gc)
+                return
+            display_list.replay(path)
+            compiled[key] = path
+        gc.add_path(path)
+
+    return add_path
+
+
+def _recorder(name):
+    """ Return a method which records calls of the named command.
+    """
+    def method(self, *args, **kwargs):
+        self._record(name, args, kwargs)
+
+    method.__name__ = name
+    abstract = getattr(AbstractGraphicsContext, name, None)
+    method.__doc__ = getattr(abstract, '__doc__', None)
+    return method
+
+
+def _recorder_class(class_name, names):
+    """ Return a class with a recording method for each named command.
+    """
+    namespace = dict((name, _recorder(name)) for name in names)
+    return type(class_name, (object,), namespace)
+
+
+class RecordingPath(_recorder_class('_PathRecorder', PATH_COMMANDS)):
+    """ A compiled path which records the calls made to build it.
+
+    Recording graphics contexts return these from `get_empty_path`.  When a
+    display list is replayed they are compiled into the paths of the target
+    graphics context.
+    """
+
+    def __init__(self):
+        self.display_list = DisplayList()
+        self._snapshot = None
+
+    def _record(self, name, args, kwargs=None):
+        self._snapshot = None
+        self.display_list.record(name, args, kwargs)
+
+    def snapshot(self):
+        """ Return a copy of the recorded path which will not change.
+
+        The copy is shared until the path is changed again, so a path added
+        many times is compiled only once on replay.
+        """
+        if self._snapshot is None:
+            self._snapshot = self.display_list.copy()
+        return self._snapshot
+
+    def is_empty(self):
+        """ Return whether nothing has been added to the path.
+        """
+        return len(self.display_list) == 0
+
+
+class RecordingGraphicsContext(
+        _recorder_class('_Recorder', [name for name, _ in COMMANDS]),
+        AbstractGraphicsContext):
+    """ A graphics context which records the calls made to it.
+
+    Every call is appended to `display_list`.  The graphics state is also
+    tracked, so that the getters answer as a drawing backend would.
+
+    Parameters
+    ----------
+
+    size : (int, int)
+        The width and height of the drawing.
+    metrics_gc : graphics context, optional
+        The graphics context used to measure text.  A 1x1 Agg image is used
+        by default.
+
+    """
+
+    def __init__(self, size, metrics_gc=None):
+        super(RecordingGraphicsContext, self).__init__()
+        self.size = size
+        self.display_list = DisplayList()
+        self.state = GraphicsState()
+        self.state_stack = []
+        self._metrics_gc = metrics_gc
+
+    def _record(self, name, args=(), kwargs=None):
+        self.display_list.record(name, args, kwargs)
+
+    def width(self):
+        return self.size[0]
+
+    def height(self):
+        return self.size[1]
+
+    def replay(self, gc):
+        """ Make the recorded calls on another graphics context.
+        """
+        self.display_list.replay(gc)
+
+    # ----------------------------------------------------------------
+    # Save/Restore graphics state.
+    # ----------------------------------------------------------------
+
+    def save_state(self):
+        self.state_stack.append(self.state)
+        self.state = self.state.copy()
+        self._record('save_state')
+
+    def restore_state(self):
+        self.state = self.state_stack.pop(-1)
+        self._record('restore_state')
+
+    # -------------------------------------------
+    # Graphics state methods
+    # -------------------------------------------
+
+    def set_stroke_color(self, color):
+        self.state.line_color = _rgba(color)
+        self._record('set_stroke_color', (color,))
+
+    def get_stroke_color(self):
+        return self.state.line_color.copy()
+
+    def set_line_width(self, width):
+        self.state.line_width = width
+        self._record('set_line_width', (width,))
+
+    def set_fill_color(self, color):
+        self.state.fill_color = _rgba(color)
+        self._record('set_fill_color', (color,))
+
+    def get_fill_color(self):
+        return self.state.fill_color.copy()
+
+    def set_alpha(self, alpha):
+        self.state.alpha = alpha
+        self._record('set_alpha', (alpha,))
+
+    def get_alpha(self):
+        return self.state.alpha
+
+    def set_antialias(self, antialias):
+        self.state.antialias = antialias
+        self._record('set_antialias', (antialias,))
+
+    def get_antialias(self):
+        return self.state.antialias
+
+    def set_image_interpolation(self, interpolation):
+        self.state.image_interpolation = interpolation
+        self._record('set_image_interpolation', (interpolation,))
+
+    def get_image_interpolation(self):
+        return getattr(self.state, 'image_interpolation', 'nearest')
+
+    # -------------------------------------------
+    # Transformation matrix methods
+    # -------------------------------------------
+
+    def translate_ctm(self, x, y):
+        self.state.ctm = affine.translate(self.state.ctm, x, y)
+        self._record('translate_ctm', (x, y))
+
+    def rotate_ctm(self, angle):
+        self.state.ctm = affine.rotate(self.state.ctm, angle)
+        self._record('rotate_ctm', (angle,))
+
+    def concat_ctm(self, matrix):
+        self.state.ctm = affine.concat(self.state.ctm, matrix)
+        self._record('concat_ctm', (matrix,))
+
+    def scale_ctm(self, x_scale, y_scale):
+        self.state.ctm = affine.scale(self.state.ctm, x_scale, y_scale)
+        self._record('scale_ctm', (x_scale, y_scale))
+
+    def set_ctm(self, matrix):
+        self.state.ctm = np.array(matrix, dtype=np.float64)
+        self._record('set_ctm', (matrix,))
+
+    def get_ctm(self):
+        return self.state.ctm.copy()
+
+    # -------------------------------------------
+    # Paths
+    # -------------------------------------------
+
+    def get_empty_path(self):
+        return RecordingPath()
+
+    # -------------------------------------------
+    # Text functions
+    # -------------------------------------------
+
+    def set_text_drawing_mode(self, draw_mode):
+        if draw_mode not in _TEXT_MODES:
+            msg = ("Invalid text drawing mode.  See documentation for valid " +
+                   "modes")
+            raise ValueError(msg)
+        self.state.text_drawing_mode = draw_mode
+        self._record('set_text_drawing_mode', (draw_mode,))
+
+    def set_text_matrix(self, text_matrix):
+        self.state.text_matrix = np.array(text_matrix, dtype=np.float64)
+        self._record('set_text_matrix', (text_matrix,))
+
+    def get_text_matrix(self):
+        return self.state.text_matrix.copy()
+
+    def set_text_position(self, x, y):
+        a, b, c, d, tx, ty = affine.affine_params(self.state.text_matrix)
+        self.state.text_matrix = affine.affine_from_values(a, b, c, d, x, y)
+        self._record('set_text_position', (x, y))
+
+    def get_text_position(self):
+        a, b, c, d, tx, ty = affine.affine_params(self.state.text_matrix)
+        return tx, ty
+
+    def get_text_extent(self, text):
+        return self._measure('get_text_extent', text)
+
+    def get_full_text_extent(self, string):
+        return self._measure('get_full_text_extent', string)
+
+    def select_font(self, name, size=12, style="regular", encoding=None):
+        self.state.font = Font(name, size=size)
+        self._record('select_font', (name, size, style, encoding))
+
+    def set_font(self, font):
+        self.state.font = font.copy()
+        self._record('set_font', (font,))
+
+    def get_font(self):
+        return self.state.font.copy()
+
+    def set_font_size(self, size):
+        self.state.font.size = size
+        self._record('set_font_size', (size,))
+
+    def set_character_spacing(self, spacing):
+        self.state.character_spacing = spacing
+        self._record('set_character_spacing', (spacing,))
+
+    def get_character_spacing(self):
+        return self.state.character_spacing
+
+    def _measure(self, method, text):
+        """ Measure text with the current font on the metrics context.
+        """
+        if self._metrics_gc is None:
+            from kiva.image import GraphicsContext
+            self._metrics_gc = GraphicsContext((1, 1))
+        gc = self._metrics_gc
+        gc.set_font(self.state.font)
+        gc.set_character_spacing(self.state.character_spacing)
+        return getattr(gc, method)(text)
+
+    # -------------------------------------------
+    # Misc functions
+    # -------------------------------------------
+
+    def save(self, filename, file_format=None, pil_options=None):
+        """ Render the recording into an Agg image and save it to a file.
+        """
+        from kiva.image import GraphicsContext
+        gc = GraphicsContext(self.size)
+        self.replay(gc)
+        gc.save(filename, file_format=file_format, pil_options=pil_options)
+
+
+def _rgba(color):
+    """ Return an RGBA array for an RGB or RGBA color.
+    """
+    rgba = np.ones(4)
+    rgba[:len(color)] = color
+    return rgba
+
@@ -0,0 +1,189 @@
+"""
+Drop calls which would not change the state of a graphics context.
+
+Drawing code commonly sets the same colors, line width and font again before
+every item it draws.  On most backends each of these calls crosses into C++
+or builds a new pen, brush or font, even when nothing changes.  The
+`StateFilterMixin` keeps the values which have been set, following
+save_state and restore_state, and only passes a setter on to the backend
+when it would change the effective state::
+
+    class GraphicsContext(StateFilterMixin, kiva.image.GraphicsContext):
+        pass
+
+`StateFilter` does the same for an existing graphics context::
+
+    gc = StateFilter(gc)
+
+Both count the dropped calls of each setter in `dropped_calls`.  Setters
+called on the backend directly are not seen by the filter, so all of the
+drawing must go through the filtered graphics context.
+
+"""
+
+from __future__ import absolute_import, print_function
+
+from collections import Counter
+
+import numpy as np
+
+
+def _color_key(color):
+    key = tuple(color)
+    if len(key) == 3:
+        key += (1.0,)
+    return key
+
+
+def _dash_key(lengths, phase=0):
+    if lengths is not None:
+        lengths = tuple(np.ravel(lengths).tolist())
+    return lengths, phase
+
+
+def _font_key(font):
+    return (font.family, font.size, font.weight, font.style, font.underline,
+            font.face_name, font.encoding)
+
+
+def _value_key(value):
+    return value
+
+
+# The setters which are filtered, with functions which return a value that
+# compares equal for calls which set the same state.
+FILTERED_SETTERS = {
+    'set_fill_color': _color_key,
+    'set_stroke_color': _color_key,
+    'set_line_width': _value_key,
+    'set_line_join': _value_key,
+    'set_line_cap': _value_key,
+    'set_line_dash': _dash_key,
+    'set_font': _font_key,
+    'set_alpha': _value_key,
+    'set_antialias': _value_key,
+    'set_miter_limit': _value_key,
+    'set_flatness': _value_key,
+    'set_text_drawing_mode': _value_key,
+    'set_character_spacing': _value_key,
+    'set_image_interpolation': _value_key,
+}
+
+# Other calls which change the state set by one of the filtered setters.
+INVALIDATING_CALLS = {
+    'select_font': 'set_font',
+    'set_font_size': 'set_font',
+    'linear_gradient': 'set_fill_color',
+    'radial_gradient': 'set_fill_color',
+}
+
+
+def _filtered_setter(name, key_func):
+    def method(self, *args, **kwargs):
+        state = self._filter_state
+        try:
+            key = key_func(*args, **kwargs)
+        except TypeError:
+            # Arguments the filter does not understand are passed on, and the
+            # state they set is unknown.
+            state.pop(name, None)
+            return getattr(super(StateFilterMixin, self), name)(*args,
+                                                                **kwargs)
+        if name in state and state[name] == key:
+            self.dropped_calls[name] += 1
+            return
+        result = getattr(super(StateFilterMixin, self), name)(*args, **kwargs)
+        state[name] = key
+        return result
+
+    method.__name__ = name
+    return method
+
+
+def _invalidating_call(name, setter):
+    def method(self, *args, **kwargs):
+        self._filter_state.pop(setter, None)
+        return getattr(super(StateFilterMixin, self), name)(*args, **kwargs)
+
+    method.__name__ = name
+    return method
+
+
+class StateFilterMixin(object):
+    """ A mixin for graphics contexts which drops redundant setter calls.
+
+    Attributes
+    ----------
+
+    dropped_calls
+        A Counter of the dropped calls of each setter.
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(StateFilterMixin, self).__init__(*args, **kwargs)
+        self._filter_state = {}
+        self._filter_stack = []
+        self.dropped_calls = Counter()
+
+    def save_state(self):
+        self._filter_stack.append(self._filter_state)
+        self._filter_state = self._filter_state.copy()
+        return super(StateFilterMixin, self).save_state()
+
+    def restore_state(self):
+        if self._filter_stack:
+            self._filter_state = self._filter_stack.pop()
+        else:
+            self._filter_state = {}
+        return super(StateFilterMixin, self).restore_state()
+
+
+for _name, _key_func in FILTERED_SETTERS.items():
+    setattr(StateFilterMixin, _name, _filtered_setter(_name, _key_func))
+for _name, _setter in INVALIDATING_CALLS.items():
+    setattr(StateFilterMixin, _name, _invalidating_call(_name, _setter))
+
+
+def _forwarder(name):
+    def method(self, *args, **kwargs):
+        return getattr(self.gc, name)(*args, **kwargs)
+
+    method.__name__ = name
+    return method
+
+
+class _GraphicsContextProxy(object):
+    """ Forwards all attribute lookups to a graphics context.
+    """
+
+    def __init__(self, gc):
+        self.gc = gc
+
+    def __getattr__(self, name):
+        return getattr(self.gc, name)
+
+    def __enter__(self):
+        self.save_state()
+
+    def __exit__(self, type, value, traceback):
+        self.restore_state()
+
+
+for _name in (list(FILTERED_SETTERS) + list(INVALIDATING_CALLS) +
+              ['save_state', 'restore_state']):
+    setattr(_GraphicsContextProxy, _name, _forwarder(_name))
+del _name, _key_func, _setter
+
+
+class StateFilter(StateFilterMixin, _GraphicsContextProxy):
+    """ Wraps a graphics context and drops redundant setter calls.
+
+    Parameters
+    ----------
+
+    gc : graphics context
+        The graphics context which is drawn to.  It should be in its default
+        state, or only be used through the filter from now on.
+
+    """
@@ -62,6 +62,19 @@ def _strpoints(points):
         c.write('%3.2f,%3.2f ' % (x,y))
     return c.getvalue()
 
+def _strpath(subpaths):
+    """ Formats (points, closed) subpaths as the data of a path element. """
+    c = six.StringIO()
+    for points, closed in subpaths:
+        if closed:
+            points = points[:-1]
+        c.write('M%3.2f,%3.2f ' % tuple(points[0]))
+        for x,y in points[1:]:
+            c.write('L%3.2f,%3.2f ' % (x,y))
+        if closed:
+            c.write('Z ')
+    return c.getvalue()
+
 def _mkstyle(kw):
     return '; '.join([str(k) + ':' + str(v) for k,v in kw.items()])
 
@@ -285,6 +298,22 @@ class GraphicsContext(basecore2d.GraphicsContextBase):
 
     def device_fill_points(self, points, mode):
         points = self._fixpoints(points)
+        if mode == STROKE:
+            self._emit_shape('polyline', mode, points=_strpoints(points))
+        else:
+            self._emit_shape('polygon', mode, points=_strpoints(points))
+
+    def device_draw_subpaths(self, subpaths, mode):
+        # Several subpaths are written as one compound path, which is
+        # smaller and fills them together, as a single path should be.
+        if len(subpaths) == 1:
+            super(GraphicsContext, self).device_draw_subpaths(subpaths, mode)
+            return
+        subpaths = [(self._fixpoints(points), closed)
+                    for points, closed in subpaths]
+        self._emit_shape('path', mode, d=_strpath(subpaths))
+
+    def _emit_shape(self, name, mode, **geometry):
         if mode in (FILL, FILL_STROKE, EOF_FILL_STROKE):
             fill = self._color(self.state.fill_color)
         else:
@@ -310,9 +339,8 @@ class GraphicsContext(basecore2d.GraphicsContextBase):
         transform = 'matrix(%(a)f,%(b)f,%(c)f,%(d)f,%(tx)f,%(ty)f)' % locals()
         if mode == STROKE:
             opacity = '%1.3f' % self.state.line_color[-1]
-            self._emit('polyline',
+            self._emit(name,
                         transform=transform,
-                        points=_strpoints(points),
                         kw=default_filter({'clip-path': (clip, None)}),
                         style=_mkstyle(default_filter({'opacity': (opacity, "1.000"),
                                         'stroke': stroke,
@@ -320,13 +348,13 @@ class GraphicsContext(basecore2d.GraphicsContextBase):
                                         'stroke-width': (width, "1.000"),
                                         'stroke-linejoin': (linejoin, 'miter'),
                                         'stroke-linecap': (linecap, 'butt'),
-                                        'stroke-dasharray': (dasharray, 'none')})))
+                                        'stroke-dasharray': (dasharray, 'none')})),
+                        **geometry)
 
         else:
             opacity = '%1.3f' % self.state.fill_color[-1]
-            self._emit('polygon',
+            self._emit(name,
                         transform=transform,
-                        points=_strpoints(points),
                         kw=default_filter({'clip-path': (clip, None)}),
                         style=_mkstyle(default_filter({'opacity': (opacity, "1.000"),
                                         'stroke-width': (width, "1.000"),
@@ -335,7 +363,8 @@ class GraphicsContext(basecore2d.GraphicsContextBase):
                                         'stroke': stroke,
                                         'stroke-linejoin': (linejoin, 'miter'),
                                         'stroke-linecap': (linecap, 'butt'),
-                                        'stroke-dasharray': (dasharray, 'none')})))
+                                        'stroke-dasharray': (dasharray, 'none')})),
+                        **geometry)
 
     def device_stroke_points(self, points, mode):
         # handled by device_fill_points
@@ -12,9 +12,9 @@ from __future__ import with_statement
 
 import unittest
 
-from numpy import alltrue, array, ravel
+from numpy import allclose, alltrue, array, pi, ravel, sqrt
 
-from kiva import affine
+from kiva import abstract_graphics_context, affine
 from kiva import basecore2d
 from kiva import constants
 
@@ -90,6 +90,62 @@ class LineStateTestCase(unittest.TestCase):
     #    assert(not basecore2d.line_state_equal(ls1,ls2))
 
 
+class TextRecorder(basecore2d.GraphicsContextBase):
+    """ Records the text drawn, and measures every character as 10x10. """
+
+    def __init__(self, *args, **kwargs):
+        super(TextRecorder, self).__init__(*args, **kwargs)
+        self.shown = []
+
+    def device_show_text(self, text):
+        self.shown.append((text, tuple(self.get_text_position())))
+
+    def device_get_full_text_extent(self, text):
+        return (10.0 * len(text), 10.0, 2.0, 0.0)
+
+
+class PointsRecorder(basecore2d.GraphicsContextBase):
+    """ Records the points of the subpaths which are drawn. """
+
+    def __init__(self, *args, **kwargs):
+        super(PointsRecorder, self).__init__(*args, **kwargs)
+        self.drawn = []
+        self.groups = []
+
+    def device_update_line_state(self):
+        pass
+
+    def device_update_fill_state(self):
+        pass
+
+    def device_fill_points(self, points, mode):
+        self.drawn.append(points.tolist())
+
+    def device_draw_subpaths(self, subpaths, mode):
+        self.groups.append([closed for points, closed in subpaths])
+        super(PointsRecorder, self).device_draw_subpaths(subpaths, mode)
+
+    def device_stroke_points(self, points, mode):
+        pass
+
+
+class AtPointsRecorder(PointsRecorder,
+                       abstract_graphics_context.EnhancedAbstractGraphicsContext):
+    """ Records where each filled or stroked subpath is drawn, and with which
+    colors, using the default draw_marker_at_points() and
+    draw_path_at_points().
+    """
+
+    def device_fill_points(self, points, mode):
+        x, y = self.get_ctm()[2, :2]
+        self.drawn.append((mode, (x, y), tuple(self.state.fill_color),
+                           tuple(self.state.line_state.line_color),
+                           points.max(axis=0).tolist()))
+
+    def show_text_translate(self, text, dx, dy):
+        pass
+
+
 class GraphicsContextTestCase(unittest.TestCase):
 
     def test_create_gc(self):
@@ -311,6 +367,180 @@ class GraphicsContextTestCase(unittest.TestCase):
         # try an unacceptable value.
         self.assertRaises(ValueError, gc.set_text_drawing_mode, (10,))
 
+    def test_state_copy_on_write(self):
+        gc = basecore2d.GraphicsContextBase()
+        gc.set_fill_color((1, 0, 0, 1))
+        gc.set_font_size(10)
+        gc.save_state()
+        # Values changed in place, or replaced, after a save don't affect
+        # the saved state, or any other copy of it.
+        copy = gc.state.copy()
+        gc.state.fill_color[0] = 0
+        gc.state.font.size = 20
+        gc.state.ctm = gc.state.ctm * 2
+        gc.state.line_color[3] = 0.5
+        self.assertEqual(tuple(copy.fill_color), (1, 0, 0, 1))
+        self.assertEqual(copy.font.size, 10)
+        self.assertTrue(copy.line_state is copy)
+        gc.restore_state()
+        self.assertEqual(tuple(gc.state.fill_color), (1, 0, 0, 1))
+        self.assertEqual(gc.state.font.size, 10)
+        self.assertEqual(gc.state.ctm[0, 0], 1)
+        self.assertEqual(gc.state.line_color[3], 1)
+
+    def test_lines_break_on_nan(self):
+        gc = basecore2d.GraphicsContextBase()
+        nan = float('nan')
+        gc.lines(array([[0, 0], [1, 1], [nan, 2], [3, 3], [4, 4], [nan, nan]]),
+                 break_on_nan=True)
+        self.assertEqual(gc.path_vertices.array.tolist(),
+                         [[0, 0], [1, 1], [3, 3], [4, 4]])
+        self.assertEqual(gc.path_codes.array.tolist(),
+                         [constants.POINT, constants.LINE] * 2)
+        self.assertEqual(tuple(gc.state.current_point), (4, 4))
+
+    def test_rects(self):
+        # rects() adds the same subpaths as calling rect() for each row.
+        rects = array([[0, 0, 1, 2], [5, 5, 3, 3], [-1, 2, 4, 1]])
+        expected = basecore2d.GraphicsContextBase()
+        for rect in rects:
+            expected.rect(*rect)
+        gc = basecore2d.GraphicsContextBase()
+        gc.rects(rects)
+        self.assertEqual(gc.path_vertices.array.tolist(),
+                         expected.path_vertices.array.tolist())
+        self.assertEqual(gc.path_codes.array.tolist(),
+                         expected.path_codes.array.tolist())
+        self.assertEqual(tuple(gc.state.current_point),
+                         tuple(expected.state.current_point))
+
+    def test_draw_path_groups_subpaths(self):
+        # Subpaths are passed to the device together, unless the ctm
+        # changes between them.
+        gc = PointsRecorder()
+        gc.rects(array([[0, 0, 1, 1], [2, 2, 1, 1]]))
+        gc.translate_ctm(5, 5)
+        gc.line_set(array([[0, 0], [0, 1]]), array([[1, 0], [1, 1]]))
+        gc.draw_path(constants.STROKE)
+        self.assertEqual(gc.groups, [[True, True], [False, False]])
+
+    def test_arc_flattening(self):
+        # Arcs are split into as many lines as their size in device space
+        # needs, which depends on the radius, the ctm and the flatness.
+        def arc_points(radius, scale=1.0, flatness=1.0):
+            gc = basecore2d.GraphicsContextBase()
+            gc.scale_ctm(scale, scale)
+            gc.set_flatness(flatness)
+            gc.arc(0, 0, radius, 0, 2 * pi)
+            return gc.path_vertices.array
+
+        small = arc_points(2.0)
+        large = arc_points(200.0)
+        self.assertLess(len(small), len(large))
+        self.assertEqual(len(arc_points(20.0, scale=10.0)), len(large))
+        self.assertLess(len(arc_points(200.0, flatness=10.0)), len(large))
+
+        # The middle of each line is within the tolerance of the arc.
+        for pts, radius in ((small, 2.0), (large, 200.0)):
+            middles = (pts[1:] + pts[:-1]) / 2
+            distances = radius - sqrt((middles ** 2).sum(axis=1))
+            self.assertLessEqual(distances.max(),
+                                 basecore2d.CURVE_TOLERANCE + 1e-9)
+            self.assertTrue(allclose(pts[0], pts[-1]))
+
+    def test_curves_continue_subpath(self):
+        gc = basecore2d.GraphicsContextBase()
+        gc.move_to(0, 0)
+        gc.curve_to(0, 10, 10, 10, 10, 0)
+        gc.arc(20, 0, 5, pi, 0, cw=True)
+        codes = gc.path_codes.array
+        self.assertEqual(codes[0], constants.POINT)
+        self.assertTrue(alltrue(codes[1:] == constants.LINE))
+        self.assertEqual(tuple(gc.path_vertices.array[-1]), (25, 0))
+
+    def test_draw_path_subpaths(self):
+        gc = PointsRecorder()
+        gc.move_to(0, 0)
+        gc.line_to(1, 0)
+        gc.line_to(1, 1)
+        gc.close_path()
+        gc.line_to(5, 5)
+        gc.line_to(6, 6)
+        gc.lines(array([[2, 2], [3, 3], [4, 4]]))
+        gc.move_to(9, 9)
+        gc.draw_path(constants.STROKE)
+        self.assertEqual(gc.drawn, [[[0, 0], [1, 0], [1, 1], [0, 0]],
+                                    [[5, 5], [6, 6]],
+                                    [[2, 2], [3, 3], [4, 4]]])
+        self.assertTrue(gc.is_path_empty())
+
+    def test_draw_marker_at_points(self):
+        gc = AtPointsRecorder()
+        red, blue = (1.0, 0.0, 0.0, 1.0), (0.0, 0.0, 1.0, 1.0)
+        black = (0.0, 0.0, 0.0, 1.0)
+        gc.set_fill_color(black)
+        self.assertTrue(gc.draw_marker_at_points(
+            [[10, 10], [20, 20], [30, 30]], 1, constants.SQUARE_MARKER,
+            colors=[red, blue, red], sizes=[1, 2, 1]))
+
+        # The points are drawn one color and size at a time.
+        fill_stroke = constants.FILL_STROKE
+        self.assertEqual(gc.drawn, [
+            (fill_stroke, (10, 10), red, black, [1, 1]),
+            (fill_stroke, (30, 30), red, black, [1, 1]),
+            (fill_stroke, (20, 20), blue, black, [2, 2]),
+        ])
+        self.assertEqual(tuple(gc.state.fill_color), black)
+        self.assertEqual(tuple(gc.get_ctm()[2, :2]), (0, 0))
+
+        # Markers which are only stroked get the color as the stroke color.
+        gc = AtPointsRecorder()
+        gc.draw_marker_at_points([[5, 5]], 3, constants.CROSS_MARKER,
+                                 colors=[red])
+        self.assertEqual([(mode, color) for mode, xy, fill, color, top
+                          in gc.drawn], [(constants.STROKE, red)] * 2)
+
+        self.assertFalse(gc.draw_marker_at_points(
+            [[5, 5]], 3, constants.NO_MARKER))
+
+    def test_draw_path_at_points(self):
+        from kiva.agg import CompiledPath
+
+        path = CompiledPath()
+        path.rect(0, 0, 2, 3)
+        gc = AtPointsRecorder()
+        red, green = (1.0, 0.0, 0.0, 1.0), (0.0, 1.0, 0.0, 0.5)
+        gc.draw_path_at_points([[1, 1], [2, 2], [3, 3]], path,
+                               constants.STROKE, colors=[red, green, red])
+        # Stroked paths are drawn with a transparent fill.
+        fill = (0.0, 0.0, 0.0, 0.0)
+        self.assertEqual(gc.drawn, [
+            (constants.STROKE, (1, 1), fill, red, [2, 3]),
+            (constants.STROKE, (3, 3), fill, red, [2, 3]),
+            (constants.STROKE, (2, 2), fill, green, [2, 3]),
+        ])
+
+        gc = AtPointsRecorder()
+        gc.draw_path_at_points([[1, 1], [2, 2]], path, constants.FILL)
+        self.assertEqual([xy for mode, xy, fill, stroke, top in gc.drawn],
+                         [(1, 1), (2, 2)])
+
+    def test_show_texts(self):
+        gc = TextRecorder()
+        gc.set_text_position(1, 2)
+        gc.show_texts(["a", "bb", "ccc"], [[0, 0], [10, 10], [20, 20]],
+                      anchors=[0.5, 1.0])
+        self.assertEqual(gc.shown, [("a", (-5, -10)), ("bb", (0, 0)),
+                                    ("ccc", (5, 10))])
+        self.assertEqual(tuple(gc.get_text_position()), (1, 2))
+        self.assertRaises(ValueError, gc.show_texts, ["a"], [[0, 0], [1, 1]])
+
+    def test_get_text_extents(self):
+        gc = TextRecorder()
+        extents = gc.get_text_extents(["a", "bb"])
+        self.assertEqual(extents.tolist(), [[10, 10, 2, 0], [20, 10, 2, 0]])
+        self.assertEqual(gc.get_text_extents([]).shape, (0, 4))
+
     #-------------------------------------------------------------------------
     # Use context manager for saving and restoring state.
     #-------------------------------------------------------------------------
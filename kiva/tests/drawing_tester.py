@@ -51,6 +51,19 @@ class DrawingTester(object):
             self.gc.rect(0, 0, 200, 200)
             self.gc.stroke_path()
 
+    def test_rects(self):
+        with self.draw_and_check():
+            self.gc.begin_path()
+            self.gc.rects(numpy.array([[50, 50, 40, 100], [150, 50, 40, 150]]))
+            self.gc.fill_path()
+
+    def test_line_set(self):
+        with self.draw_and_check():
+            self.gc.begin_path()
+            starts = numpy.array([[50, 50], [50, 150], [50, 250]])
+            self.gc.line_set(starts, starts + [200, 0])
+            self.gc.stroke_path()
+
     def test_circle(self):
         with self.draw_and_check():
             self.gc.begin_path()
@@ -159,6 +172,34 @@ class DrawingImageTester(DrawingTester):
         self.gc.save(filename)
         self.assertImageSavedWithContent(filename)
 
+    def test_text_extents(self):
+        font = Font(family=MODERN)
+        font.size = 24
+        self.gc.set_font(font)
+        texts = ["", "hello kiva", "j"]
+        extents = self.gc.get_text_extents(texts)
+        desired = [self.gc.get_text_extent(text) for text in texts]
+        numpy.testing.assert_array_equal(extents, desired)
+
+    def test_transparent_agg_image(self):
+        from kiva.agg import GraphicsContextArray
+
+        image = GraphicsContextArray((20, 20))
+        image.clear((0.0, 0.0, 0.0, 0.0))
+        image.set_fill_color((1.0, 0.0, 0.0))
+        image.rect(5, 5, 10, 10)
+        image.fill_path()
+
+        self.gc.draw_image(image, (100, 100, 20, 20))
+        filename = "{0}.png".format(self.filename)
+        self.gc.save(filename)
+        pixels = numpy.array(Image.open(filename))[..., :3]
+
+        # The transparent corners of the image leave the white background
+        # visible, and only its middle is red.
+        numpy.testing.assert_array_equal(pixels[198, 102], [255, 255, 255])
+        numpy.testing.assert_array_equal(pixels[190, 110], [255, 0, 0])
+
     def assertImageSavedWithContent(self, filename):
         """ Load the image and check that there is some content in it.
 
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+
+import numpy
+
+from kiva.batch import RenderJob, render_many
+from kiva.recording import RecordingGraphicsContext
+from traits.testing.unittest_tools import unittest
+
+
+def draw_red_square(gc):
+    gc.set_fill_color((1.0, 0.0, 0.0))
+    gc.rect(0, 0, 10, 10)
+    gc.fill_path()
+
+
+class TestRenderMany(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def create_jobs(self):
+        recorder = RecordingGraphicsContext((20, 10))
+        draw_red_square(recorder)
+        filename = os.path.join(self.directory, 'square.png')
+        return [
+            RenderJob(recorder.display_list, (20, 10)),
+            RenderJob(draw_red_square, (20, 10)),
+            RenderJob(recorder.display_list, (20, 10), filename),
+        ]
+
+    def check_results(self, results):
+        self.assertEqual([result.index for result in results], [0, 1, 2])
+        for result in results[:2]:
+            self.assertEqual(result.image.shape, (10, 20, 4))
+            red = numpy.all(result.image == [255, 0, 0, 255], axis=-1)
+            self.assertEqual(red.sum(), 100)
+            self.assertTrue(red[:, :10].all())
+            result.release()
+        self.assertIsNone(results[2].image)
+        self.assertTrue(os.path.exists(results[2].filename))
+
+    def test_in_process(self):
+        progress = []
+        results = render_many(
+            self.create_jobs(), processes=0,
+            progress=lambda done, total, result: progress.append(done))
+        self.check_results(results)
+        self.assertEqual(progress, [1, 2, 3])
+
+    def test_process_pool(self):
+        self.check_results(render_many(self.create_jobs(), processes=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
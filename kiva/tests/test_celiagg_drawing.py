@@ -0,0 +1,215 @@
+import warnings
+
+import numpy as np
+
+from traits.testing.unittest_tools import unittest
+
+try:
+    import celiagg  # noqa
+except ImportError:
+    CELIAGG_NOT_AVAILABLE = True
+else:
+    CELIAGG_NOT_AVAILABLE = False
+
+from kiva import constants
+
+
+def star(path):
+    # A self-intersecting path, so that even-odd fills have holes.
+    path.move_to(0, 4)
+    path.line_to(3, -3)
+    path.line_to(-4, 1.5)
+    path.line_to(4, 1.5)
+    path.line_to(-3, -3)
+    path.close_path()
+
+
+def draw_separately(gc, points, build, mode):
+    """ Draw the path made by build at each point in turn, filling all of
+    them before stroking any, as draw_path_at_points does.
+    """
+    layers = {
+        constants.FILL_STROKE: (constants.FILL, constants.STROKE),
+        constants.EOF_FILL_STROKE: (constants.EOF_FILL, constants.STROKE),
+    }.get(mode, (mode,))
+    for layer in layers:
+        for x, y in points:
+            with gc:
+                gc.translate_ctm(x, y)
+                gc.begin_path()
+                build(gc)
+                gc.draw_path(layer)
+
+
+@unittest.skipIf(CELIAGG_NOT_AVAILABLE, "Cannot import celiagg")
+class TestCeliaggPathsAtPoints(unittest.TestCase):
+
+    modes = (constants.FILL, constants.EOF_FILL, constants.STROKE,
+             constants.FILL_STROKE, constants.EOF_FILL_STROKE)
+
+    def setUp(self):
+        # Many overlapping points, some of them off the canvas.
+        self.points = np.random.RandomState(1).uniform(-5, 65, (60, 2))
+
+    def draw(self, draw, alpha=1.0):
+        from kiva.celiagg import GraphicsContext
+
+        gc = GraphicsContext((60, 60))
+        gc.clear((1.0, 1.0, 1.0, 1.0))
+        gc.set_fill_color((1.0, 0.0, 0.0, alpha))
+        gc.set_stroke_color((0.0, 0.0, 1.0, alpha))
+        gc.set_line_width(1.5)
+        draw(gc)
+        return gc.gc.array.astype(int)
+
+    def path(self, build):
+        from kiva.celiagg import CompiledPath
+
+        path = CompiledPath()
+        build(path)
+        return path
+
+    def assertImagesClose(self, image, desired, tolerance):
+        self.assertEqual(image.shape, desired.shape)
+        self.assertLessEqual(np.abs(image - desired).max(), tolerance)
+
+    def test_batched_paths(self):
+        path = self.path(star)
+        for alpha in (1.0, 0.5):
+            for mode in self.modes:
+                batched = self.draw(lambda gc: gc.draw_path_at_points(
+                    self.points, path, mode), alpha)
+                separate = self.draw(lambda gc: draw_separately(
+                    gc, self.points, star, mode), alpha)
+                self.assertImagesClose(batched, separate, 2)
+
+    def test_stamped_paths(self):
+        # Stamps are placed at whole pixels, so use points which are.
+        points = np.rint(self.points)
+        path = self.path(star)
+        for alpha in (1.0, 0.5):
+            for mode in self.modes:
+                stamped = self.draw(lambda gc: gc.draw_path_at_points(
+                    points, path, mode, stamp_tolerance=0.5), alpha)
+                separate = self.draw(lambda gc: draw_separately(
+                    gc, points, star, mode), alpha)
+                self.assertImagesClose(stamped, separate, 2)
+
+    def test_stamped_markers(self):
+        from kiva._marker_stamps import marker_shapes
+
+        points = np.rint(self.points)
+        for marker, (shape, mode) in sorted(marker_shapes.items()):
+            for alpha in (1.0, 0.5):
+                stamped = self.draw(lambda gc: gc.draw_marker_at_points(
+                    points, 3, marker), alpha)
+                separate = self.draw(lambda gc: draw_separately(
+                    gc, points, lambda path: shape(path, 3), mode), alpha)
+                self.assertImagesClose(stamped, separate, 2)
+
+    def test_exact_markers(self):
+        from kiva._marker_stamps import marker_shapes
+
+        for marker, (shape, mode) in sorted(marker_shapes.items()):
+            drawn = self.draw(lambda gc: gc.draw_marker_at_points(
+                self.points, 3, marker, stamp_tolerance=0.0), 0.5)
+            separate = self.draw(lambda gc: draw_separately(
+                gc, self.points, lambda path: shape(path, 3), mode), 0.5)
+            self.assertImagesClose(drawn, separate, 1)
+
+    def test_huge_markers(self):
+        from kiva._marker_stamps import marker_shapes
+        from kiva.celiagg import GraphicsContext, _marker_path
+
+        # Markers too large to find a box for are drawn one at a time.
+        shape = marker_shapes[constants.CIRCLE_MARKER][0]
+        path = _marker_path(constants.CIRCLE_MARKER, 500)
+        gc = GraphicsContext((60, 60))
+        layers = gc._marker_layers(constants.FILL_STROKE)
+        self.assertIsNone(gc._marker_box(path, layers))
+
+        points = self.points[:3]
+        for tolerance in (0.0, 0.5):
+            drawn = self.draw(lambda gc: gc.draw_marker_at_points(
+                points, 500, constants.CIRCLE_MARKER,
+                stamp_tolerance=tolerance), 0.5)
+            separate = self.draw(lambda gc: draw_separately(
+                gc, points, lambda path: shape(path, 500),
+                constants.FILL_STROKE), 0.5)
+            self.assertImagesClose(drawn, separate, 1)
+
+
+@unittest.skipIf(CELIAGG_NOT_AVAILABLE, "Cannot import celiagg")
+class TestCeliaggDrawImage(unittest.TestCase):
+
+    def draw(self, image, size=(5, 4)):
+        from kiva.celiagg import GraphicsContext
+
+        gc = GraphicsContext(size)
+        gc.clear((1.0, 1.0, 1.0, 1.0))
+        gc.draw_image(image, (0, 0) + size)
+        return gc.gc.array.copy()
+
+    def image(self, channels=4):
+        image = np.zeros((4, 5, channels), dtype=np.uint8)
+        image[..., 0] = 255
+        image[:2, :, 1] = 128
+        if channels == 4:
+            image[..., 3] = 255
+        return image
+
+    def test_contiguous_array_is_not_copied(self):
+        from kiva.celiagg import _image_array
+
+        image = self.image()
+        self.assertIs(_image_array(image), image)
+        drawn = self.draw(image)
+        self.assertEqual(drawn[3, 0].tolist(), [255, 0, 0, 255])
+        self.assertEqual(drawn[0, 0].tolist(), [255, 128, 0, 255])
+
+    def test_read_only_array(self):
+        from kiva.celiagg import _image_array
+
+        image = self.image()
+        expected = self.draw(image)
+        image.flags.writeable = False
+        array = _image_array(image)
+        self.assertTrue(array.flags.writeable)
+        self.assertFalse(np.shares_memory(array, image))
+        np.testing.assert_array_equal(self.draw(image), expected)
+
+    def test_non_contiguous_array(self):
+        wide = np.repeat(self.image(3), 2, axis=1)
+        image = wide[:, ::2]
+        self.assertFalse(image.flags.c_contiguous)
+        np.testing.assert_array_equal(
+            self.draw(image), self.draw(np.ascontiguousarray(image)))
+
+    def test_agg_images(self):
+        try:
+            from kiva import agg
+        except ImportError:
+            raise unittest.SkipTest("Cannot import the Agg backend")
+
+        for pix_format in ("bgra32", "rgba32", "argb32"):
+            image = agg.GraphicsContextArray((5, 4), pix_format=pix_format)
+            image.clear((1.0, 0.0, 0.0, 1.0))
+            image.set_fill_color((0.0, 0.0, 1.0, 1.0))
+            image.rect(0, 0, 2, 4)
+            image.fill_path()
+            drawn = self.draw(image)
+            self.assertEqual(drawn[0, 0].tolist(), [0, 0, 255, 255])
+            self.assertEqual(drawn[0, 4].tolist(), [255, 0, 0, 255])
+
+    def test_unsupported_shape(self):
+        image = np.zeros((4, 5, 2), dtype=np.uint8)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            drawn = self.draw(image)
+        self.assertEqual(len(caught), 1)
+        self.assertIn("shape (4, 5, 2)", str(caught[0].message))
+        self.assertTrue((drawn == 255).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,7 @@
+import binascii
 import contextlib
 
+from kiva.agg import GraphicsContextArray
 from kiva.tests.drawing_tester import DrawingTester
 from kiva.ps import PSGC
 from traits.testing.unittest_tools import unittest
@@ -28,6 +30,31 @@ class TestPSDrawing(DrawingTester, unittest.TestCase):
                 '(hello kiva) show\n' in lines)):
             self.fail('Path was not closed')
 
+    def test_transparent_agg_image(self):
+        image = GraphicsContextArray((4, 4))
+        image.clear((0.0, 0.0, 0.0, 0.0))
+        image.set_fill_color((1.0, 0.0, 0.0))
+        image.rect(1, 1, 2, 2)
+        image.fill_path()
+
+        self.gc.draw_image(image, (100, 100, 4, 4))
+        filename = "{0}.eps".format(self.filename)
+        self.gc.save(filename)
+        with open(filename, 'r') as handle:
+            lines = handle.read().splitlines()
+
+        # The hex pixel data follows the colorimage operator.
+        start = lines.index('false 3 colorimage') + 1
+        end = start
+        while not lines[end].startswith('%'):
+            end += 1
+        pixels = bytearray(binascii.unhexlify(''.join(lines[start:end])))
+
+        # PostScript images have no alpha, so the transparent pixels are
+        # flattened onto white.
+        self.assertEqual(pixels[:3], bytearray([255, 255, 255]))
+        self.assertEqual(pixels[15:18], bytearray([255, 0, 0]))
+
 
 if __name__ == "__main__":
     unittest.main()
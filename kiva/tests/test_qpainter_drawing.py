@@ -5,6 +5,10 @@ except ImportError:
 else:
     QT_NOT_AVAILABLE = False
 
+import gc
+
+import numpy as np
+
 from kiva.tests.drawing_tester import DrawingImageTester
 from traits.testing.unittest_tools import unittest
 
@@ -26,5 +30,241 @@ class TestQPainterDrawing(DrawingImageTester, unittest.TestCase):
         return GraphicsContext((width, height))
 
 
+@unittest.skipIf(QT_NOT_AVAILABLE, "Cannot import qt")
+class TestQPainterImageCache(unittest.TestCase):
+
+    def setUp(self):
+        from kiva.qpainter import image_cache
+
+        application = QtGui.QApplication.instance()
+        if application is None:
+            self.application = QtGui.QApplication([])
+        else:
+            self.application = application
+
+        self.image_cache = image_cache
+        self.max_bytes = image_cache.max_bytes
+        image_cache.clear()
+
+    def tearDown(self):
+        self.image_cache.max_bytes = self.max_bytes
+        self.image_cache.clear()
+
+    def draw(self, image, version=None):
+        from kiva.qpainter import GraphicsContext
+
+        height, width = image.shape[:2]
+        gc = GraphicsContext((width, height))
+        gc.draw_image(image, (0, 0, width, height), version=version)
+        gc.gc.end()
+        return gc.qt_dc.toImage()
+
+    def test_changed_image_is_redrawn(self):
+        image = np.zeros((5, 7, 4), dtype=np.uint8)
+        image[..., 3] = 255
+        image[..., 0] = 255
+        first = self.draw(image).pixel(3, 2)
+        self.assertEqual(len(self.image_cache._entries), 1)
+        self.assertEqual(self.draw(image).pixel(3, 2), first)
+
+        image[..., 0] = 0
+        image[..., 1] = 255
+        self.assertNotEqual(self.draw(image).pixel(3, 2), first)
+        self.assertEqual(len(self.image_cache._entries), 1)
+
+    def test_versioned_image(self):
+        image = np.zeros((5, 7, 4), dtype=np.uint8)
+        image[..., 3] = 255
+        image[..., 0] = 255
+        first = self.draw(image, version=1).pixel(3, 2)
+        # No copy of the pixels is kept for a versioned image.
+        (pixmap, width, height), = [
+            item[-2] for item in self.image_cache._entries.values()]
+        self.assertEqual(self.image_cache.nbytes,
+                         pixmap.width() * pixmap.height() * 4)
+
+        # The pixmap is reused until the version changes.
+        image[..., 0] = 0
+        image[..., 1] = 255
+        self.assertEqual(self.draw(image, version=1).pixel(3, 2), first)
+        self.assertNotEqual(self.draw(image, version=2).pixel(3, 2), first)
+        self.assertEqual(len(self.image_cache._entries), 1)
+
+    def test_padded_image_rows(self):
+        image = np.zeros((3, 5, 4), dtype=np.uint8)
+        image[..., 3] = 255
+        image[0, :, 0] = 255
+        drawn = self.draw(image)
+        self.assertNotEqual(drawn.pixel(2, 0), drawn.pixel(2, 2))
+        self.assertEqual(drawn.pixel(2, 1), drawn.pixel(2, 2))
+
+    def test_entries_die_with_images(self):
+        image = np.zeros((5, 7, 4), dtype=np.uint8)
+        self.draw(image)
+        self.assertGreater(self.image_cache.nbytes, 0)
+        del image
+        gc.collect()
+        self.assertEqual(len(self.image_cache._entries), 0)
+        self.assertEqual(self.image_cache.nbytes, 0)
+
+    def test_budget(self):
+        images = [np.zeros((20, 20, 4), dtype=np.uint8) for i in range(3)]
+        self.image_cache.max_bytes = 2 * (20 * 20 * 4 * 2)
+        for image in images:
+            self.draw(image)
+        self.assertEqual(len(self.image_cache._entries), 2)
+        self.assertLessEqual(self.image_cache.nbytes,
+                             self.image_cache.max_bytes)
+        self.assertNotIn(id(images[0]), self.image_cache._entries)
+
+
+@unittest.skipIf(QT_NOT_AVAILABLE, "Cannot import qt")
+class TestQPainterBulkDrawing(unittest.TestCase):
+
+    def setUp(self):
+        application = QtGui.QApplication.instance()
+        if application is None:
+            self.application = QtGui.QApplication([])
+        else:
+            self.application = application
+
+    def elements(self, path):
+        elements = [path.elementAt(i) for i in range(path.elementCount())]
+        return [(int(e.type), e.x, e.y) for e in elements]
+
+    def test_lines(self):
+        from kiva.qpainter import CompiledPath
+
+        points = np.array([[0, 0], [1, 2], [np.nan, 3], [4, 5], [6, 7]])
+        path = CompiledPath()
+        path.move_to(9, 9)
+        path.lines(points, break_on_nan=True)
+        path.line_to(1, 1)
+        path.close_path()
+
+        desired = QtGui.QPainterPath()
+        desired.moveTo(0, 0)
+        desired.lineTo(1, 2)
+        desired.moveTo(4, 5)
+        desired.lineTo(6, 7)
+        desired.lineTo(1, 1)
+        desired.closeSubpath()
+        self.assertEqual(self.elements(path.path), self.elements(desired))
+
+    def test_rects_and_line_set(self):
+        from kiva.qpainter import CompiledPath
+
+        rects = [(0, 0, 2, 3), (5, 5, 0, 0), (1, 1, -1, 2)]
+        path = CompiledPath()
+        path.rects(rects)
+        path.line_set([(0, 0), (2, 2)], [(1, 1), (3, 3)])
+
+        desired = QtGui.QPainterPath()
+        for rect in rects:
+            desired.addRect(*rect)
+        desired.moveTo(0, 0)
+        desired.lineTo(1, 1)
+        desired.moveTo(2, 2)
+        desired.lineTo(3, 3)
+        self.assertEqual(self.elements(path.path), self.elements(desired))
+
+    def test_line_set_of_different_lengths(self):
+        from kiva.qpainter import CompiledPath
+
+        # Extra starts or ends are ignored, as zip() would.
+        path = CompiledPath()
+        path.line_set([(0, 0), (2, 2), (4, 4)], [(1, 1), (3, 3)])
+        desired = CompiledPath()
+        desired.line_set([(0, 0), (2, 2)], [(1, 1), (3, 3)])
+        self.assertEqual(self.elements(path.path),
+                         self.elements(desired.path))
+
+    def draw(self, draw, alpha=1.0):
+        from kiva.qpainter import GraphicsContext
+
+        gc = GraphicsContext((40, 30))
+        gc.clear((1.0, 1.0, 1.0, 1.0))
+        gc.set_fill_color((1.0, 0.0, 0.0, alpha))
+        gc.set_stroke_color((0.0, 0.0, 1.0, alpha))
+        gc.translate_ctm(2, 3)
+        draw(gc)
+        gc.gc.end()
+        image = gc.qt_dc.toImage()
+        return np.array([[image.pixel(x, y) for x in range(40)]
+                         for y in range(30)], dtype=np.uint32)
+
+    def assertImagesClose(self, image, desired):
+        difference = np.abs(image.view(np.uint8).astype(int) -
+                            desired.view(np.uint8))
+        self.assertLessEqual(difference.max(), 2)
+
+    def test_stamped_markers(self):
+        from kiva import constants
+        from kiva.qpainter import _marker_path
+
+        points = np.array([[5, 5], [8, 6], [20, 15], [21, 15]])
+        for marker in (constants.SQUARE_MARKER, constants.CIRCLE_MARKER,
+                       constants.CROSS_MARKER):
+            stamped = self.draw(
+                lambda gc: gc.draw_marker_at_points(points, 3, marker))
+
+            def draw_exactly(gc):
+                # Stamped markers are all filled before any are stroked.
+                path = _marker_path(marker, 3)
+                if marker != constants.CROSS_MARKER:
+                    gc.draw_path_at_points(points, path, constants.FILL)
+                gc.draw_path_at_points(points, path, constants.STROKE)
+
+            self.assertImagesClose(stamped, self.draw(draw_exactly))
+
+    def test_stamped_transparent_markers(self):
+        from kiva import constants
+        from kiva.qpainter import _marker_path
+
+        points = np.array([[5, 5], [8, 6], [20, 15], [21, 15], [21, 16]])
+        path = _marker_path(constants.DOT_MARKER, 3)
+        stamped = self.draw(lambda gc: gc.draw_marker_at_points(
+            points, 3, constants.DOT_MARKER), alpha=0.5)
+        exact = self.draw(lambda gc: gc.draw_path_at_points(
+            points, path, constants.FILL), alpha=0.5)
+        self.assertImagesClose(stamped, exact)
+
+    def test_huge_markers(self):
+        from kiva import constants
+        from kiva.qpainter import GraphicsContext, _marker_path
+
+        # Markers much larger than the context aren't stamped.
+        gc = GraphicsContext((40, 30))
+        path = _marker_path(constants.SQUARE_MARKER, 1000)
+        layers = gc._marker_layers(constants.FILL_STROKE)
+        self.assertIsNone(gc._marker_box(path, layers))
+
+        points = np.array([[5, 5], [30, 20]])
+        drawn = self.draw(lambda gc: gc.draw_marker_at_points(
+            points, 1000, constants.SQUARE_MARKER))
+        exact = self.draw(lambda gc: gc.draw_path_at_points(
+            points, path, constants.FILL_STROKE))
+        self.assertImagesClose(drawn, exact)
+
+    def test_pixel_markers(self):
+        from kiva import constants
+
+        drawn = self.draw(lambda gc: gc.draw_marker_at_points(
+            [(1, 2), (10, 7)], 1, constants.PIXEL_MARKER,
+            colors=[(0, 1, 0, 1), (0, 0, 1, 1)]))
+        self.assertEqual(
+            np.argwhere(drawn != 0xffffffff).tolist(), [[20, 12], [25, 3]])
+        self.assertEqual(drawn[25, 3], 0xff00ff00)
+        self.assertEqual(drawn[20, 12], 0xff0000ff)
+
+    def test_unknown_marker(self):
+        from kiva import constants
+        from kiva.qpainter import GraphicsContext
+
+        gc = GraphicsContext((10, 10))
+        self.assertFalse(gc.draw_marker_at_points([(1, 1)], 1,
+                                                  constants.NO_MARKER))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,95 @@
+import io
+
+import numpy
+
+from kiva.image import GraphicsContext
+from kiva.recording import DisplayList, RecordingGraphicsContext
+from kiva.tests.drawing_tester import DrawingImageTester
+from traits.testing.unittest_tools import unittest
+
+
+class TestRecordingDrawing(DrawingImageTester, unittest.TestCase):
+
+    def create_graphics_context(self, width, height):
+        return RecordingGraphicsContext((width, height))
+
+
+class TestDisplayList(unittest.TestCase):
+
+    def draw_squares(self, gc):
+        gc.set_fill_color((1.0, 0.0, 0.0))
+        path = gc.get_empty_path()
+        path.rect(0, 0, 10, 10)
+        for x in range(0, 100, 20):
+            with gc:
+                gc.translate_ctm(x, 0)
+                gc.begin_path()
+                gc.add_path(path)
+                gc.fill_path()
+
+    def render(self, display_list, tx=0):
+        gc = GraphicsContext((100, 20))
+        gc.translate_ctm(tx, 0)
+        display_list.replay(gc)
+        return gc.bmp_array.copy()
+
+    def test_replay_matches_drawing(self):
+        gc = GraphicsContext((100, 20))
+        self.draw_squares(gc)
+        recorder = RecordingGraphicsContext((100, 20))
+        self.draw_squares(recorder)
+
+        self.assertTrue(numpy.array_equal(
+            self.render(recorder.display_list), gc.bmp_array))
+        self.assertEqual(recorder.get_fill_color().tolist(), [1, 0, 0, 1])
+
+    def test_replay_relative_to_ctm(self):
+        recorder = RecordingGraphicsContext((100, 20))
+        self.draw_squares(recorder)
+        moved = self.render(recorder.display_list, tx=5)
+        self.assertTrue(numpy.array_equal(
+            moved[:, 5:], self.render(recorder.display_list)[:, :-5]))
+
+    def test_numbers_stored_unboxed(self):
+        recorder = RecordingGraphicsContext((100, 20))
+        recorder.move_to(1, 2)
+        recorder.line_to(3.5, 4)
+        recorder.arc(0, 0, 1, 0, 1, True)
+        display_list = recorder.display_list
+        self.assertEqual(display_list.floats.tolist(), [1, 2, 3.5, 4])
+        self.assertEqual(display_list.float_counts.tolist(), [2, 2, -1])
+        self.assertEqual(display_list.objects, [((0, 0, 1, 0, 1, True), {})])
+
+    def test_arrays_copied(self):
+        recorder = RecordingGraphicsContext((100, 20))
+        points = numpy.array([[0.0, 0.0], [10.0, 10.0]])
+        recorder.lines(points)
+        points[:] = 5
+        (recorded,), _ = recorder.display_list.objects[0]
+        self.assertEqual(recorded.tolist(), [[0, 0], [10, 10]])
+
+    def test_state_tracked(self):
+        recorder = RecordingGraphicsContext((100, 20))
+        with recorder:
+            recorder.translate_ctm(5, 6)
+            recorder.set_text_position(3, 4)
+            self.assertEqual(recorder.get_ctm()[2, :2].tolist(), [5, 6])
+            self.assertEqual(recorder.get_text_position(), (3, 4))
+        self.assertEqual(recorder.get_ctm()[2, :2].tolist(), [0, 0])
+        self.assertEqual(recorder.get_text_position(), (0, 0))
+
+    def test_save_and_load(self):
+        recorder = RecordingGraphicsContext((100, 20))
+        self.draw_squares(recorder)
+        stream = io.BytesIO()
+        recorder.display_list.save(stream)
+        stream.seek(0)
+        loaded = DisplayList.load(stream)
+
+        self.assertEqual(len(loaded), len(recorder.display_list))
+        self.assertTrue(numpy.array_equal(
+            self.render(loaded), self.render(recorder.display_list)))
+
+
+if __name__ == "__main__":
+    unittest.main()
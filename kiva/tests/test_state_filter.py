@@ -0,0 +1,83 @@
+from kiva.constants import JOIN_BEVEL
+from kiva.fonttools import Font
+from kiva.recording import COMMANDS, RecordingGraphicsContext
+from kiva.state_filter import StateFilter, StateFilterMixin
+from traits.testing.unittest_tools import unittest
+
+
+class FilteredRecordingGraphicsContext(StateFilterMixin,
+                                       RecordingGraphicsContext):
+    pass
+
+
+class TestStateFilter(unittest.TestCase):
+
+    def create_graphics_context(self):
+        self.recorder = RecordingGraphicsContext((100, 100))
+        return StateFilter(self.recorder)
+
+    def recorded(self):
+        display_list = self.recorder.display_list
+        return [COMMANDS[opcode][0] for opcode in display_list.opcodes]
+
+    def test_repeated_setters_dropped(self):
+        gc = self.create_graphics_context()
+        for i in range(3):
+            gc.set_fill_color((1.0, 0.0, 0.0))
+            gc.set_fill_color((1.0, 0.0, 0.0, 1.0))
+            gc.set_line_width(2)
+            gc.set_line_join(JOIN_BEVEL)
+            gc.set_line_dash([4, 2])
+            gc.set_font(Font(size=14))
+
+        self.assertEqual(self.recorded(), [
+            'set_fill_color', 'set_line_width', 'set_line_join',
+            'set_line_dash', 'set_font'])
+        self.assertEqual(gc.dropped_calls['set_fill_color'], 5)
+        self.assertEqual(gc.dropped_calls['set_font'], 2)
+        self.assertEqual(sum(gc.dropped_calls.values()), 13)
+
+    def test_changed_setters_passed(self):
+        gc = self.create_graphics_context()
+        gc.set_stroke_color((1.0, 0.0, 0.0))
+        gc.set_stroke_color((0.0, 1.0, 0.0))
+        gc.set_line_dash(None)
+        gc.set_line_dash([4, 2], 1)
+        self.assertEqual(len(self.recorded()), 4)
+        self.assertEqual(sum(gc.dropped_calls.values()), 0)
+
+    def test_restore_state(self):
+        gc = self.create_graphics_context()
+        gc.set_fill_color((1.0, 0.0, 0.0))
+        for i in range(2):
+            with gc:
+                gc.set_fill_color((1.0, 0.0, 0.0))
+                gc.set_fill_color((0.0, 0.0, 1.0))
+        gc.set_fill_color((1.0, 0.0, 0.0))
+
+        self.assertEqual(self.recorded(), [
+            'set_fill_color',
+            'save_state', 'set_fill_color', 'restore_state',
+            'save_state', 'set_fill_color', 'restore_state'])
+        self.assertEqual(gc.dropped_calls['set_fill_color'], 3)
+
+    def test_invalidating_calls(self):
+        gc = self.create_graphics_context()
+        font = Font(size=14)
+        gc.set_font(font)
+        gc.set_font_size(20)
+        gc.set_font(font)
+        self.assertEqual(self.recorded(),
+                         ['set_font', 'set_font_size', 'set_font'])
+
+    def test_mixin(self):
+        gc = FilteredRecordingGraphicsContext((100, 100))
+        gc.set_alpha(0.5)
+        gc.set_alpha(0.5)
+        self.assertEqual(len(gc.display_list), 1)
+        self.assertEqual(gc.dropped_calls['set_alpha'], 1)
+        self.assertEqual(gc.get_alpha(), 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
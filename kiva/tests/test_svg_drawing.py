@@ -17,10 +17,22 @@ class TestSVGDrawing(DrawingTester, unittest.TestCase):
         filename = "{0}.svg".format(self.filename)
         self.gc.save(filename)
         tree = ElementTree.parse(filename)
-        elements = [element for element in tree.getiterator()]
+        elements = [element for element in tree.iter()]
         if not len(elements) in [4, 7]:
             self.fail('The expected number of elements was not found')
 
 
+class TestSVGCompoundPath(unittest.TestCase):
+
+    def test_subpaths_written_as_one_path(self):
+        gc = GraphicsContext((300, 300))
+        gc.rects([[50, 50, 40, 100], [150, 50, 40, 150]])
+        gc.fill_path()
+        elements = [element.tag.split('}')[-1] for element
+                    in ElementTree.fromstring(gc.render('svg')).iter()]
+        self.assertEqual(elements.count('path'), 1)
+        self.assertNotIn('polygon', elements)
+
+
 if __name__ == "__main__":
     unittest.main()